@@ -0,0 +1,64 @@
+"""
+Compare the scalar and vectorized haversine paths in LocationUtils.
+
+Run from the backend directory:
+
+    python -m benchmarks.haversine_benchmark
+"""
+import time
+import numpy as np
+from src.common.location_utils import LocationUtils
+
+SIZES = [10_000, 100_000, 1_000_000]
+ORIGIN = (40.7128, -74.0060)
+NULL_FRACTION = 0.05
+
+
+def make_points(n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-90, 90, n)
+    lons = rng.uniform(-180, 180, n)
+    # Some sellers never set a location
+    missing = rng.random(n) < NULL_FRACTION
+    lats[missing] = np.nan
+    return lats, lons
+
+
+def scalar_path(lats, lons, max_distance_km):
+    results = []
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        distance = LocationUtils.calculate_distance(
+            ORIGIN[0], ORIGIN[1], None if lat != lat else lat, lon
+        )
+        if LocationUtils.is_within_radius(distance, max_distance_km):
+            results.append(distance)
+    results.sort(key=lambda d: (d is None, d if d is not None else float("inf")))
+    return results
+
+
+def vectorized_path(lats, lons, max_distance_km):
+    distances = LocationUtils.haversine_distances(ORIGIN[0], ORIGIN[1], lats, lons)
+    kept = np.flatnonzero(LocationUtils.within_radius_mask(distances, max_distance_km))
+    return kept[LocationUtils.order_by_distance(distances[kept])]
+
+
+def best_of(func, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'points':>10} {'scalar (ms)':>12} {'numpy (ms)':>12} {'speedup':>9}")
+    for n in SIZES:
+        lats, lons = make_points(n)
+        scalar = best_of(scalar_path, lats, lons, 5000.0, repeat=1 if n >= 1_000_000 else 3)
+        vectorized = best_of(vectorized_path, lats, lons, 5000.0)
+        print(f"{n:>10,} {scalar * 1000:>12.1f} {vectorized * 1000:>12.1f} {scalar / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from src.product.routes import router as product_router
 from contextlib import asynccontextmanager
-from src.db.main import init_db
+from src.db.main import init_db, async_session
 from src.db.auto_migrations import run_auto_migrations
 from src.cart.routes import router as cart_router
 from src.category.routes import router as category_router
@@ -11,15 +11,117 @@ from src.orders.routes import router as order_router
 from src.dashboard.routes import router as dashboard_router
 from src.payment.routes import router as payment_router
 from src.middleware import setup_middleware
+from src.config import Config
+from src.common.background import PeriodicTask
+from src.common.spatial_index import seller_spatial_index
+from src.product.suggest import product_suggest_index
+from src.product.snapshot import catalog_snapshot
+from src.product.related import co_purchase_index
+from src.product.trending import trending_counters
+from src.product.views import product_view_buffer
+from src.category.service import CategoryService
+from src.cart.service import CartService
+from src.cart.store import cart_store
+from src.cart.sweeper import abandoned_cart_sweeper
+from src.category.tree import category_tree
+from src.common.versions import cache_versions
+
+
+async def load_seller_index():
+    async with async_session() as session:
+        await seller_spatial_index.load(session)
+
+
+async def load_suggest_index():
+    async with async_session() as session:
+        await product_suggest_index.load(session)
+
+
+async def prepare_categories():
+    async with async_session() as session:
+        await CategoryService.backfill_paths(session)
+        await CategoryService.refresh_product_stats(session)
+        await session.commit()
+
+
+async def prepare_carts():
+    async with async_session() as session:
+        # Must run before migrations add the unique (cart_id, product_id) constraint
+        merged = await CartService.merge_duplicate_items(session)
+        backfilled = await CartService.backfill_updated_at(session)
+        await session.commit()
+    if merged:
+        print(f"🛒 Merged {merged} duplicate cart items")
+    if backfilled:
+        print(f"🛒 Backfilled updated_at of {backfilled} carts")
+
+
+async def poll_cache_versions():
+    async with async_session() as session:
+        await cache_versions.poll(session)
+        # Rebuild here rather than in the next request that needs categories
+        await category_tree.ensure_current(session)
+
+
+async def load_co_purchase_index():
+    async with async_session() as session:
+        await co_purchase_index.load(session)
+
+
+async def sync_trending_counters():
+    async with async_session() as session:
+        await trending_counters.sync(session)
+
+
+async def refresh_catalog_snapshot():
+    await catalog_snapshot.refresh(async_session)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Server is starting...")
     await init_db()
+    await prepare_carts()
     await run_auto_migrations()
+    await prepare_categories()
+    await poll_cache_versions()
+    await load_seller_index()
+    await load_suggest_index()
+    await load_co_purchase_index()
+    await sync_trending_counters()
+    background_tasks = [
+        PeriodicTask("seller-index-refresh", Config.SELLER_INDEX_REFRESH_SECONDS, load_seller_index),
+        PeriodicTask("suggest-index-refresh", Config.SUGGEST_INDEX_REFRESH_SECONDS, load_suggest_index),
+        PeriodicTask("cache-version-poll", Config.CACHE_VERSION_POLL_SECONDS, poll_cache_versions),
+        PeriodicTask("co-purchase-rebuild", Config.RELATED_PRODUCTS_REBUILD_SECONDS, load_co_purchase_index),
+        PeriodicTask("trending-sync", Config.TRENDING_SYNC_SECONDS, sync_trending_counters),
+        PeriodicTask("product-view-flush", Config.PRODUCT_VIEW_FLUSH_SECONDS, product_view_buffer.flush),
+        PeriodicTask("abandoned-cart-sweep", Config.CART_SWEEP_INTERVAL_SECONDS, abandoned_cart_sweeper.run),
+    ]
+    if cart_store is not None:
+        background_tasks.append(PeriodicTask("cart-store-flush", Config.CART_STORE_FLUSH_SECONDS, cart_store.flush))
+    if Config.CATALOG_SNAPSHOT_ENABLED:
+        await refresh_catalog_snapshot()
+        background_tasks.append(
+            PeriodicTask("catalog-snapshot-refresh", Config.CATALOG_SNAPSHOT_REFRESH_SECONDS, refresh_catalog_snapshot)
+        )
+    for task in background_tasks:
+        task.start()
     yield
     print("🧹 Server is shutting down...")
+    for task in background_tasks:
+        await task.stop()
+    await product_view_buffer.flush()
+    if cart_store is not None:
+        try:
+            await cart_store.flush()
+        except Exception as e:
+            print(f"⚠️ Could not flush stored carts: {str(e)}")
+    try:
+        # Don't lose the views and sales counted since the last sync
+        await sync_trending_counters()
+    except Exception as e:
+        print(f"⚠️ Could not flush trending counters: {str(e)}")
 
 
 
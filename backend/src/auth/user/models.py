@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import Index
 import uuid
 from typing import Optional, List, TYPE_CHECKING
 import sqlalchemy.dialects.postgresql as pg
@@ -18,6 +19,10 @@ class UserRole(str, Enum):
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # Bounding-box prefilter for location-based product queries
+        Index("ix_users_latitude_longitude", "latitude", "longitude"),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
@@ -56,12 +56,14 @@ class UserResponse(UserBase):
 class UserLogin(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     password: str = Field(..., min_length=8, max_length=100)
+    guest_cart_token: Optional[str] = Field(None, description="Guest cart to merge into the user's cart")
 
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
     expires_in: int
     user: UserResponse
+    guest_cart_items_merged: int = 0
 
 class PasswordChange(BaseModel):
     current_password: str = Field(..., min_length=8, max_length=100)
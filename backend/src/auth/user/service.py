@@ -5,15 +5,22 @@ from src.auth.user.schema import UserCreate, UserUpdate, UserLogin, PasswordChan
 from src.auth.utils import get_password_hash, verify_password, create_access_token
 from src.auth.verification_models import EmailVerificationToken
 from src.common.email_service import EmailService
+from src.common.spatial_index import seller_spatial_index, INDEXED_ROLES
+from src.common.cache import catalog_cache, PRODUCT_LIST_TAG
+from src.product.snapshot import mark_catalog_changed
 from src.cart.models import Cart
+from src.cart.guest import decode_guest_cart
+from src.cart.service import CartService
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from fastapi import HTTPException, status
 from src.common.response import ResponseHandler
 from src.common.exceptions import NotFoundError, ConflictError, ValidationError
 from src.config import Config
-from decimal import Decimal
 import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 class UserService:
     @staticmethod
@@ -114,10 +121,11 @@ class UserService:
             db.add(db_user)
             await db.commit()
             await db.refresh(db_user)
+            seller_spatial_index.sync_user(db_user)
             
             # Create a cart for the new user
             try:
-                user_cart = Cart(user_id=db_user.id, total_price=Decimal('0.00'))
+                user_cart = Cart(user_id=db_user.id)
                 db.add(user_cart)
                 await db.commit()
                 print(f"Created cart for user {db_user.id}")
@@ -188,6 +196,8 @@ class UserService:
                 if username_result.scalar_one_or_none():
                     raise ConflictError(f"User with username '{user_update.username}' already exists")
             
+            was_seller = db_user.role in INDEXED_ROLES
+            
             # Update fields
             for key, value in user_update.model_dump(exclude_unset=True).items():
                 setattr(db_user, key, value)
@@ -198,6 +208,13 @@ class UserService:
             await db.commit()
             await db.refresh(db_user)
             
+            # Keep proximity lookups current with the new location or role
+            seller_spatial_index.sync_user(db_user)
+            # Product listings embed the seller's city, state and distance
+            if was_seller or db_user.role in INDEXED_ROLES:
+                catalog_cache.invalidate(PRODUCT_LIST_TAG)
+                mark_catalog_changed()
+            
             return ResponseHandler.update_success("User", user_id, db_user)
         except (NotFoundError, ConflictError, ValidationError, HTTPException):
             raise
@@ -234,6 +251,10 @@ class UserService:
             
             await db.delete(user)
             await db.commit()
+            seller_spatial_index.remove(user_id)
+            if user.role in INDEXED_ROLES:
+                catalog_cache.invalidate(PRODUCT_LIST_TAG)
+                mark_catalog_changed()
             
             return ResponseHandler.delete_success("User", user_id, user)
         except (NotFoundError, HTTPException):
@@ -284,6 +305,27 @@ class UserService:
             db.add(user)
             await db.commit()
             
+            # Move the cart built before logging in into the user's cart
+            guest_cart_items_merged = 0
+            if login_data.guest_cart_token:
+                # Don't fail the login over the guest cart
+                user_id = user.id
+                try:
+                    guest_items = decode_guest_cart(login_data.guest_cart_token)
+                except HTTPException as e:
+                    guest_items = {}
+                    logger.warning(f"Ignoring guest cart of user {user_id}: {e.detail}")
+                if guest_items:
+                    try:
+                        guest_cart_items_merged = await CartService.merge_guest_cart(db, user, guest_items)
+                        await db.commit()
+                    except Exception as e:
+                        guest_cart_items_merged = 0
+                        await db.rollback()
+                        # The rollback expired the user loaded above
+                        await db.refresh(user)
+                        logger.warning(f"Failed to merge guest cart for user {user_id}: {str(e)}")
+            
             # Create access token
             access_token_expires = timedelta(minutes=Config.ACCESS_TOKEN_EXPIRE_MINUTES)
             access_token = create_access_token(
@@ -294,7 +336,8 @@ class UserService:
                 "access_token": access_token,
                 "token_type": "bearer",
                 "expires_in": Config.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-                "user": user
+                "user": user,
+                "guest_cart_items_merged": guest_cart_items_merged
             }
         except HTTPException:
             raise
@@ -9,12 +9,15 @@ from fastapi import HTTPException, status
 
 from src.cart.models import Cart, CartItem
 from src.cart.schema import CartCheckout
+from src.cart.store import cart_store
 from src.orders.models import Order, OrderItem, OrderStatus
 from src.orders.schema import OrderCreate, OrderItemCreate
 from src.payment.service import PaymentService
 from src.payment.schema import PaymentIntentCreate, PaymentResponse
 from src.payment.models import PaymentMethod, PaymentProvider
 from src.product.models import Product
+from src.product.related import co_purchase_index
+from src.product.trending import trending_counters
 from src.auth.user.models import User
 from src.common.exceptions import NotFoundError, ValidationError
 
@@ -26,6 +29,11 @@ class CartCheckoutService:
     def __init__(self):
         self.payment_service = PaymentService()
     
+    async def _flush_stored_cart(self, cart_id: str) -> None:
+        """Write pending changes of a cart held in the cart store, since checkout reads cart_items"""
+        if cart_store is not None:
+            await cart_store.flush([uuid.UUID(str(cart_id))])
+    
     def _generate_order_number(self) -> str:
         """Generate unique order number"""
         return f"ORD-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
@@ -38,6 +46,8 @@ class CartCheckoutService:
     ) -> Dict[str, Any]:
         """Process cart checkout with payment"""
         try:
+            await self._flush_stored_cart(checkout_data.cart_id)
+            
             # Get cart and verify ownership
             cart_query = select(Cart).where(Cart.id == checkout_data.cart_id)
             cart_result = await db.execute(cart_query)
@@ -133,6 +143,8 @@ class CartCheckoutService:
             
             await db.commit()
             await db.refresh(order)
+            co_purchase_index.add_order((cart_item.product_id for cart_item in cart_items), order.id)
+            trending_counters.record_sale((cart_item.product_id, cart_item.quantity) for cart_item in cart_items)
             
             # Create payment intent
             payment_intent_data = PaymentIntentCreate(
@@ -186,17 +198,19 @@ class CartCheckoutService:
             for cart_item in cart_items:
                 await db.delete(cart_item)
             
-            # Reset cart total
+            # Touch the cart so cached copies of it are invalidated
             cart_query = select(Cart).where(Cart.id == cart_id)
             cart_result = await db.execute(cart_query)
             cart = cart_result.scalar_one_or_none()
             
             if cart:
-                cart.total_price = Decimal('0.00')
                 cart.updated_at = datetime.utcnow()
                 db.add(cart)
             
             await db.commit()
+            if cart_store is not None:
+                # Reloaded, empty, on next use
+                await cart_store.discard(uuid.UUID(str(cart_id)))
             
         except Exception as e:
             logger.error(f"Error clearing cart: {str(e)}")
@@ -212,6 +226,8 @@ class CartCheckoutService:
     ) -> Dict[str, Any]:
         """Get checkout summary with totals"""
         try:
+            await self._flush_stored_cart(cart_id)
+            
             # Get cart and items
             cart_query = select(Cart).where(Cart.id == cart_id)
             cart_result = await db.execute(cart_query)
@@ -281,6 +297,8 @@ class CartCheckoutService:
     ) -> Dict[str, Any]:
         """Validate cart items before checkout"""
         try:
+            await self._flush_stored_cart(cart_id)
+            
             # Get cart items
             cart_items_query = select(CartItem).where(CartItem.cart_id == cart_id)
             cart_items_result = await db.execute(cart_items_query)
@@ -0,0 +1,79 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import uuid
+from typing import Dict
+from fastapi import HTTPException, status
+from src.common.exceptions import ValidationError
+from src.config import Config
+
+# First byte of every token; bump it when the layout below changes
+GUEST_CART_VERSION = 1
+
+# Per item: product id, quantity
+_ITEM = struct.Struct(">16sH")
+_MAC_SIZE = 16
+
+# Separate from the JWT key usage, so one kind of token can't be passed off as the other.
+# There is deliberately no built-in fallback: anyone could mint tokens with it.
+_KEY = hashlib.sha256(b"guest-cart:" + Config.SECRET_KEY.encode()).digest() if Config.SECRET_KEY else None
+
+def _key() -> bytes:
+    if _KEY is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Guest carts are unavailable: SECRET_KEY is not configured"
+        )
+    return _KEY
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_key(), payload, hashlib.sha256).digest()[:_MAC_SIZE]
+
+def encode_guest_cart(items: Dict[uuid.UUID, int]) -> str:
+    """
+    Pack a guest cart (product id -> quantity, in cart order) into a compact
+    URL-safe token: a version byte, 18 bytes per item and a truncated
+    HMAC-SHA256, base64url-encoded. Nothing is stored server side.
+    """
+    _key()
+    if len(items) > Config.GUEST_CART_MAX_ITEMS:
+        raise ValidationError(f"A guest cart can hold at most {Config.GUEST_CART_MAX_ITEMS} products")
+    for product_id, quantity in items.items():
+        if not 1 <= quantity <= Config.GUEST_CART_MAX_QUANTITY:
+            raise ValidationError(f"Quantity of product {product_id} must be between 1 and {Config.GUEST_CART_MAX_QUANTITY}")
+    payload = bytes([GUEST_CART_VERSION]) + b"".join(
+        _ITEM.pack(product_id.bytes, quantity) for product_id, quantity in items.items()
+    )
+    return base64.urlsafe_b64encode(payload + _sign(payload)).rstrip(b"=").decode("ascii")
+
+def decode_guest_cart(token: str) -> Dict[uuid.UUID, int]:
+    """
+    Verify and unpack a guest cart token; raises ValidationError if it is
+    malformed, altered or over the current item and quantity limits (which
+    may be lower than when it was issued)
+    """
+    _key()
+    # Largest valid token, so oversized input is rejected before decoding
+    max_length = 4 * (1 + Config.GUEST_CART_MAX_ITEMS * _ITEM.size + _MAC_SIZE + 2) // 3
+    if len(token) > max_length:
+        raise ValidationError("Guest cart token is too large")
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        raise ValidationError("Invalid guest cart token")
+    payload, mac = raw[:-_MAC_SIZE], raw[-_MAC_SIZE:]
+    if not payload or not hmac.compare_digest(mac, _sign(payload)):
+        raise ValidationError("Invalid guest cart token")
+    if payload[0] != GUEST_CART_VERSION:
+        raise ValidationError("Unsupported guest cart token version")
+    body = payload[1:]
+    if len(body) % _ITEM.size or len(body) // _ITEM.size > Config.GUEST_CART_MAX_ITEMS:
+        raise ValidationError("Invalid guest cart token")
+    items: Dict[uuid.UUID, int] = {}
+    for product_bytes, quantity in _ITEM.iter_unpack(body):
+        if not 1 <= quantity <= Config.GUEST_CART_MAX_QUANTITY:
+            raise ValidationError(f"Guest cart quantities must be between 1 and {Config.GUEST_CART_MAX_QUANTITY}")
+        items[uuid.UUID(bytes=product_bytes)] = quantity
+    return items
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 import uuid
 from typing import Optional, List, TYPE_CHECKING
 import sqlalchemy.dialects.postgresql as pg
@@ -16,6 +17,10 @@ class Cart(SQLModel, table=True):
     The cart persists across sessions and contains CartItems
     """
     __tablename__ = 'carts'
+    __table_args__ = (
+        # Keyset scans of idle carts (abandoned cart sweeper)
+        Index("ix_carts_updated_at_id", "updated_at", "id"),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
@@ -59,8 +64,8 @@ class Cart(SQLModel, table=True):
         sa_relationship_kwargs={"cascade": "all, delete-orphan"}
     )
     
-    # Calculated total price
-    total_price: Decimal = Field(default=Decimal('0.00'), nullable=False, decimal_places=2)
+    # The total price isn't stored: it is the sum of the item subtotals,
+    # computed on read, so concurrent item writes can't leave it out of date
     
     def __repr__(self):
         return f"<Cart(id={self.id}, user_id={self.user_id}, items={len(self.cart_items)})>"
@@ -70,8 +75,12 @@ class CartItem(SQLModel, table=True):
     """
     Cart Item - Represents a product in a user's cart with quantity
     Many cart items belong to ONE cart
+    A product appears at most once per cart; adding it again raises the quantity
     """
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_id_product_id"),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(
@@ -113,4 +122,43 @@ class CartItem(SQLModel, table=True):
     )
     
     def __repr__(self):
-        return f"<CartItem(id={self.id}, product_id={self.product_id}, quantity={self.quantity})>"
\ No newline at end of file
+        return f"<CartItem(id={self.id}, product_id={self.product_id}, quantity={self.quantity})>"
+
+
+class AbandonedCartItem(SQLModel, table=True):
+    """
+    Cart items expired by the abandoned cart sweeper, kept for analysis.
+    No foreign keys: the cart or product may be deleted later.
+    """
+    __tablename__ = 'abandoned_cart_items'
+
+    # The id the item had in cart_items
+    id: uuid.UUID = Field(sa_column=Column(pg.UUID(as_uuid=True), primary_key=True, nullable=False))
+    cart_id: uuid.UUID = Field(nullable=False, index=True)
+    product_id: uuid.UUID = Field(nullable=False)
+    quantity: int = Field(nullable=False)
+    subtotal_price: Decimal = Field(nullable=False, decimal_places=2)
+    added_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+    abandoned_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+
+
+class CartReminder(SQLModel, table=True):
+    """
+    Reminder email for an idle cart: queued by the abandoned cart sweeper,
+    sent in batches. One per cart and idle period (cart_updated_at), so a
+    cart is reminded again only after it has been changed and left again.
+    """
+    __tablename__ = 'cart_reminders'
+
+    cart_id: uuid.UUID = Field(
+        sa_column=Column(
+            pg.UUID(as_uuid=True), ForeignKey("carts.id", ondelete="CASCADE"), primary_key=True, nullable=False
+        )
+    )
+    user_id: uuid.UUID = Field(nullable=False)
+    cart_updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+    queued_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+    # NULL while queued
+    sent_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=True, index=True)
+    )
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, status, Path, Query, Body
+from fastapi import APIRouter, Depends, Request, status, Path, Query, Body, Header
 from src.db.main import get_db
-from src.cart.schema import CartCreate, CartResponse, CartItemCreate, CartItemUpdate, CartItemResponse, CartCheckout
+from src.cart.schema import CartCreate, CartResponse, CartItemCreate, CartItemUpdate, CartItemBatch, CartItemResponse, CartCheckout
 from src.cart.service import CartService
 from src.cart.checkout_service import CartCheckoutService
 from src.auth.utils import get_current_active_user
 from src.auth.user.models import User
+from src.common.etag import CachedBody, ConditionalGet
+from src.common.response import encode_json
+from src.config import Config
 from typing import List, Optional
 from sqlmodel.ext.asyncio.session import AsyncSession
 from decimal import Decimal
@@ -12,9 +15,11 @@ import uuid
 
 router = APIRouter()
 checkout_service = CartCheckoutService()
+conditional = ConditionalGet(Config.CACHE_CONTROL_CARTS)
 
 @router.get("/me")
 async def get_my_cart(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -22,8 +27,46 @@ async def get_my_cart(
     Get the current user's cart.
     This is the PRIMARY endpoint for accessing your cart.
     Each user has exactly ONE cart that is automatically created during signup.
+    Supports If-None-Match: an unchanged cart answers 304 without being loaded.
     """
-    return await CartService.get_my_cart(db, current_user)
+    etag = await CartService.get_my_cart_etag(db, current_user)
+    if etag is not None and conditional.is_fresh(request, etag):
+        return conditional.not_modified(etag)
+    
+    cart = await CartService.get_my_cart(db, current_user)
+    if etag is None:
+        # The cart was only just created
+        etag = await CartService.get_my_cart_etag(db, current_user)
+    return conditional.respond(request, CachedBody(etag=etag, body=encode_json(cart)))
+
+# Guest carts: no account needed. The cart lives in the token returned by
+# each call, which the client sends back in the X-Guest-Cart header and as
+# guest_cart_token when logging in.
+@router.get("/guest")
+async def get_guest_cart(
+    x_guest_cart: Optional[str] = Header(None, description="Guest cart token from a previous response"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a guest cart, with current product details"""
+    return await CartService.get_guest_cart(db, x_guest_cart)
+
+@router.post("/guest/items")
+async def add_item_to_guest_cart(
+    item: CartItemCreate = Body(...),
+    x_guest_cart: Optional[str] = Header(None, description="Guest cart token from a previous response"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add an item to a guest cart; returns the cart and its new token"""
+    return await CartService.add_guest_item(db, x_guest_cart, item)
+
+@router.post("/guest/items/batch")
+async def apply_item_batch_to_guest_cart(
+    batch: CartItemBatch = Body(...),
+    x_guest_cart: Optional[str] = Header(None, description="Guest cart token from a previous response"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply many add/update/remove operations to a guest cart; returns the cart and its new token"""
+    return await CartService.apply_guest_batch(db, x_guest_cart, batch)
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_cart(
@@ -101,12 +144,23 @@ async def add_item_to_my_cart(
     Add an item to YOUR cart.
     This is the PRIMARY endpoint for adding items to cart.
     No need to know your cart_id - we'll automatically add to your cart.
+    Adding a product that is already in the cart raises its quantity.
     """
-    # Get user's cart
-    cart_response = await CartService.get_my_cart(db, current_user)
-    cart_id = cart_response['data']['id']
-    
-    return await CartService.add_item_to_cart(db, cart_id, item, current_user)
+    return await CartService.add_item_to_my_cart(db, item, current_user)
+
+@router.post("/me/items/batch")
+async def apply_item_batch_to_my_cart(
+    batch: CartItemBatch = Body(...),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply many add/update/remove operations to YOUR cart in one request,
+    e.g. to sync a cart edited offline. Operations are applied in order
+    and atomically; the resulting cart is returned, along with any
+    products that no longer exist and were skipped.
+    """
+    return await CartService.apply_item_batch(db, batch, current_user)
 
 @router.post("/{cart_id}/items")
 async def add_item_to_cart(
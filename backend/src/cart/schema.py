@@ -18,6 +18,19 @@ class CartItemCreate(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: Optional[int] = Field(None, ge=1)
 
+class CartItemOperationType(str, Enum):
+    ADD = "add"        # raise the quantity, adding the product if needed
+    UPDATE = "update"  # set the quantity, adding the product if needed
+    REMOVE = "remove"
+
+class CartItemOperation(BaseModel):
+    op: CartItemOperationType
+    product_id: uuid.UUID
+    quantity: Optional[int] = Field(None, ge=1, description="Required for add and update")
+
+class CartItemBatch(BaseModel):
+    operations: List[CartItemOperation] = Field(..., min_length=1, description="Applied in order")
+
 class CartItemResponse(CartItemBase):
     id: uuid.UUID
     cart_id: uuid.UUID
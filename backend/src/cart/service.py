@@ -1,14 +1,21 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy import Integer, column, delete, exists, func, literal, true, update, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+import sqlalchemy.dialects.postgresql as pg
 from src.cart.models import Cart, CartItem
-from src.cart.schema import CartCreate, CartItemCreate, CartItemUpdate
+from src.cart.schema import CartCreate, CartItemCreate, CartItemUpdate, CartItemBatch, CartItemOperation, CartItemOperationType
+from src.cart.guest import encode_guest_cart, decode_guest_cart
 from src.product.models import Product
 from src.auth.user.models import User, UserRole
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from fastapi import HTTPException, status
 from src.common.response import ResponseHandler
-from src.common.exceptions import NotFoundError
+from src.common.etag import make_etag
+from src.common.exceptions import NotFoundError, ValidationError
+from src.config import Config
+from src.cart.store import cart_store, cart_products, StoredCart, StoredItem, CART_PRODUCT_FIELDS
 from decimal import Decimal
 import uuid
 
@@ -22,6 +29,11 @@ class CartService:
         """
         from sqlalchemy.orm import selectinload
         
+        if cart_store is not None:
+            stored = await CartService._stored_cart_of(db, current_user)
+            products = await CartService._stored_products(db, stored)
+            return ResponseHandler.get_single_success("Cart", stored.cart_id, CartService._stored_cart_dict(stored, products))
+        
         query = select(Cart).options(
             selectinload(Cart.cart_items).selectinload(CartItem.product)
         ).where(Cart.user_id == current_user.id)
@@ -30,7 +42,7 @@ class CartService:
         
         if not cart:
             # Auto-create cart if somehow it doesn't exist (shouldn't happen)
-            cart = Cart(user_id=current_user.id, total_price=Decimal('0.00'))
+            cart = Cart(user_id=current_user.id)
             db.add(cart)
             await db.commit()
             await db.refresh(cart)
@@ -39,7 +51,7 @@ class CartService:
         cart_dict = {
             "id": cart.id,
             "user_id": cart.user_id,
-            "total_price": cart.total_price,
+            "total_price": CartService._total_price(cart),
             "created_at": cart.created_at,
             "updated_at": cart.updated_at,
             "cart_items": [
@@ -69,6 +81,42 @@ class CartService:
             
         return ResponseHandler.get_single_success("Cart", cart.id, cart_dict)
     
+    @staticmethod
+    async def get_my_cart_etag(db: AsyncSession, current_user: User) -> Optional[str]:
+        """
+        ETag of the current user's cart response, from a single aggregate
+        query: it changes whenever the cart, one of its items or one of
+        their products changes. Returns None if the user has no cart yet.
+        """
+        from sqlalchemy import literal_column
+        
+        if cart_store is not None:
+            stored = await cart_store.load(db, user_id=current_user.id)
+            if stored is None:
+                return None
+            products = await CartService._stored_products(db, stored)
+            return make_etag("cart", stored.cart_id, stored.updated_at or stored.created_at, *[
+                (item.id, item.quantity, item.subtotal_price, products[product_id]["updated_at"] or products[product_id]["created_at"])
+                for product_id, item in stored.items.items()
+            ])
+        
+        item_version = func.concat_ws(
+            ":", CartItem.id, CartItem.quantity, CartItem.subtotal_price,
+            func.coalesce(Product.updated_at, Product.created_at)
+        )
+        query = select(
+            Cart.id,
+            func.coalesce(Cart.updated_at, Cart.created_at),
+            func.string_agg(item_version, aggregate_order_by(literal_column("','"), CartItem.id))
+        ).select_from(Cart).outerjoin(CartItem, CartItem.cart_id == Cart.id).outerjoin(
+            Product, CartItem.product_id == Product.id
+        ).where(Cart.user_id == current_user.id).group_by(Cart.id)
+        result = await db.execute(query)
+        row = result.one_or_none()
+        if row is None:
+            return None
+        return make_etag("cart", *row)
+    
     @staticmethod
     async def get_cart(db: AsyncSession, cart_id: uuid.UUID, current_user: User) -> Cart:
         """
@@ -76,6 +124,18 @@ class CartService:
         """
         from sqlalchemy.orm import selectinload
         
+        if cart_store is not None:
+            stored = await cart_store.load(db, cart_id=cart_id)
+            if not stored:
+                raise NotFoundError("Cart", cart_id)
+            if stored.user_id != current_user.id and current_user.role != UserRole.ADMIN:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="You can only access your own cart"
+                )
+            products = await CartService._stored_products(db, stored)
+            return ResponseHandler.get_single_success("Cart", cart_id, CartService._stored_cart_dict(stored, products))
+        
         query = select(Cart).options(
             selectinload(Cart.cart_items).selectinload(CartItem.product)
         ).where(Cart.id == cart_id)
@@ -96,7 +156,7 @@ class CartService:
         cart_dict = {
             "id": cart.id,
             "user_id": cart.user_id,
-            "total_price": cart.total_price,
+            "total_price": CartService._total_price(cart),
             "created_at": cart.created_at,
             "updated_at": cart.updated_at,
             "cart_items": [
@@ -160,54 +220,250 @@ class CartService:
             
         await db.delete(cart)
         await db.commit()
+        if cart_store is not None:
+            await cart_store.discard(cart_id)
         return ResponseHandler.delete_success("Cart", cart_id, cart)
 
     @staticmethod
-    async def add_item_to_cart(db: AsyncSession, cart_id: uuid.UUID, item: CartItemCreate, current_user: User) -> CartItem:
-        # Only authenticated users can add items to cart
+    def _total_price(cart: Cart) -> Decimal:
+        return sum((item.subtotal_price for item in cart.cart_items), Decimal('0.00'))
+
+    # Carts held in a CartStore (Config.CART_STORE) --------------------------
+
+    @staticmethod
+    async def _stored_cart_of(db: AsyncSession, current_user: User) -> StoredCart:
+        stored = await cart_store.load(db, user_id=current_user.id)
+        if stored is None:
+            # Auto-create cart if somehow it doesn't exist (shouldn't happen)
+            cart = Cart(user_id=current_user.id)
+            db.add(cart)
+            await db.commit()
+            await db.refresh(cart)
+            stored = await cart_store.add(StoredCart(cart.id, cart.user_id, cart.created_at, cart.updated_at))
+        return stored
+
+    @staticmethod
+    async def _stored_products(db: AsyncSession, stored: StoredCart) -> Dict[uuid.UUID, Dict]:
+        """Products of a stored cart's items; items of deleted products are dropped"""
+        products = await cart_products(db, list(stored.items))
+        deleted = [product_id for product_id in stored.items if product_id not in products]
+        if deleted:
+            for product_id in deleted:
+                stored.remove(product_id)
+            await cart_store.put(stored)
+        return products
+
+    @staticmethod
+    async def _unit_prices(db: AsyncSession, product_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Decimal]:
+        """Current prices of existing products, as added to a stored cart"""
+        products = await cart_products(db, product_ids)
+        return {product_id: Decimal(str(product["price"])) for product_id, product in products.items()}
+
+    @staticmethod
+    def _stored_item_dict(stored: StoredCart, product_id: uuid.UUID, item: StoredItem) -> dict:
+        return {
+            "id": item.id,
+            "cart_id": stored.cart_id,
+            "product_id": product_id,
+            "quantity": item.quantity,
+            "subtotal_price": item.subtotal_price,
+            "added_at": item.added_at
+        }
+
+    @staticmethod
+    def _stored_cart_dict(stored: StoredCart, products: Dict[uuid.UUID, Dict]) -> dict:
+        return {
+            "id": stored.cart_id,
+            "user_id": stored.user_id,
+            "total_price": stored.total_price,
+            "created_at": stored.created_at,
+            "updated_at": stored.updated_at,
+            "cart_items": [
+                {
+                    "id": item.id,
+                    "cart_id": stored.cart_id,
+                    "product_id": product_id,
+                    "quantity": item.quantity,
+                    "subtotal_price": item.subtotal_price,
+                    "product": {name: products[product_id][name] for name in CART_PRODUCT_FIELDS}
+                }
+                for product_id, item in stored.items.items()
+            ]
+        }
+
+    @staticmethod
+    async def _stored_add_item(db: AsyncSession, stored: StoredCart, item: CartItemCreate) -> dict:
+        prices = await CartService._unit_prices(db, [item.product_id])
+        if item.product_id not in prices:
+            raise NotFoundError("Product", item.product_id)
+        cart_item = stored.add(item.product_id, item.quantity, prices[item.product_id])
+        await cart_store.put(stored)
+        return ResponseHandler.create_success(
+            "Cart Item", cart_item.id, CartService._stored_item_dict(stored, item.product_id, cart_item)
+        )
+
+    @staticmethod
+    async def _stored_apply_batch(
+        db: AsyncSession,
+        changes: Dict[uuid.UUID, Tuple[CartItemOperationType, Optional[int]]],
+        current_user: User
+    ) -> Tuple[dict, List[uuid.UUID]]:
+        stored = await CartService._stored_cart_of(db, current_user)
+        prices = await CartService._unit_prices(
+            db, [product_id for product_id, (op, _) in changes.items() if op != CartItemOperationType.REMOVE]
+        )
+        failed = []
+        for product_id, (op, quantity) in changes.items():
+            if op == CartItemOperationType.REMOVE:
+                stored.remove(product_id)
+            elif product_id not in prices:
+                failed.append(product_id)
+            elif op == CartItemOperationType.ADD:
+                stored.add(product_id, quantity, prices[product_id])
+            else:
+                stored.set(product_id, quantity, prices[product_id])
+        await cart_store.put(stored)
+        products = await CartService._stored_products(db, stored)
+        return CartService._stored_cart_dict(stored, products), failed
+
+    @staticmethod
+    def _check_role(current_user: User, action: str) -> None:
         if current_user.role not in [UserRole.NORMAL_USER, UserRole.SELLER, UserRole.ADMIN]:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only authenticated users can add items to cart"
+                detail=f"Only authenticated users can {action}"
             )
-        
-        # Verify cart exists
-        cart_query = select(Cart).where(Cart.id == cart_id)
-        cart_result = await db.execute(cart_query)
-        cart = cart_result.scalar_one_or_none()
-        
-        if not cart:
-            raise NotFoundError("Cart", cart_id)
-            
-        # Verify product exists and get its price
-        product_query = select(Product).where(Product.id == item.product_id)
-        product_result = await db.execute(product_query)
-        product = product_result.scalar_one_or_none()
-        
-        if not product:
-            raise NotFoundError("Product", item.product_id)
-            
-        # Calculate subtotal
-        subtotal = product.price * item.quantity
-        
-        # Create cart item
-        cart_item = CartItem(
-            cart_id=cart_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            subtotal_price=subtotal
+
+    @staticmethod
+    def _touch_cart(changed, now: datetime):
+        """
+        Wrap a cart_items write (a CTE with RETURNING) into a statement that
+        also bumps its cart's updated_at, returning the written item rows
+        """
+        return update(Cart).where(Cart.id == changed.c.cart_id).values(
+            updated_at=now
+        ).returning(*[changed.c[column.name] for column in CartItem.__table__.c])
+
+    @staticmethod
+    async def _upsert_item(db: AsyncSession, cart_condition, item: CartItemCreate) -> Optional[dict]:
+        """
+        Add a product to the cart matching cart_condition in one statement:
+        inserted if new, otherwise its quantity is raised and the subtotal
+        repriced. Returns the item row, or None if the cart or product is missing.
+        """
+        now = datetime.utcnow()
+        table = CartItem.__table__
+        source = select(
+            literal(uuid.uuid4(), pg.UUID(as_uuid=True)),
+            Cart.id,
+            Product.id,
+            literal(item.quantity),
+            Product.price * item.quantity,
+            literal(now, pg.TIMESTAMP(timezone=True))
+        ).select_from(Cart).join(Product, true()).where(cart_condition, Product.id == item.product_id)
+        upsert = CartService._upsert_statement(source, replace=False).returning(*table.c)
+
+        result = await db.execute(CartService._touch_cart(upsert.cte("upserted"), now))
+        row = result.mappings().one_or_none()
+        return dict(row) if row else None
+
+    @staticmethod
+    def _upsert_statement(source, replace: bool):
+        """
+        INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE of the cart_items
+        rows selected by source (id, cart_id, product_id, quantity, subtotal,
+        added_at). An existing item's quantity is replaced or increased by the
+        new one, and its subtotal repriced at the current price.
+        """
+        table = CartItem.__table__
+        insert = pg.insert(table).from_select(
+            ["id", "cart_id", "product_id", "quantity", "subtotal_price", "added_at"], source
         )
-        
-        # Update cart total
-        cart.total_price += subtotal
-        cart.updated_at = datetime.utcnow()
-        
-        db.add(cart_item)
-        db.add(cart)
+        quantity = insert.excluded.quantity if replace else table.c.quantity + insert.excluded.quantity
+        # excluded.subtotal_price is the current price times the new quantity
+        price = insert.excluded.subtotal_price / insert.excluded.quantity
+        return insert.on_conflict_do_update(
+            index_elements=[table.c.cart_id, table.c.product_id],
+            set_={"quantity": quantity, "subtotal_price": quantity * price}
+        )
+
+    @staticmethod
+    async def _upsert_items(
+        db: AsyncSession,
+        cart_condition,
+        quantities: Dict[uuid.UUID, int],
+        replace: bool,
+        now: datetime
+    ) -> Set[uuid.UUID]:
+        """Upsert many products into the cart matching cart_condition in one statement; returns the products written"""
+        # A fixed order keeps concurrent batches on the same cart from deadlocking
+        rows = [(uuid.uuid4(), product_id, quantities[product_id]) for product_id in sorted(quantities)]
+        changes = values(
+            column("id", pg.UUID(as_uuid=True)),
+            column("product_id", pg.UUID(as_uuid=True)),
+            column("quantity", Integer),
+            name="changes"
+        ).data(rows)
+        source = select(
+            changes.c.id,
+            Cart.id,
+            Product.id,
+            changes.c.quantity,
+            Product.price * changes.c.quantity,
+            literal(now, pg.TIMESTAMP(timezone=True))
+        ).select_from(changes).join(Product, Product.id == changes.c.product_id).join(Cart, cart_condition)
+        result = await db.execute(
+            CartService._upsert_statement(source, replace).returning(CartItem.__table__.c.product_id)
+        )
+        return set(result.scalars().all())
+
+    @staticmethod
+    async def _product_exists(db: AsyncSession, product_id: uuid.UUID) -> bool:
+        result = await db.execute(select(Product.id).where(Product.id == product_id))
+        return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    async def add_item_to_cart(db: AsyncSession, cart_id: uuid.UUID, item: CartItemCreate, current_user: User) -> CartItem:
+        CartService._check_role(current_user, "add items to cart")
+
+        if cart_store is not None:
+            stored = await cart_store.load(db, cart_id=cart_id)
+            if stored is None:
+                raise NotFoundError("Cart", cart_id)
+            return await CartService._stored_add_item(db, stored, item)
+
+        cart_item = await CartService._upsert_item(db, Cart.id == cart_id, item)
+        if cart_item is None:
+            # Only failures pay for finding out what was missing
+            if not await CartService._product_exists(db, item.product_id):
+                raise NotFoundError("Product", item.product_id)
+            raise NotFoundError("Cart", cart_id)
         await db.commit()
-        await db.refresh(cart_item)
-        
-        return ResponseHandler.create_success("Cart Item", cart_item.id, cart_item)
+
+        return ResponseHandler.create_success("Cart Item", cart_item["id"], cart_item)
+
+    @staticmethod
+    async def add_item_to_my_cart(db: AsyncSession, item: CartItemCreate, current_user: User) -> CartItem:
+        """
+        Add an item to the current user's cart, resolving the cart inside
+        the same statement instead of loading it first
+        """
+        CartService._check_role(current_user, "add items to cart")
+
+        if cart_store is not None:
+            stored = await CartService._stored_cart_of(db, current_user)
+            return await CartService._stored_add_item(db, stored, item)
+
+        cart_item = await CartService._upsert_item(db, Cart.user_id == current_user.id, item)
+        if cart_item is None:
+            if not await CartService._product_exists(db, item.product_id):
+                raise NotFoundError("Product", item.product_id)
+            # No cart yet (shouldn't happen): get_my_cart creates it
+            cart_response = await CartService.get_my_cart(db, current_user)
+            return await CartService.add_item_to_cart(db, cart_response['data']['id'], item, current_user)
+        await db.commit()
+
+        return ResponseHandler.create_success("Cart Item", cart_item["id"], cart_item)
 
     @staticmethod
     async def update_cart_item(
@@ -217,55 +473,42 @@ class CartService:
         item_update: CartItemUpdate,
         current_user: User
     ) -> CartItem:
-        # Only authenticated users can update cart items
-        if current_user.role not in [UserRole.NORMAL_USER, UserRole.SELLER, UserRole.ADMIN]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only authenticated users can update cart items"
+        CartService._check_role(current_user, "update cart items")
+
+        if cart_store is not None:
+            stored = await cart_store.load(db, cart_id=cart_id)
+            found = stored.find(item_id) if stored else None
+            if found is None:
+                raise NotFoundError("Cart Item", item_id)
+            product_id, cart_item = found
+            prices = await CartService._unit_prices(db, [product_id])
+            if product_id not in prices:
+                raise NotFoundError("Product", product_id)
+            quantity = item_update.quantity if item_update.quantity is not None else cart_item.quantity
+            cart_item = stored.set(product_id, quantity, prices[product_id])
+            await cart_store.put(stored)
+            return ResponseHandler.update_success(
+                "Cart Item", item_id, CartService._stored_item_dict(stored, product_id, cart_item)
             )
-        
-        # Get cart item
-        query = select(CartItem).where(
+
+        # Without a new quantity the item is only repriced
+        quantity = item_update.quantity if item_update.quantity is not None else CartItem.quantity
+        updated = update(CartItem).where(
             CartItem.id == item_id,
-            CartItem.cart_id == cart_id
-        )
-        result = await db.execute(query)
-        cart_item = result.scalar_one_or_none()
-        
-        if not cart_item:
+            CartItem.cart_id == cart_id,
+            Product.id == CartItem.product_id
+        ).values(
+            quantity=quantity,
+            subtotal_price=Product.price * quantity
+        ).returning(*CartItem.__table__.c).cte("updated")
+
+        result = await db.execute(CartService._touch_cart(updated, datetime.utcnow()))
+        row = result.mappings().one_or_none()
+        if row is None:
             raise NotFoundError("Cart Item", item_id)
-            
-        # Get product for price calculation
-        product_query = select(Product).where(Product.id == cart_item.product_id)
-        product_result = await db.execute(product_query)
-        product = product_result.scalar_one_or_none()
-        
-        if not product:
-            raise NotFoundError("Product", cart_item.product_id)
-            
-        # Get cart for total update
-        cart_query = select(Cart).where(Cart.id == cart_id)
-        cart_result = await db.execute(cart_query)
-        cart = cart_result.scalar_one_or_none()
-        
-        if not cart:
-            raise NotFoundError("Cart", cart_id)
-            
-        # Update quantity and recalculate prices
-        old_subtotal = cart_item.subtotal_price
-        cart_item.quantity = item_update.quantity
-        cart_item.subtotal_price = product.price * item_update.quantity
-        
-        # Update cart total
-        cart.total_price = cart.total_price - old_subtotal + cart_item.subtotal_price
-        cart.updated_at = datetime.utcnow()
-        
-        db.add(cart_item)
-        db.add(cart)
         await db.commit()
-        await db.refresh(cart_item)
-        
-        return ResponseHandler.update_success("Cart Item", item_id, cart_item)
+
+        return ResponseHandler.update_success("Cart Item", item_id, dict(row))
 
     @staticmethod
     async def remove_cart_item(
@@ -274,38 +517,258 @@ class CartService:
         item_id: uuid.UUID,
         current_user: User
     ) -> None:
-        # Only authenticated users can remove cart items
-        if current_user.role not in [UserRole.NORMAL_USER, UserRole.SELLER, UserRole.ADMIN]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only authenticated users can remove cart items"
+        CartService._check_role(current_user, "remove cart items")
+
+        if cart_store is not None:
+            stored = await cart_store.load(db, cart_id=cart_id)
+            found = stored.find(item_id) if stored else None
+            if found is None:
+                raise NotFoundError("Cart Item", item_id)
+            product_id, cart_item = found
+            stored.remove(product_id)
+            await cart_store.put(stored)
+            return ResponseHandler.delete_success(
+                "Cart Item", item_id, CartService._stored_item_dict(stored, product_id, cart_item)
             )
-        
-        # Get cart item
-        query = select(CartItem).where(
+
+        removed = delete(CartItem).where(
             CartItem.id == item_id,
             CartItem.cart_id == cart_id
-        )
-        result = await db.execute(query)
-        cart_item = result.scalar_one_or_none()
-        
-        if not cart_item:
+        ).returning(*CartItem.__table__.c).cte("removed")
+
+        result = await db.execute(CartService._touch_cart(removed, datetime.utcnow()))
+        row = result.mappings().one_or_none()
+        if row is None:
             raise NotFoundError("Cart Item", item_id)
-            
-        # Get cart for total update
-        cart_query = select(Cart).where(Cart.id == cart_id)
-        cart_result = await db.execute(cart_query)
-        cart = cart_result.scalar_one_or_none()
-        
-        if not cart:
-            raise NotFoundError("Cart", cart_id)
-            
-        # Update cart total
-        cart.total_price -= cart_item.subtotal_price
-        cart.updated_at = datetime.utcnow()
-        
-        await db.delete(cart_item)
-        db.add(cart)
         await db.commit()
-        
-        return ResponseHandler.delete_success("Cart Item", item_id, cart_item)
+
+        return ResponseHandler.delete_success("Cart Item", item_id, dict(row))
+
+    @staticmethod
+    def _fold_operations(batch: CartItemBatch) -> Dict[uuid.UUID, Tuple[CartItemOperationType, Optional[int]]]:
+        """
+        Reduce an ordered list of operations to one net change per product:
+        (ADD, n) raises the quantity by n, (UPDATE, n) sets it to n and
+        (REMOVE, None) deletes the item
+        """
+        changes: Dict[uuid.UUID, Tuple[CartItemOperationType, Optional[int]]] = {}
+        for operation in batch.operations:
+            if operation.op != CartItemOperationType.REMOVE and operation.quantity is None:
+                raise ValidationError(f"Quantity is required to {operation.op.value} product {operation.product_id}")
+            previous = changes.get(operation.product_id)
+            if operation.op == CartItemOperationType.ADD and previous is not None:
+                previous_op, previous_quantity = previous
+                if previous_op == CartItemOperationType.REMOVE:
+                    # Removed, then added back: the quantity is exactly what was added
+                    changes[operation.product_id] = (CartItemOperationType.UPDATE, operation.quantity)
+                else:
+                    changes[operation.product_id] = (previous_op, previous_quantity + operation.quantity)
+            else:
+                changes[operation.product_id] = (operation.op, operation.quantity)
+        return changes
+
+    @staticmethod
+    async def apply_item_batch(db: AsyncSession, batch: CartItemBatch, current_user: User):
+        """
+        Apply a list of add/update/remove operations to the current user's
+        cart in one transaction and return the resulting cart. Operations are
+        folded into one change per product first, then applied with one
+        statement per kind of change, whatever the number of products.
+        Products that don't exist are skipped and reported.
+        """
+        CartService._check_role(current_user, "update cart items")
+        if len(batch.operations) > Config.CART_BATCH_MAX_OPERATIONS:
+            raise ValidationError(f"At most {Config.CART_BATCH_MAX_OPERATIONS} operations can be applied at once")
+        changes = CartService._fold_operations(batch)
+
+        if cart_store is not None:
+            cart, failed = await CartService._stored_apply_batch(db, changes, current_user)
+        else:
+            cart, failed = await CartService._apply_batch(db, changes, current_user)
+        return {
+            "message": f"Applied changes to {len(changes) - len(failed)} of {len(changes)} products",
+            "data": {
+                "cart": cart,
+                "failed_product_ids": failed
+            }
+        }
+
+    @staticmethod
+    async def _apply_batch(
+        db: AsyncSession,
+        changes: Dict[uuid.UUID, Tuple[CartItemOperationType, Optional[int]]],
+        current_user: User
+    ) -> Tuple[dict, List[uuid.UUID]]:
+        result = await db.execute(select(Cart.id).where(Cart.user_id == current_user.id))
+        cart_id = result.scalar_one_or_none()
+        if cart_id is None:
+            # No cart yet (shouldn't happen): get_my_cart creates it
+            cart_response = await CartService.get_my_cart(db, current_user)
+            cart_id = cart_response['data']['id']
+
+        now = datetime.utcnow()
+        removed = [product_id for product_id, (op, _) in changes.items() if op == CartItemOperationType.REMOVE]
+        written: Set[uuid.UUID] = set(removed)
+        try:
+            if removed:
+                await db.execute(
+                    delete(CartItem).where(CartItem.cart_id == cart_id, CartItem.product_id.in_(removed))
+                )
+            for op in (CartItemOperationType.ADD, CartItemOperationType.UPDATE):
+                quantities = {product_id: quantity for product_id, (change_op, quantity) in changes.items() if change_op == op}
+                if quantities:
+                    written |= await CartService._upsert_items(
+                        db, Cart.id == cart_id, quantities, replace=op == CartItemOperationType.UPDATE, now=now
+                    )
+            await db.execute(update(Cart).where(Cart.id == cart_id).values(updated_at=now))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error updating cart: {str(e)}"
+            )
+
+        cart_response = await CartService.get_my_cart(db, current_user)
+        return cart_response["data"], [product_id for product_id in changes if product_id not in written]
+
+    # Guest carts, held client side in signed tokens --------------------------
+
+    @staticmethod
+    async def _guest_cart_body(db: AsyncSession, items: Dict[uuid.UUID, int]) -> dict:
+        """The guest cart joined with product fields, and its re-signed token"""
+        products = await cart_products(db, list(items))
+        # Products deleted since they were added drop out of the cart and its token
+        items = {product_id: quantity for product_id, quantity in items.items() if product_id in products}
+        cart_items = [
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "subtotal_price": Decimal(str(products[product_id]["price"])) * quantity,
+                "product": {name: products[product_id][name] for name in CART_PRODUCT_FIELDS}
+            }
+            for product_id, quantity in items.items()
+        ]
+        return {
+            "token": encode_guest_cart(items),
+            "cart": {
+                "total_price": sum((item["subtotal_price"] for item in cart_items), Decimal('0.00')),
+                "cart_items": cart_items
+            }
+        }
+
+    @staticmethod
+    async def get_guest_cart(db: AsyncSession, token: Optional[str]) -> dict:
+        """A guest cart from its token (or an empty one); reads the catalog only"""
+        items = decode_guest_cart(token) if token else {}
+        return ResponseHandler.get_single_success("Guest Cart", None, await CartService._guest_cart_body(db, items))
+
+    @staticmethod
+    async def apply_guest_batch(db: AsyncSession, token: Optional[str], batch: CartItemBatch) -> dict:
+        """
+        Apply add/update/remove operations to a guest cart and return it with
+        a new token. Products are checked against the catalog; nothing is
+        written to the database.
+        """
+        if len(batch.operations) > Config.CART_BATCH_MAX_OPERATIONS:
+            raise ValidationError(f"At most {Config.CART_BATCH_MAX_OPERATIONS} operations can be applied at once")
+        changes = CartService._fold_operations(batch)
+        items = decode_guest_cart(token) if token else {}
+        products = await cart_products(
+            db, [product_id for product_id, (op, _) in changes.items() if op != CartItemOperationType.REMOVE]
+        )
+        failed = []
+        for product_id, (op, quantity) in changes.items():
+            if op == CartItemOperationType.REMOVE:
+                items.pop(product_id, None)
+            elif product_id not in products:
+                failed.append(product_id)
+            elif op == CartItemOperationType.ADD:
+                items[product_id] = items.get(product_id, 0) + quantity
+            else:
+                items[product_id] = quantity
+        body = await CartService._guest_cart_body(db, items)
+        return {
+            "message": f"Applied changes to {len(changes) - len(failed)} of {len(changes)} products",
+            "data": {**body, "failed_product_ids": failed}
+        }
+
+    @staticmethod
+    async def add_guest_item(db: AsyncSession, token: Optional[str], item: CartItemCreate) -> dict:
+        batch = CartItemBatch(operations=[
+            CartItemOperation(op=CartItemOperationType.ADD, product_id=item.product_id, quantity=item.quantity)
+        ])
+        response = await CartService.apply_guest_batch(db, token, batch)
+        if response["data"]["failed_product_ids"]:
+            raise NotFoundError("Product", item.product_id)
+        return response
+
+    @staticmethod
+    async def merge_guest_cart(db: AsyncSession, user: User, items: Dict[uuid.UUID, int]) -> int:
+        """
+        Add a guest cart's items to the user's cart, raising quantities of
+        products already in it, with one batched upsert. Deleted products are
+        skipped. The caller commits; returns the number of products merged.
+        """
+        if not items:
+            return 0
+        if cart_store is not None:
+            stored = await CartService._stored_cart_of(db, user)
+            prices = await CartService._unit_prices(db, list(items))
+            for product_id, quantity in items.items():
+                if product_id in prices:
+                    stored.add(product_id, quantity, prices[product_id])
+            await cart_store.put(stored)
+            return len(prices)
+
+        now = datetime.utcnow()
+        merged = await CartService._upsert_items(db, Cart.user_id == user.id, items, replace=False, now=now)
+        if merged:
+            await db.execute(update(Cart).where(Cart.user_id == user.id).values(updated_at=now))
+        return len(merged)
+
+    @staticmethod
+    async def backfill_updated_at(db: AsyncSession) -> int:
+        """
+        Give carts that hold items but were never touched (rows from before
+        item changes stamped carts.updated_at) their creation time, so the
+        abandoned cart sweep, which walks updated_at, reaches them. Returns
+        the number of carts updated.
+        """
+        result = await db.execute(
+            update(Cart).where(
+                Cart.updated_at.is_(None),
+                exists().where(CartItem.cart_id == Cart.id)
+            ).values(updated_at=Cart.created_at).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def merge_duplicate_items(db: AsyncSession) -> int:
+        """
+        Fold repeated (cart, product) rows into the oldest one, summing
+        quantities and subtotals; needed once before the unique constraint
+        on cart_items can be created. Returns the number of rows removed.
+        """
+        duplicates = select(
+            CartItem.cart_id,
+            CartItem.product_id,
+            pg.array_agg(aggregate_order_by(CartItem.id, CartItem.added_at, CartItem.id))[1].label("keep_id"),
+            func.sum(CartItem.quantity).label("quantity"),
+            func.sum(CartItem.subtotal_price).label("subtotal_price")
+        ).group_by(CartItem.cart_id, CartItem.product_id).having(func.count() > 1).cte("duplicates")
+
+        await db.execute(
+            update(CartItem).where(CartItem.id == duplicates.c.keep_id).values(
+                quantity=duplicates.c.quantity,
+                subtotal_price=duplicates.c.subtotal_price
+            )
+        )
+        result = await db.execute(
+            delete(CartItem).where(
+                CartItem.cart_id == duplicates.c.cart_id,
+                CartItem.product_id == duplicates.c.product_id,
+                CartItem.id != duplicates.c.keep_id
+            )
+        )
+        return result.rowcount
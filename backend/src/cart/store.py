@@ -0,0 +1,354 @@
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import Integer, column, delete, tuple_, update, values
+from sqlalchemy.orm import selectinload
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.cart.models import Cart, CartItem
+from src.config import Config
+from src.db.main import async_session
+from src.product.cards import product_cards
+from src.product.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Product fields shown with each cart item, as in the database-backed response
+CART_PRODUCT_FIELDS = (
+    "id", "title", "description", "price", "discount_percentage", "rating",
+    "stock", "brand", "thumbnail", "images", "category_id"
+)
+
+@dataclass
+class StoredItem:
+    id: uuid.UUID
+    quantity: int
+    # Price when the item was last added or repriced, like cart_items.subtotal_price
+    unit_price: Decimal
+    added_at: datetime
+
+    @property
+    def subtotal_price(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+@dataclass
+class StoredCart:
+    """A cart as held by a CartStore; items are keyed by product id"""
+    cart_id: uuid.UUID
+    user_id: uuid.UUID
+    created_at: datetime
+    updated_at: Optional[datetime]
+    items: Dict[uuid.UUID, StoredItem] = field(default_factory=dict)
+    # Every change bumps revision; flushed_revision is the last one written to the database
+    revision: int = 0
+    flushed_revision: int = 0
+
+    @classmethod
+    def from_db(cls, cart: Cart) -> "StoredCart":
+        return cls(
+            cart_id=cart.id,
+            user_id=cart.user_id,
+            created_at=cart.created_at,
+            updated_at=cart.updated_at,
+            items={
+                item.product_id: StoredItem(item.id, item.quantity, item.subtotal_price / item.quantity, item.added_at)
+                for item in sorted(cart.cart_items, key=lambda item: item.added_at)
+            }
+        )
+
+    @property
+    def dirty(self) -> bool:
+        return self.revision != self.flushed_revision
+
+    @property
+    def total_price(self) -> Decimal:
+        return sum((item.subtotal_price for item in self.items.values()), Decimal('0.00'))
+
+    def _changed(self) -> None:
+        self.revision += 1
+        self.updated_at = datetime.utcnow()
+
+    def add(self, product_id: uuid.UUID, quantity: int, unit_price: Decimal) -> StoredItem:
+        """Raise the quantity of a product (adding it if needed) and reprice it"""
+        item = self.items.get(product_id)
+        if item is None:
+            item = self.items[product_id] = StoredItem(uuid.uuid4(), quantity, unit_price, datetime.utcnow())
+        else:
+            item.quantity += quantity
+            item.unit_price = unit_price
+        self._changed()
+        return item
+
+    def set(self, product_id: uuid.UUID, quantity: int, unit_price: Decimal) -> StoredItem:
+        """Set the quantity of a product (adding it if needed) and reprice it"""
+        item = self.items.get(product_id)
+        if item is None:
+            item = self.items[product_id] = StoredItem(uuid.uuid4(), quantity, unit_price, datetime.utcnow())
+        else:
+            item.quantity = quantity
+            item.unit_price = unit_price
+        self._changed()
+        return item
+
+    def remove(self, product_id: uuid.UUID) -> Optional[StoredItem]:
+        item = self.items.pop(product_id, None)
+        if item is not None:
+            self._changed()
+        return item
+
+    def find(self, item_id: uuid.UUID) -> Optional[Tuple[uuid.UUID, StoredItem]]:
+        """(product_id, item) of the item with this id"""
+        for product_id, item in self.items.items():
+            if item.id == item_id:
+                return product_id, item
+        return None
+
+class CartStore(ABC):
+    """
+    Carts held outside the database and written behind to carts/cart_items.
+
+    Backends only store and look up StoredCart objects; loading a cart from
+    the database on first use and flushing changed carts back are shared.
+    Once a cart is in the store the store is authoritative for it: the
+    database copy lags by at most one flush interval, and anything that
+    reads cart_items directly (checkout) must flush() that cart first.
+    """
+
+    def __init__(self):
+        self._flush_lock = asyncio.Lock()
+
+    @abstractmethod
+    async def get(self, user_id: uuid.UUID) -> Optional[StoredCart]:
+        ...
+
+    @abstractmethod
+    async def get_by_cart_id(self, cart_id: uuid.UUID) -> Optional[StoredCart]:
+        ...
+
+    @abstractmethod
+    async def put(self, cart: StoredCart) -> None:
+        """Save a cart after changing it"""
+
+    @abstractmethod
+    async def add(self, cart: StoredCart) -> StoredCart:
+        """Save a cart just loaded from the database, unless one is already stored; returns the stored one"""
+
+    @abstractmethod
+    async def discard(self, cart_id: uuid.UUID) -> None:
+        """Forget a cart, e.g. after it was changed in the database directly"""
+
+    @abstractmethod
+    async def dirty(self) -> List[StoredCart]:
+        """Carts with changes not yet flushed"""
+
+    async def load(
+        self,
+        db: AsyncSession,
+        user_id: Optional[uuid.UUID] = None,
+        cart_id: Optional[uuid.UUID] = None
+    ) -> Optional[StoredCart]:
+        """The stored cart of a user (or with an id), read from the database on first use"""
+        cart = await (self.get(user_id) if user_id is not None else self.get_by_cart_id(cart_id))
+        if cart is not None:
+            return cart
+        query = select(Cart).options(selectinload(Cart.cart_items))
+        if user_id is not None:
+            query = query.where(Cart.user_id == user_id)
+        else:
+            query = query.where(Cart.id == cart_id)
+        result = await db.execute(query)
+        db_cart = result.scalar_one_or_none()
+        if db_cart is None:
+            return None
+        # Another request may have loaded it while this one waited
+        return await self.add(StoredCart.from_db(db_cart))
+
+    async def flush(self, cart_ids: Optional[Iterable[uuid.UUID]] = None) -> None:
+        """
+        Write changed carts (all of them, or only cart_ids) to the database
+        with a few set-based statements. Changes made while the flush is in
+        flight stay pending for the next one; a failed flush keeps them all.
+        """
+        async with self._flush_lock:
+            wanted = set(cart_ids) if cart_ids is not None else None
+            carts = [cart for cart in await self.dirty() if wanted is None or cart.cart_id in wanted]
+            if not carts:
+                return
+            # What this flush writes, copied before the first await since items change in place
+            written = [
+                (cart, cart.revision, cart.updated_at, [
+                    (product_id, item.id, item.quantity, item.subtotal_price, item.added_at)
+                    for product_id, item in cart.items.items()
+                ])
+                for cart in carts
+            ]
+            async with async_session() as session:
+                try:
+                    await self._write(session, written)
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+            for cart, revision, _, _ in written:
+                cart.flushed_revision = max(cart.flushed_revision, revision)
+                # Unless it was discarded meanwhile
+                if await self.get_by_cart_id(cart.cart_id) is cart:
+                    await self.put(cart)
+            logger.debug(f"Flushed {len(written)} carts")
+
+    @staticmethod
+    async def _write(
+        db: AsyncSession,
+        written: List[Tuple[StoredCart, int, Optional[datetime], List[Tuple[Any, ...]]]]
+    ) -> None:
+        cart_ids = [cart.cart_id for cart, _, _, _ in written]
+        # A fixed order keeps concurrent flushes from other workers from deadlocking
+        rows = sorted((cart.cart_id, *item) for cart, _, _, items in written for item in items)
+
+        removed = delete(CartItem).where(CartItem.cart_id.in_(cart_ids))
+        if rows:
+            removed = removed.where(
+                tuple_(CartItem.cart_id, CartItem.product_id).notin_([(cart_id, product_id) for cart_id, product_id, *_ in rows])
+            )
+        await db.execute(removed)
+
+        if rows:
+            table = CartItem.__table__
+            changes = values(
+                column("cart_id", pg.UUID(as_uuid=True)),
+                column("product_id", pg.UUID(as_uuid=True)),
+                column("id", pg.UUID(as_uuid=True)),
+                column("quantity", Integer),
+                column("subtotal_price", pg.NUMERIC(10, 2)),
+                column("added_at", pg.TIMESTAMP(timezone=True)),
+                name="changes"
+            ).data(rows)
+            # Joining products skips items whose product was deleted meanwhile
+            source = select(
+                changes.c.id, changes.c.cart_id, changes.c.product_id,
+                changes.c.quantity, changes.c.subtotal_price, changes.c.added_at
+            ).select_from(changes).join(Product, Product.id == changes.c.product_id)
+            insert = pg.insert(table).from_select(
+                ["id", "cart_id", "product_id", "quantity", "subtotal_price", "added_at"], source
+            )
+            await db.execute(insert.on_conflict_do_update(
+                index_elements=[table.c.cart_id, table.c.product_id],
+                set_={
+                    # The store's item id wins, so items can be addressed by the same id either way
+                    "id": insert.excluded.id,
+                    "quantity": insert.excluded.quantity,
+                    "subtotal_price": insert.excluded.subtotal_price
+                }
+            ))
+
+        touched = values(
+            column("id", pg.UUID(as_uuid=True)),
+            column("updated_at", pg.TIMESTAMP(timezone=True)),
+            name="touched"
+        ).data(sorted((cart.cart_id, updated_at) for cart, _, updated_at, _ in written))
+        await db.execute(update(Cart).where(Cart.id == touched.c.id).values(updated_at=touched.c.updated_at))
+
+class InMemoryCartStore(CartStore):
+    """
+    Carts in per-process dicts. Carts with pending changes are kept apart
+    from the clean ones, which form an LRU; only clean carts are evicted
+    beyond max_carts, so eviction pops from the LRU's front in O(1).
+    put() files a cart under the right one after every change or flush.
+    """
+
+    def __init__(self, max_carts: int):
+        super().__init__()
+        self.max_carts = max_carts
+        self._clean: "OrderedDict[uuid.UUID, StoredCart]" = OrderedDict()
+        self._dirty: Dict[uuid.UUID, StoredCart] = {}
+        self._by_user: Dict[uuid.UUID, uuid.UUID] = {}
+
+    async def get(self, user_id: uuid.UUID) -> Optional[StoredCart]:
+        cart_id = self._by_user.get(user_id)
+        return await self.get_by_cart_id(cart_id) if cart_id is not None else None
+
+    async def get_by_cart_id(self, cart_id: uuid.UUID) -> Optional[StoredCart]:
+        cart = self._dirty.get(cart_id)
+        if cart is not None:
+            return cart
+        cart = self._clean.get(cart_id)
+        if cart is not None:
+            self._clean.move_to_end(cart_id)
+        return cart
+
+    async def put(self, cart: StoredCart) -> None:
+        if cart.dirty:
+            self._clean.pop(cart.cart_id, None)
+            self._dirty[cart.cart_id] = cart
+        else:
+            self._dirty.pop(cart.cart_id, None)
+            self._clean[cart.cart_id] = cart
+            self._clean.move_to_end(cart.cart_id)
+        self._by_user[cart.user_id] = cart.cart_id
+        self._evict()
+
+    async def add(self, cart: StoredCart) -> StoredCart:
+        existing = self._dirty.get(cart.cart_id) or self._clean.get(cart.cart_id)
+        if existing is not None:
+            return existing
+        await self.put(cart)
+        return cart
+
+    async def discard(self, cart_id: uuid.UUID) -> None:
+        cart = self._dirty.pop(cart_id, None) or self._clean.pop(cart_id, None)
+        if cart is not None:
+            self._by_user.pop(cart.user_id, None)
+
+    async def dirty(self) -> List[StoredCart]:
+        return list(self._dirty.values())
+
+    def _evict(self) -> None:
+        while len(self) > self.max_carts and self._clean:
+            cart_id, cart = self._clean.popitem(last=False)
+            if cart.dirty:
+                # Changed but not put() back yet; it isn't evictable
+                self._dirty[cart_id] = cart
+            else:
+                self._by_user.pop(cart.user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._clean) + len(self._dirty)
+
+async def cart_products(db: AsyncSession, product_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, Any]]:
+    """
+    Decoded product cards for stored cart items, from the product card cache
+    when the card is at most CART_STORE_PRODUCT_MAX_AGE_SECONDS old; the
+    others are read in one query. Deleted products are missing from the result.
+    """
+    products = {}
+    missing = []
+    for product_id in product_ids:
+        card = product_cards.recent(product_id, Config.CART_STORE_PRODUCT_MAX_AGE_SECONDS)
+        if card is None:
+            missing.append(product_id)
+        else:
+            products[product_id] = json.loads(card + b"}")
+    if missing:
+        result = await db.execute(select(Product).where(Product.id.in_(missing)))
+        for product in result.scalars().all():
+            products[product.id] = json.loads(product_cards.put(product) + b"}")
+    return products
+
+def create_cart_store(backend: str) -> Optional[CartStore]:
+    """The configured cart store; None keeps carts in the database only"""
+    if backend == "database":
+        return None
+    if backend == "memory":
+        return InMemoryCartStore(max_carts=Config.CART_STORE_MAX_CARTS)
+    raise ValueError(f"Unknown CART_STORE backend '{backend}'")
+
+
+cart_store = create_cart_store(Config.CART_STORE)
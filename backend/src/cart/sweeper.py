@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import delete, exists, func, literal, tuple_, update
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.auth.user.models import User
+from src.cart.models import Cart, CartItem, AbandonedCartItem, CartReminder
+from src.cart.store import cart_store
+from src.common.email_service import EmailService
+from src.config import Config
+from src.db.main import async_session, engine
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock held for a whole run, so one worker sweeps at a time
+SWEEP_LOCK_KEY = 0x63617274
+
+@dataclass
+class SweepStats:
+    carts_scanned: int = 0
+    chunks: int = 0
+    items_expired: int = 0
+    reminders_queued: int = 0
+    reminders_sent: int = 0
+    reminders_skipped: int = 0
+    reminders_failed: int = 0
+    seconds: float = 0.0
+
+class AbandonedCartSweeper:
+    """
+    Periodic job for carts left alone: the items of carts idle for more than
+    CART_ITEM_EXPIRY_DAYS are moved to abandoned_cart_items, and carts idle
+    for more than CART_REMINDER_AFTER_HOURS get a reminder email queued (if
+    their owner accepts marketing email), which are then sent in batches.
+
+    Idle carts with items are walked by (updated_at, id) keyset pagination
+    with plain reads, so the scan takes no locks on carts; every chunk is
+    handled by a couple of set-based statements in its own short transaction.
+    """
+
+    def __init__(self):
+        self.last_run: Optional[SweepStats] = None
+
+    async def run(self) -> None:
+        started = time.monotonic()
+        stats = SweepStats()
+        async with engine.connect() as lock_connection:
+            lock_connection = await lock_connection.execution_options(isolation_level="AUTOCOMMIT")
+            if not await lock_connection.scalar(select(func.pg_try_advisory_lock(SWEEP_LOCK_KEY))):
+                logger.debug("Abandoned cart sweep already running elsewhere")
+                return
+            try:
+                async with async_session() as session:
+                    await self._sweep(session, stats)
+                    await self._send_reminders(session, stats)
+            finally:
+                await lock_connection.scalar(select(func.pg_advisory_unlock(SWEEP_LOCK_KEY)))
+
+        stats.seconds = time.monotonic() - started
+        self.last_run = stats
+        logger.info(
+            f"Abandoned cart sweep: {stats.carts_scanned} carts scanned in {stats.chunks} chunks, "
+            f"{stats.items_expired} items expired, {stats.reminders_queued} reminders queued, "
+            f"{stats.reminders_sent} sent, {stats.reminders_skipped} skipped, {stats.reminders_failed} failed "
+            f"in {stats.seconds:.2f}s"
+        )
+
+    async def _sweep(self, session: AsyncSession, stats: SweepStats) -> None:
+        now = datetime.now(timezone.utc)
+        reminder_cutoff = now - timedelta(hours=Config.CART_REMINDER_AFTER_HOURS)
+        expiry_cutoff = now - timedelta(days=Config.CART_ITEM_EXPIRY_DAYS)
+        last = None
+        while True:
+            query = select(Cart.id, Cart.updated_at).where(
+                Cart.updated_at < reminder_cutoff,
+                exists().where(CartItem.cart_id == Cart.id)
+            )
+            if last is not None:
+                query = query.where(tuple_(Cart.updated_at, Cart.id) > tuple_(*last))
+            result = await session.execute(query.order_by(Cart.updated_at, Cart.id).limit(Config.CART_SWEEP_BATCH_SIZE))
+            rows = result.all()
+            if not rows:
+                break
+            stats.carts_scanned += len(rows)
+            stats.chunks += 1
+            last = tuple(rows[-1])
+
+            expired = [cart_id for cart_id, updated_at in rows if updated_at < expiry_cutoff]
+            idle = [cart_id for cart_id, updated_at in rows if updated_at >= expiry_cutoff]
+            if expired:
+                stats.items_expired += await self._expire_items(session, expired, expiry_cutoff, now)
+            if idle:
+                stats.reminders_queued += await self._queue_reminders(session, idle, reminder_cutoff, now)
+            await session.commit()
+            if expired and cart_store is not None:
+                await self._forget_stored_carts(expired)
+            if len(rows) < Config.CART_SWEEP_BATCH_SIZE:
+                break
+
+    @staticmethod
+    async def _expire_items(session: AsyncSession, cart_ids: List[uuid.UUID], cutoff: datetime, now: datetime) -> int:
+        """Move the items of carts (still) idle since before cutoff to abandoned_cart_items, in one statement"""
+        moved = delete(CartItem).where(
+            CartItem.cart_id.in_(cart_ids),
+            # Re-checked here, since the carts were read without locks
+            CartItem.cart_id == Cart.id,
+            Cart.updated_at < cutoff
+        ).returning(
+            CartItem.id, CartItem.cart_id, CartItem.product_id,
+            CartItem.quantity, CartItem.subtotal_price, CartItem.added_at
+        ).cte("moved")
+        archive = pg.insert(AbandonedCartItem.__table__).from_select(
+            ["id", "cart_id", "product_id", "quantity", "subtotal_price", "added_at", "abandoned_at"],
+            select(
+                moved.c.id, moved.c.cart_id, moved.c.product_id, moved.c.quantity,
+                moved.c.subtotal_price, moved.c.added_at, literal(now, pg.TIMESTAMP(timezone=True))
+            )
+        ).add_cte(moved)
+        result = await session.execute(archive)
+        return result.rowcount
+
+    @staticmethod
+    async def _queue_reminders(session: AsyncSession, cart_ids: List[uuid.UUID], cutoff: datetime, now: datetime) -> int:
+        """
+        Queue one reminder per cart and idle period for carts whose owner
+        accepts marketing email; returns the number queued
+        """
+        table = CartReminder.__table__
+        source = select(
+            Cart.id, Cart.user_id, Cart.updated_at, literal(now, pg.TIMESTAMP(timezone=True))
+        ).join(User, User.id == Cart.user_id).where(
+            Cart.id.in_(cart_ids),
+            Cart.updated_at < cutoff,
+            User.marketing_emails_enabled,
+            User.is_active
+        )
+        queue = pg.insert(table).from_select(["cart_id", "user_id", "cart_updated_at", "queued_at"], source)
+        queue = queue.on_conflict_do_update(
+            index_elements=[table.c.cart_id],
+            set_={
+                "cart_updated_at": queue.excluded.cart_updated_at,
+                "queued_at": queue.excluded.queued_at,
+                "sent_at": None
+            },
+            # Carts already reminded for this idle period are left alone
+            where=table.c.cart_updated_at < queue.excluded.cart_updated_at
+        )
+        result = await session.execute(queue)
+        return result.rowcount
+
+    @staticmethod
+    async def _forget_stored_carts(cart_ids: List[uuid.UUID]) -> None:
+        """Drop expired carts from the cart store so they are reloaded without their items"""
+        for cart_id in cart_ids:
+            stored = await cart_store.get_by_cart_id(cart_id)
+            # A cart with unflushed changes isn't idle; its next flush rewrites its items
+            if stored is not None and not stored.dirty:
+                await cart_store.discard(cart_id)
+
+    async def _send_reminders(self, session: AsyncSession, stats: SweepStats) -> None:
+        """
+        Send queued reminders in batches, each over one SMTP connection.
+        Reminders whose cart was changed or emptied since, or whose owner
+        opted out meanwhile, are dropped; failed sends stay queued for the
+        next run.
+        """
+        item_count = select(func.count()).where(CartItem.cart_id == CartReminder.cart_id).correlate(CartReminder).scalar_subquery()
+        last_cart_id = None
+        while True:
+            query = select(
+                CartReminder.cart_id,
+                User.email,
+                User.username,
+                item_count,
+                (Cart.updated_at == CartReminder.cart_updated_at) & User.marketing_emails_enabled & User.is_active
+            ).join(Cart, Cart.id == CartReminder.cart_id).join(User, User.id == CartReminder.user_id).where(
+                CartReminder.sent_at.is_(None)
+            )
+            if last_cart_id is not None:
+                query = query.where(CartReminder.cart_id > last_cart_id)
+            result = await session.execute(query.order_by(CartReminder.cart_id).limit(Config.CART_REMINDER_SEND_BATCH_SIZE))
+            rows = result.all()
+            if not rows:
+                break
+            last_cart_id = rows[-1][0]
+
+            due = [(cart_id, email, username, items) for cart_id, email, username, items, eligible in rows if eligible and items]
+            skipped = [row[0] for row in rows if not (row[4] and row[3])]
+            messages = [EmailService.cart_reminder_email(email, username, items) for _, email, username, items in due]
+            # smtplib blocks; keep it off the event loop
+            outcomes = await asyncio.to_thread(EmailService.send_emails, messages)
+            sent = [cart_id for (cart_id, *_), ok in zip(due, outcomes) if ok]
+
+            if sent:
+                await session.execute(
+                    update(CartReminder).where(CartReminder.cart_id.in_(sent)).values(sent_at=datetime.now(timezone.utc))
+                )
+            if skipped:
+                await session.execute(delete(CartReminder).where(CartReminder.cart_id.in_(skipped)))
+            await session.commit()
+            stats.reminders_sent += len(sent)
+            stats.reminders_skipped += len(skipped)
+            stats.reminders_failed += len(due) - len(sent)
+            if len(rows) < Config.CART_REMINDER_SEND_BATCH_SIZE:
+                break
+
+
+abandoned_cart_sweeper = AbandonedCartSweeper()
@@ -1,8 +1,10 @@
 from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import ForeignKey, String
 import uuid
 from typing import Optional, List, TYPE_CHECKING
 import sqlalchemy.dialects.postgresql as pg
 from datetime import datetime
+from decimal import Decimal
 
 if TYPE_CHECKING:
     from src.product.models import Product
@@ -21,6 +23,26 @@ class Category(SQLModel, table=True):
     )
     name: str = Field(index=True, nullable=False, unique=True)
     description: Optional[str] = Field(default=None, nullable=True)
+    
+    # Tree position. path is the materialized path of ids from the root down
+    # to this category ("/<root hex>/<child hex>/"), so a subtree is every
+    # category whose path starts with this one's: an index range scan, as
+    # path uses the "C" collation
+    parent_id: Optional[uuid.UUID] = Field(
+        default=None,
+        sa_column=Column(pg.UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True, index=True)
+    )
+    path: str = Field(
+        default="",
+        sa_column=Column(String(collation="C"), nullable=False, server_default="", index=True)
+    )
+    depth: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
+    
+    # Aggregates over the category's products, kept current by
+    # CategoryService.apply_product_changes so reads never touch products
+    product_count: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
+    min_price: Optional[Decimal] = Field(default=None, sa_column=Column(pg.NUMERIC(10, 2), nullable=True))
+    max_price: Optional[Decimal] = Field(default=None, sa_column=Column(pg.NUMERIC(10, 2), nullable=True))
     created_at: datetime = Field(
         sa_column=Column(
             pg.TIMESTAMP(timezone=True),
@@ -37,8 +59,19 @@ class Category(SQLModel, table=True):
         default=None
     )
     
-    # Relationship to products
+    # Relationship to products. Never loaded implicitly: ask for it with
+    # selectinload(Category.products). Products are never deleted through
+    # their category (delete_category refuses non-empty categories).
     products: List["Product"] = Relationship(
         back_populates="category",
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={"lazy": "raise", "passive_deletes": True}
     )
+
+
+def category_path(category_id: uuid.UUID, parent_path: str = "/") -> str:
+    """Materialized path of a category under a parent with the given path ("/" for roots)"""
+    return f"{parent_path}{category_id.hex}/"
+
+def subtree_upper_bound(path: str) -> str:
+    """The first path after every descendant of `path` in "C" collation order ("0" follows "/")"""
+    return path[:-1] + "0"
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Query, Path, status
+from fastapi import APIRouter, Depends, Query, Path, Request, status
 from src.db.main import get_db
 from src.category.schema import CategoryCreate, CategoryUpdate, CategoryResponse
 from src.category.service import CategoryService
 from src.common.exceptions import NotFoundError, ConflictError
+from src.common.etag import ConditionalGet
+from src.config import Config
 from src.auth.utils import require_admin
 from src.auth.user.models import User
 from typing import Dict, Any
@@ -10,6 +12,7 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 import uuid
 
 router = APIRouter()
+conditional = ConditionalGet(Config.CACHE_CONTROL_CATEGORIES)
 
 @router.get("/", response_model=Dict[str, Any])
 async def get_all_categories(
@@ -26,16 +29,26 @@ async def get_all_categories(
     except Exception as e:
         raise e
 
+@router.get("/tree", response_model=Dict[str, Any])
+async def get_category_tree(db: AsyncSession = Depends(get_db)):
+    """
+    Get the full category hierarchy. Each node has its own product_count and
+    total_product_count, which includes all subcategories.
+    """
+    return await CategoryService.get_category_tree(db)
+
 @router.get("/{category_id}")
 async def get_category(
+    request: Request,
     category_id: uuid.UUID = Path(..., description="The UUID of the category"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific category by its ID.
+    Supports If-None-Match: an unchanged category answers 304.
     """
     try:
-        return await CategoryService.get_category(db, category_id)
+        return conditional.respond(request, await CategoryService.get_category(db, category_id))
     except NotFoundError:
         raise
     except Exception as e:
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from decimal import Decimal
 from src.product.schema import Product
 import uuid
 
@@ -9,16 +10,23 @@ class CategoryBase(BaseModel):
     description: Optional[str] = Field(None, max_length=500)
 
 class CategoryCreate(CategoryBase):
-    pass
+    parent_id: Optional[uuid.UUID] = None
 
 class CategoryUpdate(BaseModel):
     name: Optional[str] = Field(None, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
+    # Moves the category (with its subtree); an explicit null makes it a root
+    parent_id: Optional[uuid.UUID] = None
 
 class CategoryResponse(CategoryBase):
     id: uuid.UUID
     created_at: datetime
     updated_at: Optional[datetime]
+    parent_id: Optional[uuid.UUID] = None
+    depth: int = 0
+    product_count: int = 0
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
     products: List[Product] = []
 
     class Config:
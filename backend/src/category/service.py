@@ -1,14 +1,147 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, func
-from src.category.models import Category
+from sqlmodel import select, func, exists
+from sqlalchemy import update, cast, Select, String
+from src.category.models import Category, category_path, subtree_upper_bound
+from src.category.tree import category_tree
+from src.product.models import Product
 from src.category.schema import CategoryCreate, CategoryUpdate
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from decimal import Decimal
 from fastapi import HTTPException, status
-from src.common.response import ResponseHandler
-from src.common.exceptions import NotFoundError, ConflictError
+from src.common.response import ResponseHandler, encode_json
+from src.common.etag import CachedBody, make_etag
+from src.common.exceptions import NotFoundError, ConflictError, ValidationError
+from src.common.cache import catalog_cache, PRODUCT_LIST_TAG
+from src.common.versions import cache_versions, CATEGORIES
+from fastapi.encoders import jsonable_encoder
 import uuid
+
+# (category_id, removed price, added price) of one product write
+ProductStatsChange = Tuple[uuid.UUID, Optional[Decimal], Optional[Decimal]]
+
 class CategoryService:
+    @staticmethod
+    def invalidate_cache() -> None:
+        """
+        Rebuild this worker's category cache on next use. Category writes
+        also bump the categories version, which reaches the other workers.
+        """
+        category_tree.mark_stale()
+
+    @staticmethod
+    async def _publish_change(db: AsyncSession) -> None:
+        """Commit a category write together with a new categories version"""
+        version = await cache_versions.bump(db, CATEGORIES)
+        await db.commit()
+        cache_versions.observe(CATEGORIES, version)
+
+    @staticmethod
+    def subtree_ids_query(category_id: uuid.UUID) -> Select:
+        """
+        Ids of a category and all of its descendants: one range scan over
+        the path index, bounded by the category's own path
+        """
+        path = select(Category.path).where(Category.id == category_id).scalar_subquery()
+        return select(Category.id).where(
+            Category.path >= path,
+            Category.path < func.concat(func.left(path, -1), "0")
+        )
+
+    @staticmethod
+    async def backfill_paths(db: AsyncSession) -> None:
+        """Give categories created before the tree existed their root path"""
+        await db.execute(
+            update(Category).where(Category.path == "").values(
+                path=func.concat("/", func.replace(cast(Category.id, String), "-", ""), "/"),
+                depth=0,
+                updated_at=Category.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def get_category_tree(db: AsyncSession) -> dict:
+        """The whole taxonomy as nested nodes, from the in-memory tree"""
+        await category_tree.ensure_current(db)
+        return {
+            "message": "Successfully retrieved category tree",
+            "data": jsonable_encoder(category_tree.to_list()),
+            "metadata": {"total": len(category_tree)}
+        }
+
+    @staticmethod
+    async def refresh_product_stats(db: AsyncSession) -> None:
+        """
+        Recompute product_count/min_price/max_price of every category from
+        scratch. Only needed to backfill; product writes keep the stats
+        current through apply_product_changes.
+        """
+        await db.execute(
+            update(Category).values(
+                product_count=select(func.count()).where(Product.category_id == Category.id).scalar_subquery(),
+                min_price=select(func.min(Product.price)).where(Product.category_id == Category.id).scalar_subquery(),
+                max_price=select(func.max(Product.price)).where(Product.category_id == Category.id).scalar_subquery(),
+                # Stats aren't an edit of the category itself
+                updated_at=Category.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def apply_product_changes(db: AsyncSession, changes: Iterable[ProductStatsChange]) -> None:
+        """
+        Fold product writes into their categories' stats. Each change is
+        (category_id, removed price, added price): a created product has no
+        removed price, a deleted one no added price, and a product moved to
+        another category is one change for each category. Call it after the
+        product writes, in the same transaction, before committing.
+
+        The count is adjusted by the difference; min/max are only recomputed,
+        by a probe of the (category_id, price) index, when a price that went
+        away was the current min or max.
+        """
+        deltas: Dict[uuid.UUID, Tuple[int, List[Decimal], List[Decimal]]] = {}
+        for category_id, removed, added in changes:
+            count, removed_prices, added_prices = deltas.setdefault(category_id, (0, [], []))
+            if removed is not None:
+                removed_prices.append(removed)
+            if added is not None:
+                added_prices.append(added)
+            deltas[category_id] = (count + (added is not None) - (removed is not None), removed_prices, added_prices)
+        if not deltas:
+            return
+
+        # FOR NO KEY UPDATE doesn't conflict with the KEY SHARE locks the
+        # products' foreign key checks already hold on these rows; id order
+        # keeps writers to several categories from deadlocking
+        result = await db.execute(
+            select(Category.id, Category.product_count, Category.min_price, Category.max_price)
+            .where(Category.id.in_(sorted(deltas)))
+            .order_by(Category.id)
+            .with_for_update(key_share=True)
+        )
+        for category_id, count, min_price, max_price in result.all():
+            delta, removed_prices, added_prices = deltas[category_id]
+            count = max(count + delta, 0)
+            if not count:
+                min_price = max_price = None
+            elif (min_price is None or max_price is None
+                  or min_price in removed_prices or max_price in removed_prices):
+                bounds = await db.execute(
+                    select(func.min(Product.price), func.max(Product.price)).where(Product.category_id == category_id)
+                )
+                min_price, max_price = bounds.one()
+            elif added_prices:
+                min_price = min(min_price, *added_prices)
+                max_price = max(max_price, *added_prices)
+            await db.execute(
+                update(Category).where(Category.id == category_id).values(
+                    product_count=count,
+                    min_price=min_price,
+                    max_price=max_price,
+                    updated_at=Category.updated_at
+                ).execution_options(synchronize_session=False)
+            )
+
     @staticmethod
     async def get_all_categories(
         db: AsyncSession,
@@ -17,19 +150,10 @@ class CategoryService:
         search: str = ""
     ) -> dict:
         try:
-            query = select(Category)
-            if search:
-                query = query.where(Category.name.ilike(f"%{search}%"))
-            query = query.offset(skip).limit(limit)
-            result = await db.execute(query)
-            categories = result.scalars().all()
-            
-            # Get total count for pagination
-            count_query = select(func.count()).select_from(Category)
-            if search:
-                count_query = count_query.where(Category.name.ilike(f"%{search}%"))
-            total = await db.scalar(count_query)
-            
+            # Served from memory; the database is only read when the
+            # categories version moved on since the cache was built
+            await category_tree.ensure_current(db)
+            categories, total = category_tree.page(skip, limit, search.strip())
             return {
                 "message": "Successfully retrieved categories",
                 "data": categories,
@@ -46,15 +170,33 @@ class CategoryService:
             )
 
     @staticmethod
-    async def get_category(db: AsyncSession, category_id: uuid.UUID) -> Category:
+    async def get_category(db: AsyncSession, category_id: uuid.UUID) -> CachedBody:
+        """
+        Return the encoded category response and its ETag, from the
+        in-memory category cache.
+        """
+        await category_tree.ensure_current(db)
+        cached = category_tree.detail(category_id)
+        if cached is not None:
+            return cached
+        
+        # Possibly created by another worker since the last version poll
         query = select(Category).where(Category.id == category_id)
         result = await db.execute(query)
         category = result.scalar_one_or_none()
         
         if not category:
             raise NotFoundError("Category", category_id)
-            
-        return ResponseHandler.get_single_success("Category", category_id, category)
+        category_tree.mark_stale()
+        
+        response = CachedBody(
+            etag=make_etag(
+                "category", category.id, category.updated_at or category.created_at,
+                category.product_count, category.min_price, category.max_price
+            ),
+            body=encode_json(ResponseHandler.get_single_success("Category", category_id, category))
+        )
+        return response
 
     @staticmethod
     async def create_category(db: AsyncSession, category: CategoryCreate) -> Category:
@@ -66,10 +208,22 @@ class CategoryService:
         if existing_category:
             raise ConflictError(f"Category with name '{category.name}' already exists")
         
-        db_category = Category(**category.model_dump())
+        parent_path, depth = "/", 0
+        if category.parent_id is not None:
+            parent = await CategoryService._get_parent(db, category.parent_id)
+            parent_path, depth = parent.path, parent.depth + 1
+        
+        category_id = uuid.uuid4()
+        db_category = Category(
+            id=category_id,
+            **category.model_dump(),
+            path=category_path(category_id, parent_path),
+            depth=depth
+        )
         db.add(db_category)
-        await db.commit()
+        await CategoryService._publish_change(db)
         await db.refresh(db_category)
+        CategoryService.invalidate_cache()
         return ResponseHandler.create_success("Category", db_category.id, db_category)
 
     @staticmethod
@@ -95,15 +249,25 @@ class CategoryService:
             if existing_category:
                 raise ConflictError(f"Category with name '{category_update.name}' already exists")
         
+        changes = category_update.model_dump(exclude_unset=True)
+        moved = "parent_id" in changes and changes["parent_id"] != db_category.parent_id
+        if moved:
+            await CategoryService._move(db, db_category, changes.pop("parent_id"))
+        changes.pop("parent_id", None)
+        
         # Update fields
-        for key, value in category_update.model_dump(exclude_unset=True).items():
+        for key, value in changes.items():
             setattr(db_category, key, value)
         
         db_category.updated_at = datetime.utcnow()
         
         db.add(db_category)
-        await db.commit()
+        await CategoryService._publish_change(db)
         await db.refresh(db_category)
+        CategoryService.invalidate_cache()
+        if moved:
+            # Product listings by category cover subtrees
+            catalog_cache.invalidate(PRODUCT_LIST_TAG)
         
         return ResponseHandler.update_success("Category", category_id, db_category)
 
@@ -116,11 +280,50 @@ class CategoryService:
         if not category:
             raise NotFoundError("Category", category_id)
         
+        has_children = await db.scalar(select(exists().where(Category.parent_id == category_id)))
+        if has_children:
+            raise ConflictError(f"Cannot delete category with ID {category_id} as it has subcategories")
+        
         # Check if category has products
-        if len(category.products) > 0:
+        has_products = await db.scalar(select(exists().where(Product.category_id == category_id)))
+        if has_products:
             raise ConflictError(f"Cannot delete category with ID {category_id} as it has associated products")
             
         await db.delete(category)
-        await db.commit()
+        await CategoryService._publish_change(db)
+        CategoryService.invalidate_cache()
+        
+        return ResponseHandler.delete_success("Category", category_id, category)
+
+    @staticmethod
+    async def _get_parent(db: AsyncSession, parent_id: uuid.UUID) -> Category:
+        result = await db.execute(select(Category).where(Category.id == parent_id))
+        parent = result.scalar_one_or_none()
+        if not parent:
+            raise NotFoundError("Category", parent_id)
+        return parent
+
+    @staticmethod
+    async def _move(db: AsyncSession, category: Category, parent_id: Optional[uuid.UUID]) -> None:
+        """Re-parent a category, rewriting the path and depth of its whole subtree in one UPDATE"""
+        parent_path, depth = "/", 0
+        if parent_id is not None:
+            parent = await CategoryService._get_parent(db, parent_id)
+            if parent.path.startswith(category.path):
+                raise ValidationError("A category cannot be moved under itself or one of its subcategories")
+            parent_path, depth = parent.path, parent.depth + 1
         
-        return ResponseHandler.delete_success("Category", category_id, category)
\ No newline at end of file
+        old_path = category.path
+        new_path = category_path(category.id, parent_path)
+        await db.execute(
+            update(Category).where(
+                Category.path >= old_path,
+                Category.path < subtree_upper_bound(old_path)
+            ).values(
+                path=func.concat(new_path, func.substr(Category.path, len(old_path) + 1)),
+                depth=Category.depth + (depth - category.depth)
+            ).execution_options(synchronize_session=False)
+        )
+        category.parent_id = parent_id
+        category.path = new_path
+        category.depth = depth
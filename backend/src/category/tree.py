@@ -0,0 +1,198 @@
+import asyncio
+import bisect
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.category.models import Category, subtree_upper_bound
+from src.common.etag import CachedBody, make_etag
+from src.common.response import ResponseHandler, encode_json
+from src.common.versions import cache_versions, CATEGORIES
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CategoryNode:
+    id: uuid.UUID
+    name: str
+    parent_id: Optional[uuid.UUID]
+    path: str
+    depth: int
+    product_count: int
+    # The category as returned by the API
+    data: Dict[str, Any]
+    etag: str
+    # Products in this category and all of its descendants
+    total_product_count: int = 0
+    children: List["CategoryNode"] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Explicit stack instead of recursion; the taxonomy depth is unbounded
+        root = self._fields()
+        stack = [(self, root)]
+        while stack:
+            node, encoded = stack.pop()
+            for child in node.children:
+                child_encoded = child._fields()
+                encoded["children"].append(child_encoded)
+                stack.append((child, child_encoded))
+        return root
+
+    def _fields(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "product_count": self.product_count,
+            "total_product_count": self.total_product_count,
+            "children": []
+        }
+
+class CategoryTree:
+    """
+    The whole category taxonomy, held in memory and serving every category
+    read without a database round trip.
+
+    The tree is built for one version of the "categories" dataset (see
+    CacheVersions): category writes bump that version, so each worker
+    notices on its next version poll and rebuilds. Product stats don't bump
+    it; they are picked up locally right away (mark_stale) and elsewhere
+    within CATEGORY_CACHE_MAX_AGE_SECONDS.
+
+    Nodes are kept sorted by materialized path, so a subtree is one
+    contiguous slice found by binary search (the same prefix range the
+    ix_categories_path index serves in SQL).
+    """
+
+    def __init__(self):
+        self._nodes: Dict[uuid.UUID, CategoryNode] = {}
+        self._paths: List[str] = []
+        self._ordered: List[CategoryNode] = []
+        self._by_name: List[CategoryNode] = []
+        self._roots: List[CategoryNode] = []
+        self._details: Dict[uuid.UUID, CachedBody] = {}
+        self._lock = asyncio.Lock()
+        self._stale = True
+        self.version = -1
+        self.loaded_at = 0.0
+        self.loaded = False
+
+    def is_current(self) -> bool:
+        return (
+            self.loaded
+            and not self._stale
+            and self.version == cache_versions.current(CATEGORIES)
+            # Intentional even when the version is unchanged: product writes
+            # update category stats without bumping it (that would rebuild
+            # every worker's tree on every product write), so this age limit
+            # is how other workers pick up new counts and price ranges
+            and time.time() - self.loaded_at < Config.CATEGORY_CACHE_MAX_AGE_SECONDS
+        )
+
+    def mark_stale(self) -> None:
+        """Rebuild on next use; for changes that don't bump the version (product stats)"""
+        self._stale = True
+
+    async def ensure_current(self, db: AsyncSession) -> None:
+        if self.is_current():
+            return
+        async with self._lock:
+            # Another request may have rebuilt it while this one waited
+            if not self.is_current():
+                await self.load(db)
+
+    async def load(self, db: AsyncSession) -> None:
+        # Taken before reading, so the rows are at least as new as the version
+        version = cache_versions.current(CATEGORIES)
+        self._stale = False
+        result = await db.execute(select(Category))
+        nodes_read = []
+        for category in result.scalars().all():
+            nodes_read.append(CategoryNode(
+                id=category.id,
+                name=category.name,
+                parent_id=category.parent_id,
+                path=category.path,
+                depth=category.depth,
+                product_count=category.product_count,
+                data=jsonable_encoder(category),
+                etag=make_etag(
+                    "category", category.id, category.updated_at or category.created_at,
+                    category.product_count, category.min_price, category.max_price
+                )
+            ))
+        # Sorted here rather than in SQL: the bisects below need code point order
+        ordered = sorted(nodes_read, key=lambda node: node.path)
+        nodes = {node.id: node for node in ordered}
+        roots = []
+        for node in ordered:
+            # Path order puts every parent before its children
+            parent = nodes.get(node.parent_id) if node.parent_id else None
+            (parent.children if parent else roots).append(node)
+        # Deepest first, so each child's total is final before it is added to its parent's
+        for node in sorted(ordered, key=lambda node: node.depth, reverse=True):
+            node.total_product_count += node.product_count
+            parent = nodes.get(node.parent_id) if node.parent_id else None
+            if parent:
+                parent.total_product_count += node.total_product_count
+
+        # Swap in one step so concurrent readers never see a half-built tree
+        self._nodes = nodes
+        self._paths = [node.path for node in ordered]
+        self._ordered = ordered
+        self._by_name = sorted(ordered, key=lambda node: (node.name.lower(), node.id))
+        self._roots = roots
+        self._details = {}
+        self.version = version
+        self.loaded_at = time.time()
+        self.loaded = True
+        logger.info(f"Category tree version {version} loaded with {len(nodes)} categories")
+
+    def get(self, category_id: uuid.UUID) -> Optional[CategoryNode]:
+        return self._nodes.get(category_id)
+
+    def page(self, skip: int, limit: int, search: str = "") -> Tuple[List[Dict[str, Any]], int]:
+        """Categories ordered by name, optionally those whose name contains `search`; returns (page, total)"""
+        matches = self._by_name
+        if search:
+            needle = search.lower()
+            matches = [node for node in matches if needle in node.name.lower()]
+        return [node.data for node in matches[skip:skip + limit]], len(matches)
+
+    def detail(self, category_id: uuid.UUID) -> Optional[CachedBody]:
+        """The encoded single-category response and its ETag, built once per tree version"""
+        cached = self._details.get(category_id)
+        if cached is None:
+            node = self._nodes.get(category_id)
+            if node is None:
+                return None
+            cached = CachedBody(
+                etag=node.etag,
+                body=encode_json(ResponseHandler.get_single_success("Category", category_id, node.data))
+            )
+            self._details[category_id] = cached
+        return cached
+
+    def subtree_ids(self, category_id: uuid.UUID) -> List[uuid.UUID]:
+        """The category and all of its descendants; empty if it is unknown"""
+        node = self._nodes.get(category_id)
+        if node is None:
+            return []
+        start = bisect.bisect_left(self._paths, node.path)
+        end = bisect.bisect_left(self._paths, subtree_upper_bound(node.path), lo=start)
+        return [descendant.id for descendant in self._ordered[start:end]]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [root.to_dict() for root in self._roots]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+category_tree = CategoryTree()
@@ -0,0 +1,124 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from src.config import Config
+
+class ResponseCache:
+    """
+    Bounded in-process cache for read-mostly API responses.
+
+    Entries expire after a fixed TTL and the least recently used entry is
+    evicted once the cache is full. Every entry carries tags naming the data
+    it was built from, so a write can drop exactly the responses it affects.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(namespace: str, case_insensitive: Iterable[str] = (), **params: Any) -> str:
+        """
+        Build a key from normalized query parameters: unset values are
+        dropped and order doesn't matter. Only the params named in
+        case_insensitive (those matched case-insensitively, like free-text
+        search) are trimmed and lowercased; any other text, e.g. an opaque
+        cursor, is kept verbatim.
+        """
+        case_insensitive = set(case_insensitive)
+        normalized = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, str) and name in case_insensitive:
+                value = " ".join(value.lower().split())
+            normalized[name] = value
+        return namespace + ":" + json.dumps(normalized, sort_keys=True, default=str, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._discard(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of the given tags"""
+        keys = set()
+        for tag in tags:
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self._discard(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+# Tags shared by the catalog services
+PRODUCT_LIST_TAG = "product-list"
+
+def product_tag(product_id: Any) -> str:
+    return f"product:{product_id}"
+
+
+catalog_cache = ResponseCache(
+    max_entries=Config.CATALOG_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.CATALOG_CACHE_TTL_SECONDS
+)
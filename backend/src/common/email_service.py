@@ -1,7 +1,7 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from src.config import Config
 import logging
 
@@ -48,19 +48,7 @@ class EmailService:
             bool: True if email was sent successfully, False otherwise
         """
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = Config.EMAIL_FROM
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Attach plain text version
-            text_part = MIMEText(body, 'plain')
-            msg.attach(text_part)
-            
-            # Attach HTML version if provided
-            if html_body:
-                html_part = MIMEText(html_body, 'html')
-                msg.attach(html_part)
+            msg = EmailService._build_message(to_email, subject, body, html_body)
             
             # Send email
             with EmailService._create_smtp_connection() as server:
@@ -72,6 +60,96 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
 
+    @staticmethod
+    def _build_message(to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = Config.EMAIL_FROM
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Attach plain text version
+        text_part = MIMEText(body, 'plain')
+        msg.attach(text_part)
+        
+        # Attach HTML version if provided
+        if html_body:
+            html_part = MIMEText(html_body, 'html')
+            msg.attach(html_part)
+        return msg
+
+    @staticmethod
+    def send_emails(messages: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """
+        Send many emails over one SMTP connection
+        
+        Args:
+            messages: (to_email, subject, body, html_body) tuples
+            
+        Returns:
+            List[bool]: Whether each email was sent, in order
+        """
+        if not messages:
+            return []
+        try:
+            server = EmailService._create_smtp_connection()
+        except Exception:
+            return [False] * len(messages)
+        sent = []
+        with server:
+            for to_email, subject, body, html_body in messages:
+                try:
+                    server.send_message(EmailService._build_message(to_email, subject, body, html_body))
+                    sent.append(True)
+                except Exception as e:
+                    logger.error(f"Failed to send email to {to_email}: {str(e)}")
+                    sent.append(False)
+        logger.info(f"Sent {sum(sent)} of {len(messages)} emails")
+        return sent
+
+    @staticmethod
+    def cart_reminder_email(to_email: str, username: str, item_count: int) -> Tuple[str, str, str, str]:
+        """
+        Reminder about items left in the cart, as a message for send_emails()
+        
+        Args:
+            to_email: User's email address
+            username: User's username
+            item_count: Number of products in the cart
+        """
+        subject = "You left something in your cart"
+        items = "1 item" if item_count == 1 else f"{item_count} items"
+        cart_url = f"{Config.FRONTEND_URL}/cart"
+        
+        body = f"""
+Hello {username},
+
+You still have {items} waiting in your cart at Artisans Alley.
+
+Pick up where you left off: {cart_url}
+
+Best regards,
+Artisans Alley Team
+        """.strip()
+        
+        html_body = f"""
+<!DOCTYPE html>
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h2>Your cart is waiting</h2>
+        <p>Hello {username},</p>
+        <p>You still have {items} waiting in your cart at Artisans Alley.</p>
+        <p style="text-align: center;">
+            <a href="{cart_url}" style="display: inline-block; padding: 12px 24px; background-color: #4CAF50; color: white; text-decoration: none; border-radius: 4px;">Return to your cart</a>
+        </p>
+        <p>Best regards,<br>Artisans Alley Team</p>
+    </div>
+</body>
+</html>
+        """.strip()
+        
+        return to_email, subject, body, html_body
+
     @staticmethod
     def send_verification_email(
         to_email: str,
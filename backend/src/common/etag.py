@@ -0,0 +1,50 @@
+import hashlib
+from typing import Any, NamedTuple, Optional
+from fastapi import Request, status
+from fastapi.responses import Response
+
+class CachedBody(NamedTuple):
+    """An encoded JSON response body together with its strong ETag"""
+    etag: str
+    body: bytes
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the values identifying a representation (id, row version, ...)"""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+class ConditionalGet:
+    """
+    ETag / If-None-Match handling with one Cache-Control policy, shared by
+    the GET endpoints of a router.
+    """
+
+    def __init__(self, cache_control: str):
+        self.cache_control = cache_control
+
+    def _headers(self, etag: str) -> dict:
+        headers = {"ETag": etag}
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+        return headers
+
+    @staticmethod
+    def is_fresh(request: Request, etag: str) -> bool:
+        """True when the client's If-None-Match already names this representation"""
+        header: Optional[str] = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored
+        candidates = (candidate.strip() for candidate in header.split(","))
+        return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+    def not_modified(self, etag: str) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self._headers(etag))
+
+    def respond(self, request: Request, cached: CachedBody) -> Response:
+        """304 if the client is up to date, otherwise the full body"""
+        if self.is_fresh(request, cached.etag):
+            return self.not_modified(cached.etag)
+        return Response(content=cached.body, media_type="application/json", headers=self._headers(cached.etag))
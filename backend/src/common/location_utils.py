@@ -1,5 +1,13 @@
 import math
-from typing import Optional, Tuple
+import numpy as np
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import func, literal
+
+# Mean radius of the earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+# Length of one degree of latitude in kilometers
+KM_PER_DEGREE_LAT = 111.045
 
 class LocationUtils:
     """Utility class for location-based operations"""
@@ -26,10 +34,7 @@ class LocationUtils:
         a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
         c = 2 * math.asin(math.sqrt(a))
         
-        # Radius of earth in kilometers
-        r = 6371
-        
-        return c * r
+        return c * EARTH_RADIUS_KM
     
     @staticmethod
     def calculate_distance(
@@ -77,3 +82,108 @@ class LocationUtils:
         else:
             return f"{int(distance)} km"
 
+    @staticmethod
+    def bounding_box(
+        lat: float,
+        lon: float,
+        radius_km: float
+    ) -> Tuple[float, float, Optional[float], Optional[float]]:
+        """
+        Calculate a lat/lon box that fully contains the circle of radius_km
+        around the given point. Used as a cheap, index-friendly prefilter
+        before the exact haversine check.
+
+        Returns (min_lat, max_lat, min_lon, max_lon). The longitude bounds are
+        None when the box touches a pole or crosses the antimeridian, in which
+        case only the latitude bounds should be applied.
+        """
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        min_lat = max(lat - dlat, -90.0)
+        max_lat = min(lat + dlat, 90.0)
+
+        if min_lat <= -90.0 or max_lat >= 90.0:
+            return min_lat, max_lat, None, None
+
+        # The circle is widest poleward of its center, where meridians are
+        # closer together: its extreme longitudes lie at
+        # asin(sin(r) / cos(lat)) from the center, r being the angular radius
+        spread = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+        if spread >= 1.0:
+            return min_lat, max_lat, None, None
+
+        dlon = math.degrees(math.asin(spread))
+        min_lon = lon - dlon
+        max_lon = lon + dlon
+        if min_lon < -180.0 or max_lon > 180.0:
+            return min_lat, max_lat, None, None
+
+        return min_lat, max_lat, min_lon, max_lon
+
+    @staticmethod
+    def haversine_sql(lat_column, lon_column, lat: float, lon: float):
+        """
+        Build a SQL expression computing the haversine distance (km) between
+        the given columns and a fixed point. Evaluates to NULL when either
+        column is NULL, matching calculate_distance().
+        """
+        dlat = func.radians(lat_column - lat)
+        dlon = func.radians(lon_column - lon)
+        a = (
+            func.power(func.sin(dlat / 2.0), 2)
+            + math.cos(math.radians(lat)) * func.cos(func.radians(lat_column)) * func.power(func.sin(dlon / 2.0), 2)
+        )
+        # least() guards asin() against rounding pushing the argument above 1
+        return 2.0 * EARTH_RADIUS_KM * func.asin(func.least(literal(1.0), func.sqrt(a)))
+
+    @staticmethod
+    def haversine_distances(
+        origin_lat: float,
+        origin_lon: float,
+        lats: Sequence[Optional[float]],
+        lons: Sequence[Optional[float]]
+    ) -> np.ndarray:
+        """
+        Vectorized haversine_distance from one origin to many points.
+
+        lats/lons may be lists (None allowed) or float arrays (NaN allowed).
+        Returns a float64 array of distances in kilometers, with NaN wherever
+        a point's coordinates are missing.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        missing = np.isnan(lats) | np.isnan(lons)
+
+        lat1 = math.radians(origin_lat)
+        lon1 = math.radians(origin_lon)
+        lat2 = np.radians(lats)
+        lon2 = np.radians(lons)
+
+        with np.errstate(invalid="ignore"):
+            a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+            distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        distances[missing] = np.nan
+        return distances
+
+    @staticmethod
+    def within_radius_mask(distances: np.ndarray, max_distance_km: Optional[float]) -> np.ndarray:
+        """
+        Vectorized is_within_radius: missing distances (NaN) and a missing
+        radius never filter anything out.
+        """
+        if max_distance_km is None:
+            return np.ones(len(distances), dtype=bool)
+        return np.isnan(distances) | (distances <= max_distance_km)
+
+    @staticmethod
+    def order_by_distance(distances: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Return the indices that sort distances nearest first, with missing
+        distances last. With a limit only the first `limit` indices are
+        produced, using a partial sort.
+        """
+        # NaN sorts after every number, which puts unknown distances last
+        if limit is not None and limit < len(distances):
+            nearest = np.argpartition(distances, limit)[:limit]
+            return nearest[np.argsort(distances[nearest], kind="stable")]
+        return np.argsort(distances, kind="stable")
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence
+from sqlalchemy import literal, tuple_
+from src.common.exceptions import ValidationError
+
+class CursorPagination:
+    """
+    Opaque keyset cursors.
+
+    A cursor records the sort key of the last row a client has seen, plus the
+    name of the ordering it belongs to. The next page is then a range scan
+    starting right after that key, so deep pages cost the same as the first.
+    """
+
+    @staticmethod
+    def encode(order: str, key: Sequence[Any]) -> str:
+        payload = json.dumps({"o": order, "k": list(key)}, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode(cursor: str, order: str) -> List[Any]:
+        """Return the key stored in a cursor issued for the given ordering"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            key = payload["k"]
+            cursor_order = payload["o"]
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise ValidationError("Invalid pagination cursor")
+        if cursor_order != order or not isinstance(key, list):
+            raise ValidationError("Pagination cursor does not match the requested ordering")
+        return key
+
+    @staticmethod
+    def after(columns: Sequence[Any], key: Sequence[Any], descending: bool):
+        """
+        Row-value predicate selecting rows strictly after key in
+        (columns...) order. Postgres answers it straight from a matching
+        composite index.
+        """
+        # Bind each value with its column's type (e.g. timestamptz)
+        values = tuple_(*[literal(value, type_=column.type) for column, value in zip(columns, key)])
+        if descending:
+            return tuple_(*columns) < values
+        return tuple_(*columns) > values
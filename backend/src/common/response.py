@@ -1,5 +1,13 @@
+import json
 from typing import Any, Optional, Dict
 from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+def encode_json(value: Any) -> bytes:
+    """Encode exactly like FastAPI's JSONResponse, so pre-encoded bodies match it byte for byte"""
+    return _encoder.encode(jsonable_encoder(value)).encode("utf-8")
 
 class ResponseHandler:
     @staticmethod
@@ -0,0 +1,164 @@
+import math
+import logging
+import numpy as np
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.auth.user.models import User, UserRole
+from src.common.location_utils import LocationUtils
+
+logger = logging.getLogger(__name__)
+
+# Roles whose location matters for product lookups (anyone who can list products)
+INDEXED_ROLES = (UserRole.SELLER, UserRole.ADMIN)
+
+# Half the earth's circumference; no two points are further apart than this
+MAX_SEARCH_RADIUS_KM = 20038.0
+
+# Allowance for clock differences between the workers stamping users.updated_at
+CLOCK_SKEW = timedelta(minutes=1)
+
+Cell = Tuple[int, int]
+
+class SellerSpatialIndex:
+    """
+    In-process grid index over seller locations.
+
+    Sellers are bucketed into fixed-size lat/lon cells, so a radius query only
+    has to look at the handful of cells overlapping the search circle instead
+    of every seller in the table.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.5):
+        self.cell_size_deg = cell_size_deg
+        self._cells: Dict[Cell, Set[uuid.UUID]] = defaultdict(set)
+        self._locations: Dict[uuid.UUID, Tuple[float, float]] = {}
+        self.loaded = False
+        # Users created or updated after this may be missing or misplaced
+        self.loaded_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _cell_for(self, lat: float, lon: float) -> Cell:
+        return (
+            int(math.floor(lat / self.cell_size_deg)),
+            int(math.floor(lon / self.cell_size_deg))
+        )
+
+    async def load(self, db: AsyncSession) -> None:
+        """(Re)build the index from the users table"""
+        started = datetime.utcnow()
+        query = select(User.id, User.latitude, User.longitude).where(
+            User.role.in_(INDEXED_ROLES),
+            User.latitude.is_not(None),
+            User.longitude.is_not(None)
+        )
+        result = await db.execute(query)
+
+        cells: Dict[Cell, Set[uuid.UUID]] = defaultdict(set)
+        locations: Dict[uuid.UUID, Tuple[float, float]] = {}
+        for seller_id, lat, lon in result.all():
+            locations[seller_id] = (lat, lon)
+            cells[self._cell_for(lat, lon)].add(seller_id)
+
+        # Swap in one step so concurrent readers never see a half-built index
+        self._cells, self._locations = cells, locations
+        self.loaded_at = started - CLOCK_SKEW
+        self.loaded = True
+        logger.info(f"Seller spatial index loaded with {len(locations)} sellers")
+
+    def upsert(self, seller_id: uuid.UUID, lat: Optional[float], lon: Optional[float]) -> None:
+        """Add or move a seller. A missing coordinate removes the seller."""
+        self.remove(seller_id)
+        if lat is None or lon is None:
+            return
+        self._locations[seller_id] = (lat, lon)
+        self._cells[self._cell_for(lat, lon)].add(seller_id)
+
+    def remove(self, seller_id: uuid.UUID) -> None:
+        location = self._locations.pop(seller_id, None)
+        if location is None:
+            return
+        cell = self._cell_for(*location)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(seller_id)
+            if not members:
+                del self._cells[cell]
+
+    def sync_user(self, user: User) -> None:
+        """Keep the index in step with a created or updated user"""
+        if user.role in INDEXED_ROLES:
+            self.upsert(user.id, user.latitude, user.longitude)
+        else:
+            self.remove(user.id)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> List[uuid.UUID]:
+        min_lat, max_lat, min_lon, max_lon = LocationUtils.bounding_box(lat, lon, radius_km)
+        lat_from = int(math.floor(min_lat / self.cell_size_deg))
+        lat_to = int(math.floor(max_lat / self.cell_size_deg))
+
+        candidates: List[uuid.UUID] = []
+        if min_lon is None:
+            # Box wraps a pole or the antimeridian; fall back to latitude bands
+            for (cell_lat, _), members in self._cells.items():
+                if lat_from <= cell_lat <= lat_to:
+                    candidates.extend(members)
+            return candidates
+
+        lon_from = int(math.floor(min_lon / self.cell_size_deg))
+        lon_to = int(math.floor(max_lon / self.cell_size_deg))
+        if (lat_to - lat_from + 1) * (lon_to - lon_from + 1) > len(self._cells):
+            # Very large radius: scanning occupied cells is cheaper
+            for (cell_lat, cell_lon), members in self._cells.items():
+                if lat_from <= cell_lat <= lat_to and lon_from <= cell_lon <= lon_to:
+                    candidates.extend(members)
+            return candidates
+
+        for cell_lat in range(lat_from, lat_to + 1):
+            for cell_lon in range(lon_from, lon_to + 1):
+                members = self._cells.get((cell_lat, cell_lon))
+                if members:
+                    candidates.extend(members)
+        return candidates
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[uuid.UUID, float]]:
+        """
+        Return (seller_id, distance_km) for every seller within radius_km,
+        nearest first.
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        if not candidates:
+            return []
+        locations = [self._locations[seller_id] for seller_id in candidates]
+        distances = LocationUtils.haversine_distances(
+            lat, lon,
+            [location[0] for location in locations],
+            [location[1] for location in locations]
+        )
+        inside = np.flatnonzero(distances <= radius_km)
+        order = inside[LocationUtils.order_by_distance(distances[inside])]
+        return [(candidates[i], float(distances[i])) for i in order]
+
+    def nearest(self, lat: float, lon: float, k: int, start_radius_km: float = 10.0) -> List[Tuple[uuid.UUID, float]]:
+        """
+        Return the k nearest sellers as (seller_id, distance_km), nearest first.
+
+        The search radius doubles until it holds at least k sellers; every
+        seller closer than the k-th match is then guaranteed to be inside it.
+        """
+        if k <= 0 or not self._locations:
+            return []
+        radius = start_radius_km
+        while True:
+            matches = self.within_radius(lat, lon, radius)
+            if len(matches) >= k or radius >= MAX_SEARCH_RADIUS_KM:
+                return matches[:k]
+            radius = min(radius * 2, MAX_SEARCH_RADIUS_KM)
+
+
+seller_spatial_index = SellerSpatialIndex()
@@ -0,0 +1,61 @@
+import logging
+from typing import Dict
+from sqlmodel import SQLModel, Field, Column, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import sqlalchemy.dialects.postgresql as pg
+
+logger = logging.getLogger(__name__)
+
+# Datasets cached in process and versioned through cache_versions
+CATEGORIES = "categories"
+
+class CacheVersion(SQLModel, table=True):
+    """One row per cached dataset; version goes up by one on every change"""
+    __tablename__ = "cache_versions"
+
+    name: str = Field(primary_key=True, max_length=50)
+    version: int = Field(sa_column=Column(pg.BIGINT, nullable=False, default=0))
+
+class CacheVersions:
+    """
+    Global version numbers of datasets that workers cache in memory.
+
+    A write bumps the dataset's version in the same transaction as the data,
+    and every worker polls the (tiny) cache_versions table on an interval,
+    so a cache built for an older version is detected and rebuilt everywhere
+    within one poll interval. Reads only compare integers.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def current(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    async def bump(self, db: AsyncSession, name: str) -> int:
+        """
+        Increment a version; call before committing the change it describes,
+        and pass the result to observe() once the commit succeeded
+        """
+        table = CacheVersion.__table__
+        upsert = pg.insert(table).values(name=name, version=1)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"version": table.c.version + 1}
+        ).returning(table.c.version)
+        result = await db.execute(upsert)
+        return result.scalar_one()
+
+    def observe(self, name: str, version: int) -> None:
+        """Record a version this worker committed itself, without waiting for the next poll"""
+        self._versions[name] = max(version, self.current(name))
+
+    async def poll(self, db: AsyncSession) -> None:
+        result = await db.execute(select(CacheVersion.name, CacheVersion.version))
+        for name, version in result.all():
+            if version != self.current(name):
+                logger.debug(f"Cache version of {name} is now {version}")
+            self._versions[name] = version
+
+
+cache_versions = CacheVersions()
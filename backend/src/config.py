@@ -19,6 +19,96 @@ class Settings(BaseSettings):
     # Frontend URL for email verification links
     FRONTEND_URL: str = "http://localhost:5173"
     
+    # Seconds between reloads of the in-memory seller location index, so
+    # location changes made through other workers are picked up
+    SELLER_INDEX_REFRESH_SECONDS: int = 300
+    # Above this many nearby sellers, radius filters skip the index's seller
+    # list and rely on the bounding-box query alone
+    SELLER_INDEX_MAX_CANDIDATES: int = 1000
+    
+    # Seconds between rebuilds of the in-memory product autocomplete index
+    SUGGEST_INDEX_REFRESH_SECONDS: int = 300
+    
+    # Seconds between rebuilds of the in-memory "frequently bought together"
+    # index from order history
+    RELATED_PRODUCTS_REBUILD_SECONDS: int = 3600
+    
+    # Seconds between polls of the shared cache versions; a category write
+    # reaches the other workers' category trees within this time
+    CACHE_VERSION_POLL_SECONDS: float = 2
+    # Upper bound on the age of a worker's category tree, so category stats
+    # changed by product writes elsewhere are picked up
+    CATEGORY_CACHE_MAX_AGE_SECONDS: int = 60
+    
+    # Trending products: scores decay with this half-life; each unit sold counts as
+    # TRENDING_SALE_WEIGHT views. Local counters are merged into the shared
+    # table every TRENDING_SYNC_SECONDS, and the ranking is cached for
+    # TRENDING_RANKING_TTL_SECONDS
+    TRENDING_HALF_LIFE_HOURS: float = 24
+    TRENDING_VIEW_WEIGHT: float = 1.0
+    TRENDING_SALE_WEIGHT: float = 10.0
+    TRENDING_SYNC_SECONDS: int = 30
+    TRENDING_RANKING_TTL_SECONDS: float = 5
+    
+    # Product detail views are buffered in memory and written every
+    # PRODUCT_VIEW_FLUSH_SECONDS, or sooner once this many are pending
+    PRODUCT_VIEW_FLUSH_SECONDS: int = 10
+    PRODUCT_VIEW_FLUSH_THRESHOLD: int = 5000
+    
+    # In-process cache for catalog reads (product and category endpoints).
+    # Writes invalidate entries directly; the TTL bounds how long other
+    # workers may serve a response after a write they didn't see
+    CATALOG_CACHE_MAX_ENTRIES: int = 2048
+    CATALOG_CACHE_TTL_SECONDS: int = 60
+    
+    # Pre-encoded product cards kept for listing responses
+    PRODUCT_CARD_CACHE_MAX_ENTRIES: int = 20000
+    
+    # Shared columnar catalog snapshot (memory-mapped by every worker) used to
+    # filter, sort and page listings without a text search
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_DIR: str = "/tmp/catalog-snapshot"
+    CATALOG_SNAPSHOT_REFRESH_SECONDS: int = 15
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS: int = 600
+    
+    # Bulk product import (POST /products/bulk)
+    PRODUCT_IMPORT_CHUNK_SIZE: int = 1000
+    PRODUCT_IMPORT_MAX_ROWS: int = 100000
+    PRODUCT_IMPORT_MAX_REPORTED_ERRORS: int = 1000
+    
+    # Bulk price/stock updates (PATCH /products/bulk)
+    PRODUCT_BULK_UPDATE_MAX_ITEMS: int = 50000
+    PRODUCT_BULK_UPDATE_CHUNK_SIZE: int = 5000
+    
+    # Batched cart changes (POST /carts/me/items/batch)
+    CART_BATCH_MAX_OPERATIONS: int = 500
+    
+    # Where carts are read and written: "database", or "memory" to keep them
+    # in process and write them behind to Postgres every CART_STORE_FLUSH_SECONDS.
+    # "memory" assumes each user's requests reach the same worker.
+    CART_STORE: str = "database"
+    CART_STORE_FLUSH_SECONDS: int = 5
+    CART_STORE_MAX_CARTS: int = 100000
+    # How old cached product fields shown in a stored cart may be
+    CART_STORE_PRODUCT_MAX_AGE_SECONDS: int = 30
+    
+    # Abandoned carts: reminder emails for carts idle this long, and expiry
+    # (archiving) of the items of carts idle even longer
+    CART_SWEEP_INTERVAL_SECONDS: int = 3600
+    CART_SWEEP_BATCH_SIZE: int = 1000
+    CART_REMINDER_AFTER_HOURS: int = 24
+    CART_REMINDER_SEND_BATCH_SIZE: int = 200
+    CART_ITEM_EXPIRY_DAYS: int = 30
+    
+    # Guest carts, kept client side in signed tokens (X-Guest-Cart header)
+    GUEST_CART_MAX_ITEMS: int = 50
+    GUEST_CART_MAX_QUANTITY: int = 999
+    
+    # Cache-Control sent with ETag-validated responses, per router
+    CACHE_CONTROL_PRODUCTS: str = "public, max-age=60"
+    CACHE_CONTROL_CATEGORIES: str = "public, max-age=300"
+    CACHE_CONTROL_CARTS: str = "private, no-cache"
+    
     # Payment configuration
     # Stripe
     STRIPE_SECRET_KEY: Optional[str] = None
@@ -9,6 +9,7 @@ from src.dashboard.models import Invoice, InvoiceStatus
 from src.auth.utils import get_current_active_user, require_seller_or_admin, require_admin
 from src.auth.user.models import User, UserRole
 from src.common.exceptions import NotFoundError
+from src.common.cache import catalog_cache
 from typing import Optional, Dict, Any
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
@@ -71,6 +72,18 @@ async def get_admin_dashboard(
             detail=f"Error retrieving admin dashboard: {str(e)}"
         )
 
+@router.get("/admin/cache-stats", response_model=Dict[str, Any])
+async def get_cache_stats(
+    current_user: User = Depends(require_admin)
+):
+    """
+    Get hit/miss/eviction counters of this worker's catalog response cache (Admin only).
+    """
+    return {
+        "message": "Successfully retrieved cache statistics",
+        "data": catalog_cache.stats()
+    }
+
 # Invoice Routes
 @router.post("/invoices", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED)
 async def create_invoice(
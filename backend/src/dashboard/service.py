@@ -1,7 +1,7 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, func, desc, and_, or_
 from src.orders.models import Order, OrderItem, OrderStatus, PaymentStatus
-from src.product.models import Product
+from src.product.models import Product, ProductViewCount
 from src.auth.user.models import User, UserRole
 from src.dashboard.models import Invoice, InvoiceItem, InvoiceStatus
 from datetime import datetime, timedelta
@@ -44,6 +44,8 @@ class DashboardService:
                         "pending_orders": 0,
                         "recent_orders": [],
                         "top_products": [],
+                        "total_views": 0,
+                        "most_viewed_products": [],
                         "revenue_by_day": [],
                         "order_status_breakdown": {},
                         "payment_status_breakdown": {}
@@ -92,6 +94,23 @@ class DashboardService:
             top_products_result = await db.execute(top_products_query)
             top_products = top_products_result.all()
             
+            # Detail-page views (lifetime), written in batches by the view buffer
+            total_views_result = await db.execute(
+                select(func.coalesce(func.sum(ProductViewCount.views), 0)).join(
+                    Product, ProductViewCount.product_id == Product.id
+                ).where(Product.seller_id == seller_id)
+            )
+            total_views = total_views_result.scalar()
+            most_viewed_query = select(
+                Product.id,
+                Product.title,
+                ProductViewCount.views
+            ).join(ProductViewCount, ProductViewCount.product_id == Product.id).where(
+                Product.seller_id == seller_id
+            ).order_by(desc(ProductViewCount.views)).limit(5)
+            most_viewed_result = await db.execute(most_viewed_query)
+            most_viewed_products = most_viewed_result.all()
+            
             # Revenue by day (last 30 days)
             revenue_by_day = []
             for i in range(days):
@@ -143,6 +162,15 @@ class DashboardService:
                         }
                         for product in top_products
                     ],
+                    "total_views": int(total_views or 0),
+                    "most_viewed_products": [
+                        {
+                            "id": str(product.id),
+                            "title": product.title,
+                            "views": product.views
+                        }
+                        for product in most_viewed_products
+                    ],
                     "revenue_by_day": revenue_by_day,
                     "order_status_breakdown": order_status_breakdown,
                     "payment_status_breakdown": payment_status_breakdown
@@ -1,12 +1,13 @@
 from sqlmodel import SQLModel
-from src.product.models import Product
-from src.cart.models import CartItem
+from src.product.models import Product, ProductTrendingScore, ProductViewCount
+from src.cart.models import CartItem, AbandonedCartItem, CartReminder
 from src.category.models import Category
 from src.auth.user.models import User
 from src.auth.verification_models import EmailVerificationToken
 from src.orders.models import Order, OrderItem
 from src.dashboard.models import Invoice, InvoiceItem
 from src.payment.models import Payment, PaymentRefund, PaymentMethodInfo
+from src.common.versions import CacheVersion
 from .main import engine
 
 
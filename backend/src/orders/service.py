@@ -4,6 +4,10 @@ from src.orders.models import Order, OrderItem, OrderStatus, PaymentStatus
 from src.orders.schema import OrderCreate, OrderUpdate
 from src.orders.notification_service import OrderNotificationService
 from src.product.models import Product
+from src.product.related import co_purchase_index
+from src.product.trending import trending_counters
+from src.common.cache import catalog_cache, PRODUCT_LIST_TAG, product_tag
+from src.product.snapshot import mark_catalog_changed
 from src.auth.user.models import User, UserRole
 from datetime import datetime
 from typing import List, Optional, Dict, Any
@@ -26,6 +30,12 @@ class OrderService:
         random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         return f"ORD-{timestamp}-{random_suffix}"
 
+    @staticmethod
+    def _stock_changed(product_ids: List[uuid.UUID]) -> None:
+        """Drop cached product responses after an order changed their stock"""
+        catalog_cache.invalidate(PRODUCT_LIST_TAG, *[product_tag(product_id) for product_id in product_ids])
+        mark_catalog_changed()
+
     @staticmethod
     async def get_all_orders(
         db: AsyncSession,
@@ -204,10 +214,17 @@ class OrderService:
                 product_result = await db.execute(product_query)
                 product = product_result.scalar_one_or_none()
                 product.stock -= item_data["quantity"]
+                # A new version, so ETags and cached cards change with the stock
+                product.updated_at = datetime.utcnow()
                 db.add(product)
             
             await db.commit()
             await db.refresh(db_order)
+            OrderService._stock_changed([item_data["product_id"] for item_data in order_items_data])
+            co_purchase_index.add_order((item_data["product_id"] for item_data in order_items_data), db_order.id)
+            trending_counters.record_sale(
+                (item_data["product_id"], item_data["quantity"]) for item_data in order_items_data
+            )
             
             # Send order confirmation email to customer
             try:
@@ -368,11 +385,13 @@ class OrderService:
                 product = product_result.scalar_one_or_none()
                 if product:
                     product.stock += item.quantity
+                    product.updated_at = datetime.utcnow()
                     db.add(product)
             
             db.add(order)
             await db.commit()
             await db.refresh(order)
+            OrderService._stock_changed([item.product_id for item in order_items])
             
             return ResponseHandler.update_success("Order", order_id, order)
         except (NotFoundError, ValidationError, HTTPException):
@@ -0,0 +1,140 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError as PydanticValidationError
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# A CSV record (which may span lines inside quotes) longer than this is
+# almost certainly an unterminated quote swallowing the rest of the file;
+# no single line (and so no NDJSON record) may be longer either
+MAX_RECORD_CHARS = 64 * 1024
+
+class MalformedUploadError(Exception):
+    """The upload can't be read any further (e.g. a runaway line); rows before it stand"""
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "ndjson"
+    return None
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode a byte stream into lines without buffering the whole upload.
+    Raises MalformedUploadError once a line grows past MAX_RECORD_CHARS.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    
+    def too_long(number: int) -> MalformedUploadError:
+        return MalformedUploadError(f"line {number} is longer than {MAX_RECORD_CHARS} characters")
+    
+    pending = ""
+    line_number = 0
+    async for chunk in chunks:
+        # Only the new text is split; the partial line carried over can't contain a newline
+        *lines, tail = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = pending + lines[0]
+            pending = tail
+        else:
+            pending += tail
+        for line in lines:
+            line_number += 1
+            if len(line) > MAX_RECORD_CHARS:
+                raise too_long(line_number)
+            yield line.rstrip("\r")
+        if len(pending) > MAX_RECORD_CHARS:
+            raise too_long(line_number + 1)
+    pending += decoder.decode(b"", final=True)
+    if len(pending) > MAX_RECORD_CHARS:
+        raise too_long(line_number + 1)
+    if pending:
+        yield pending.rstrip("\r")
+
+class _RecordFeed:
+    """Iterator handing the csv module one complete record at a time"""
+
+    def __init__(self):
+        self.record = ""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return self.record
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (row_number, fields) for each CSV record, keyed by the header row.
+    Quoted fields may contain newlines: a record is complete once its quote
+    count is even ("" escapes count twice, so they don't break the parity).
+    """
+    # One reader is fed record by record; building a reader per record
+    # costs more than parsing it
+    feed = _RecordFeed()
+    reader = csv.reader(feed)
+    header: Optional[List[str]] = None
+    record = ""
+    row_number = 0
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            if len(record) > MAX_RECORD_CHARS:
+                raise MalformedUploadError(f"unterminated quoted field after row {row_number}")
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        feed.record = record
+        values = next(reader)
+        record = ""
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values))
+    if record.strip():
+        raise MalformedUploadError(f"unterminated quoted field after row {row_number}")
+
+# Yielded by iter_ndjson_records in place of a line that isn't valid JSON
+INVALID_JSON = object()
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row_number, value) for each non-blank line"""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, INVALID_JSON
+
+def normalize_csv_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map CSV text onto ProductCreate input: empty cells are omitted and
+    images are given either as a JSON array or separated by "|".
+    """
+    normalized = {name: value for name, value in fields.items() if name and value != ""}
+    images = normalized.get("images")
+    if isinstance(images, str):
+        images = images.strip()
+        if images.startswith("["):
+            try:
+                normalized["images"] = json.loads(images)
+            except json.JSONDecodeError:
+                pass
+        else:
+            normalized["images"] = [image.strip() for image in images.split("|") if image.strip()]
+    return normalized
+
+def format_validation_errors(error: PydanticValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors(include_url=False)
+    ]
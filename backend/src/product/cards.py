@@ -0,0 +1,111 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from src.product.models import Product
+from src.common.response import encode_json
+from src.config import Config
+
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+def product_images(product: Product) -> list:
+    """Images are stored either as a JSON string (legacy rows) or a native array"""
+    if isinstance(product.images, str):
+        try:
+            return json.loads(product.images)
+        except json.JSONDecodeError:
+            return []
+    return product.images or []
+
+def location_suffix(distance: Optional[float], city: Optional[str], state: Optional[str], formatted: str) -> bytes:
+    """Close a card with the per-request distance and seller location fields"""
+    encode = _encoder.encode
+    return (
+        f',"distance_km":{encode(distance)},"distance_formatted":{encode(formatted)},'
+        f'"seller_location":{{"city":{encode(city)},"state":{encode(state)}}}}}'
+    ).encode("utf-8")
+
+def listing_body(message: str, items: Iterable[bytes], metadata: Dict[str, Any]) -> bytes:
+    """Assemble a {"message", "data", "metadata"} response body from encoded items"""
+    return b"".join((
+        b'{"message":', encode_json(message),
+        b',"data":[', b",".join(items),
+        b'],"metadata":', encode_json(metadata),
+        b"}"
+    ))
+
+class ProductCardCache:
+    """
+    Pre-encoded JSON "cards" for product listings.
+
+    A card is a product's JSON object without its closing brace, so
+    request-specific fields (distance, seller location) can be appended with
+    plain byte concatenation. Cards are keyed by product id and version
+    (updated_at, or created_at for never-updated rows); a stale version is
+    simply never served. Callers that don't know the current version can
+    accept a card up to a maximum age instead (recent()).
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        # product id -> (version, card, time cached)
+        self._cards: "OrderedDict[uuid.UUID, Tuple[datetime, bytes, float]]" = OrderedDict()
+
+    @staticmethod
+    def version_of(product: Product) -> datetime:
+        return product.updated_at or product.created_at
+
+    @staticmethod
+    def render(product: Product) -> bytes:
+        card = encode_json({
+            "id": product.id,
+            "title": product.title,
+            "description": product.description,
+            "price": float(product.price),
+            "discount_percentage": product.discount_percentage,
+            "rating": product.rating,
+            "stock": product.stock,
+            "brand": product.brand,
+            "thumbnail": product.thumbnail,
+            "images": product_images(product),
+            "category_id": product.category_id,
+            "seller_id": product.seller_id,
+            "created_at": product.created_at,
+            "updated_at": product.updated_at
+        })
+        return card[:-1]
+
+    def get(self, product_id: uuid.UUID, version: Optional[datetime]) -> Optional[bytes]:
+        entry = self._cards.get(product_id)
+        if entry is None or entry[0] != version:
+            return None
+        self._cards.move_to_end(product_id)
+        return entry[1]
+
+    def recent(self, product_id: uuid.UUID, max_age_seconds: float) -> Optional[bytes]:
+        """The cached card if it was read from the database at most max_age_seconds ago"""
+        entry = self._cards.get(product_id)
+        if entry is None or time.monotonic() - entry[2] > max_age_seconds:
+            return None
+        self._cards.move_to_end(product_id)
+        return entry[1]
+
+    def put(self, product: Product) -> bytes:
+        card = self.render(product)
+        if self.max_entries > 0:
+            self._cards[product.id] = (self.version_of(product), card, time.monotonic())
+            self._cards.move_to_end(product.id)
+            while len(self._cards) > self.max_entries:
+                self._cards.popitem(last=False)
+        return card
+
+    def discard(self, product_id: uuid.UUID) -> None:
+        self._cards.pop(product_id, None)
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+
+product_cards = ProductCardCache(max_entries=Config.PRODUCT_CARD_CACHE_MAX_ENTRIES)
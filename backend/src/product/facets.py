@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import Float, Integer, cast, func, literal_column
+
+# Upper bounds of the price bands; prices at or above the last bound share
+# one open-ended band
+PRICE_BANDS = (25, 50, 100, 250, 500, 1000)
+
+# Upper bounds (km) of the distance rings around the user
+DISTANCE_RINGS = (1, 5, 10, 25, 50, 100)
+
+# Brands are returned most common first, at most this many
+MAX_BRAND_FACETS = 50
+
+def band_index(expression: Any, bounds: Sequence[float]):
+    """
+    Index of the band a value falls in (0 below the first bound, len(bounds)
+    at or above the last); NULL stays NULL. width_bucket evaluates the
+    expression once, and the bounds are inlined so the result can be grouped on.
+    """
+    thresholds = literal_column(f"ARRAY[{', '.join(str(bound) for bound in bounds)}]::double precision[]")
+    return func.width_bucket(cast(expression, Float), thresholds, type_=Integer)
+
+def band_buckets(counts: Dict[Optional[int], int], bounds: Sequence[float], unit: str = "") -> List[Dict[str, Any]]:
+    """Turn {band index: count} into ordered buckets with their min/max"""
+    buckets = []
+    for index in range(len(bounds) + 1):
+        count = counts.get(index)
+        if not count:
+            continue
+        low = bounds[index - 1] if index > 0 else 0
+        high = bounds[index] if index < len(bounds) else None
+        buckets.append({
+            "value": f"{low}-{high}{unit}" if high is not None else f"{low}{unit}+",
+            "min": low,
+            "max": high,
+            "count": count
+        })
+    if counts.get(None):
+        buckets.append({"value": "unknown", "min": None, "max": None, "count": counts[None]})
+    return buckets
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import Index, Computed, ForeignKey
 import uuid
 from typing import Optional, List, TYPE_CHECKING
 import sqlalchemy.dialects.postgresql as pg
@@ -18,6 +19,19 @@ class Product(SQLModel, table=True):
     Each product can be in MANY carts (via CartItems)
     """
     __tablename__ = "products"
+    __table_args__ = (
+        # Keyset pagination: newest-first catalog and per-seller listings
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_seller_id_created_at_id", "seller_id", "created_at", "id"),
+        # Catalog sort keys, alone and within a category or brand
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_rating_id", "rating", "id"),
+        Index("ix_products_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+        Index("ix_products_category_id_rating_id", "category_id", "rating", "id"),
+        Index("ix_products_brand_created_at_id", "brand", "created_at", "id"),
+        Index("ix_products_brand_price_id", "brand", "price", "id"),
+    )
 
     id: uuid.UUID = Field(
         sa_column=Column(pg.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
@@ -52,3 +66,60 @@ class Product(SQLModel, table=True):
 
     def __repr__(self):
         return f"<Product(id={self.id}, title={self.title}, price={self.price})>"
+
+
+# Weighted full-text document (title > brand > description) generated by
+# Postgres, so it stays current on every insert and update. It lives on the
+# table only: it is never loaded into Product instances or returned by the API.
+PRODUCT_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+Product.__table__.append_column(
+    Column("search_vector", pg.TSVECTOR, Computed(PRODUCT_SEARCH_DOCUMENT, persisted=True))
+)
+product_search_vector = Product.__table__.c.search_vector
+Index("ix_products_search_vector", product_search_vector, postgresql_using="gin")
+
+# Price after discount, also generated and table-only, so sorting and
+# filtering on it can use plain btree indexes
+PRODUCT_EFFECTIVE_PRICE = "round(price * (100 - discount_percentage::numeric) / 100, 2)"
+Product.__table__.append_column(
+    Column("effective_price", pg.NUMERIC(10, 2), Computed(PRODUCT_EFFECTIVE_PRICE, persisted=True))
+)
+product_effective_price = Product.__table__.c.effective_price
+Index("ix_products_effective_price_id", product_effective_price, Product.__table__.c.id)
+Index(
+    "ix_products_category_id_effective_price_id",
+    Product.__table__.c.category_id, product_effective_price, Product.__table__.c.id
+)
+
+
+class ProductTrendingScore(SQLModel, table=True):
+    """
+    Time-decayed popularity of a product (views and sales), merged from the
+    in-memory counters of every worker. score is as of updated_at.
+    """
+    __tablename__ = "product_trending_scores"
+
+    product_id: uuid.UUID = Field(
+        sa_column=Column(
+            pg.UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True, nullable=False
+        )
+    )
+    score: float = Field(nullable=False, default=0)
+    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
+
+
+class ProductViewCount(SQLModel, table=True):
+    """Lifetime detail-page views of a product, written in batches by ProductViewBuffer"""
+    __tablename__ = "product_view_counts"
+
+    product_id: uuid.UUID = Field(
+        sa_column=Column(
+            pg.UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True, nullable=False
+        )
+    )
+    views: int = Field(sa_column=Column(pg.BIGINT, nullable=False, default=0))
+    last_viewed_at: datetime = Field(sa_column=Column(pg.TIMESTAMP(timezone=True), nullable=False))
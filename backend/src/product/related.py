@@ -0,0 +1,160 @@
+import bisect
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.orders.models import Order, OrderItem, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept ranked per product; requests can ask for at most this many
+MAX_RELATED = 50
+
+# Orders with more distinct products than this contribute nothing: they are
+# rare, add a quadratic number of pairs and say little about each pair
+MAX_ORDER_PRODUCTS = 100
+
+# Rows fetched per round trip while streaming order_items during a rebuild
+REBUILD_BATCH_SIZE = 10000
+
+class CoPurchaseIndex:
+    """
+    "Frequently bought together" from order co-occurrence.
+
+    The product x product matrix is stored sparsely: one dict of neighbour
+    counts per product, holding only pairs that were actually bought together.
+    Next to it each product keeps its top MAX_RELATED neighbours ranked, so a
+    request reads k entries instead of sorting all neighbours. Counts only ever
+    grow, which keeps the ranked list exact when it is updated in place.
+    """
+
+    def __init__(self):
+        self._counts: Dict[uuid.UUID, Dict[uuid.UUID, int]] = {}
+        # Ranked ascending by (-count, id), i.e. most bought together first
+        self._top: Dict[uuid.UUID, List[Tuple[int, uuid.UUID]]] = {}
+        # While a rebuild runs: ("order", order_id, product_ids) and
+        # ("discard", product_id, None) as they happen, replayed onto the
+        # rebuilt matrix so none are lost in the swap
+        self._replay: Optional[List[Tuple[str, Any, Any]]] = None
+        self.loaded = False
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        (Re)build the matrix from all non-cancelled orders. order_items are
+        streamed through a server-side cursor in order_id order, so only one
+        order is held in memory at a time.
+
+        Orders placed and products deleted while the rebuild runs are
+        replayed onto it before the swap. The stream and the check of which
+        orders it already covered read one REPEATABLE READ snapshot, so an
+        order is counted exactly once.
+        """
+        self._replay = []
+        try:
+            await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            fresh, orders = await self._build(db)
+            
+            ordered = [order_id for kind, order_id, _ in self._replay if kind == "order" and order_id is not None]
+            covered = set()
+            if ordered:
+                result = await db.execute(select(Order.id).where(Order.id.in_(ordered)))
+                covered = set(result.scalars().all())
+            # No awaits from here on, so nothing new slips in before the swap
+            for kind, key, product_ids in self._replay:
+                if kind == "discard":
+                    fresh.discard(key)
+                elif key not in covered:
+                    fresh.add_order(product_ids)
+        finally:
+            self._replay = None
+
+        # Swap in one step so concurrent readers never see a half-built matrix
+        self._counts = fresh._counts
+        self._top = fresh._top
+        self.loaded = True
+        logger.info(f"Co-purchase index loaded from {orders} orders covering {len(self._counts)} products")
+
+    @staticmethod
+    async def _build(db: AsyncSession) -> Tuple["CoPurchaseIndex", int]:
+        """A new matrix from the orders table, and the number of orders it counts"""
+        query = select(OrderItem.order_id, OrderItem.product_id).join(
+            Order, OrderItem.order_id == Order.id
+        ).where(
+            Order.status.notin_([OrderStatus.CANCELLED, OrderStatus.REFUNDED])
+        ).order_by(OrderItem.order_id)
+
+        fresh = CoPurchaseIndex()
+        orders = 0
+        current_order = None
+        basket: List[uuid.UUID] = []
+        result = await db.stream(query)
+        async for rows in result.partitions(REBUILD_BATCH_SIZE):
+            for order_id, product_id in rows:
+                if order_id != current_order:
+                    fresh.add_order(basket)
+                    orders += 1 if basket else 0
+                    current_order, basket = order_id, []
+                basket.append(product_id)
+        fresh.add_order(basket)
+        orders += 1 if basket else 0
+        return fresh, orders
+
+    def add_order(self, product_ids: Iterable[uuid.UUID], order_id: Optional[uuid.UUID] = None) -> None:
+        """Count every pair of distinct products in one order"""
+        products = list(dict.fromkeys(product_ids))
+        if self._replay is not None:
+            self._replay.append(("order", order_id, products))
+        if len(products) < 2 or len(products) > MAX_ORDER_PRODUCTS:
+            return
+        for product_id in products:
+            for other_id in products:
+                if other_id != product_id:
+                    self._increment(product_id, other_id)
+
+    def _increment(self, product_id: uuid.UUID, other_id: uuid.UUID) -> None:
+        neighbours = self._counts.setdefault(product_id, {})
+        previous = neighbours.get(other_id, 0)
+        count = previous + 1
+        neighbours[other_id] = count
+
+        top = self._top.setdefault(product_id, [])
+        if previous:
+            old_entry = (-previous, other_id)
+            position = bisect.bisect_left(top, old_entry)
+            if position < len(top) and top[position] == old_entry:
+                del top[position]
+        entry = (-count, other_id)
+        if len(top) < MAX_RELATED or entry < top[-1]:
+            bisect.insort(top, entry)
+            if len(top) > MAX_RELATED:
+                top.pop()
+
+    def related(self, product_id: uuid.UUID, limit: int = 10) -> List[Tuple[uuid.UUID, int]]:
+        """The products most often bought with product_id, as (id, times bought together)"""
+        top = self._top.get(product_id, ())
+        return [(other_id, -negated) for negated, other_id in top[:limit]]
+
+    def discard(self, product_id: uuid.UUID) -> None:
+        """
+        Forget a deleted product. Neighbours drop it from their rankings; the
+        freed slot is refilled by later orders or the next rebuild.
+        """
+        if self._replay is not None:
+            self._replay.append(("discard", product_id, None))
+        for other_id in self._counts.pop(product_id, {}):
+            count = self._counts.get(other_id, {}).pop(product_id, None)
+            top = self._top.get(other_id)
+            if count is None or not top:
+                continue
+            entry = (-count, product_id)
+            position = bisect.bisect_left(top, entry)
+            if position < len(top) and top[position] == entry:
+                del top[position]
+        self._top.pop(product_id, None)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+co_purchase_index = CoPurchaseIndex()
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import Response
 from src.db.main import get_db
 from fastapi.exceptions import HTTPException
-from src.product.schema import ProductCreate, ProductUpdate, Product
+from src.product.schema import ProductCreate, ProductUpdate, ProductBulkUpdateItem, ProductFilters, Product
 from src.product.service import ProductService
-from src.common.exceptions import NotFoundError
+from src.common.exceptions import NotFoundError, ValidationError
+from src.product.bulk_import import SUPPORTED_FORMATS, detect_format
+from src.product.related import MAX_RELATED
+from src.product.trending import MAX_TRENDING, trending_counters
+from src.product.views import product_view_buffer
+from src.common.etag import ConditionalGet
+from src.config import Config
 from src.auth.utils import get_current_active_user, require_seller_or_admin
 from src.auth.user.models import User
 from typing import List, Dict, Any, Optional
 from sqlmodel.ext.asyncio.session import AsyncSession
+from decimal import Decimal
+import uuid
 
 router = APIRouter()
+conditional = ConditionalGet(Config.CACHE_CONTROL_PRODUCTS)
 
 @router.get("/", status_code=status.HTTP_200_OK)
 async def get_all_products(
@@ -20,8 +30,21 @@ async def get_all_products(
     user_lon: Optional[float] = Query(None, description="User's longitude for location-based filtering"),
     max_distance_km: Optional[float] = Query(None, ge=0, description="Maximum distance in kilometers to filter products"),
     sort_by_distance: bool = Query(False, description="Sort products by distance from user location"),
+    cursor: Optional[str] = Query(None, max_length=512, description="Keyset pagination cursor; pass an empty value for the first page"),
+    facets: bool = Query(False, description="Also return brand, category, price and distance counts for the current filters"),
+    category_id: Optional[uuid.UUID] = Query(None, description="Only products in this category"),
+    brand: Optional[str] = Query(None, max_length=100, description="Only products of this brand (exact match)"),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    in_stock: Optional[bool] = Query(None, description="true: only products in stock, false: only sold out"),
+    sort: Optional[str] = Query(
+        None,
+        pattern="^(price_asc|price_desc|effective_price_asc|effective_price_desc|rating|newest)$",
+        description="Sort key; effective_price is the price after discount"
+    ),
     db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Get all products with optional location-based filtering.
     
@@ -32,10 +55,24 @@ async def get_all_products(
     - **user_lon**: User's longitude (optional, required for location features)
     - **max_distance_km**: Filter products within this distance (optional)
     - **sort_by_distance**: Sort products by proximity to user (optional)
+    - **cursor**: Switch to cursor pagination (optional). Send an empty cursor for
+      the first page, then `metadata.next_cursor` for the following ones. `page`
+      is ignored and no total is computed in this mode.
+    - **category_id**, **brand**, **min_price**, **max_price**, **min_rating**, **in_stock**: Filters (optional)
+    - **sort**: `price_asc`, `price_desc`, `effective_price_asc`, `effective_price_desc`,
+      `rating` or `newest` (optional). `sort_by_distance` takes precedence; without
+      either, searches are ordered by relevance and everything else by newest
+    - **facets**: Add a `facets` object with counts per brand, category, price
+      band and (with a location) distance ring for everything matching the filters
     """
     try:
         return await ProductService.get_all_products(
-            db, page, limit, search, user_lat, user_lon, max_distance_km, sort_by_distance
+            db, page, limit, search, user_lat, user_lon, max_distance_km, sort_by_distance,
+            cursor=cursor, facets=facets, sort=sort,
+            filters=ProductFilters(
+                category_id=category_id, brand=brand, min_price=min_price, max_price=max_price,
+                min_rating=min_rating, in_stock=in_stock
+            )
         )
     except HTTPException as e:
         raise e
@@ -50,19 +87,21 @@ async def get_my_products(
     page: int = Query(1, ge=1),
     limit: int = Query(100, ge=1, le=100),
     search: str = Query("", max_length=50),
+    cursor: Optional[str] = Query(None, max_length=512, description="Keyset pagination cursor; pass an empty value for the first page"),
     current_user: User = Depends(require_seller_or_admin),
     db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Get current seller's products.
     
     - **page**: Page number (default: 1)
     - **limit**: Items per page (default: 100, max: 100)
     - **search**: Search term for title, description, or brand
+    - **cursor**: Switch to cursor pagination (optional), see `GET /products`
     """
     try:
         return await ProductService.get_products_by_seller(
-            db, current_user.id, page, limit, search
+            db, current_user.id, page, limit, search, cursor=cursor
         )
     except HTTPException as e:
         raise e
@@ -71,13 +110,69 @@ async def get_my_products(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
         )
+@router.get("/suggest", status_code=status.HTTP_200_OK)
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=50, description="What the user has typed so far"),
+    limit: int = Query(8, ge=1, le=20)
+) -> Dict[str, Any]:
+    """
+    Typo-tolerant autocomplete over product titles and brands.
+    
+    - **q**: Partial search text
+    - **limit**: Maximum number of suggestions (default: 8, max: 20)
+    """
+    return ProductService.suggest_products(q, limit)
+
+@router.get("/trending", status_code=status.HTTP_200_OK)
+async def get_trending_products(
+    limit: int = Query(20, ge=1, le=MAX_TRENDING),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Products ranked by recent views and sales; older activity counts less
+    and less (exponential decay).
+    
+    - **limit**: Maximum number of products (default: 20, max: 100)
+    """
+    try:
+        return await ProductService.get_trending_products(db, limit)
+    except Exception as e:
+        raise e
+
+@router.get("/{product_id}/related", status_code=status.HTTP_200_OK)
+async def get_related_products(
+    product_id: str,
+    limit: int = Query(10, ge=1, le=MAX_RELATED),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Products frequently bought together with this one, most common first.
+    
+    - **limit**: Maximum number of products (default: 10, max: 50)
+    """
+    try:
+        return await ProductService.get_related_products(db, product_id, limit)
+    except NotFoundError:
+        raise
+    except Exception as e:
+        raise e
+
 @router.get("/{product_id}", status_code=status.HTTP_200_OK)
 async def get_product(
     product_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Get a product. Supports If-None-Match: an unchanged product answers 304.
+    """
     try:
-        return await ProductService.get_product(db, product_id)
+        cached = await ProductService.get_product(db, product_id)
+        # In-memory only; both reach the database in periodic batches
+        viewed_id = uuid.UUID(str(product_id))
+        trending_counters.record_view(viewed_id)
+        product_view_buffer.record(viewed_id)
+        return conditional.respond(request, cached)
     except NotFoundError:
         raise
     except Exception as e:
@@ -94,6 +189,55 @@ async def create_product(
     except Exception as e:
         raise e
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_import_products(
+    request: Request,
+    format: Optional[str] = Query(None, description="Upload format, 'csv' or 'ndjson'; taken from Content-Type when omitted"),
+    current_user: User = Depends(require_seller_or_admin),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Import many products from one streamed upload (CSV with a header row, or
+    one JSON object per line). Columns match the create product body; CSV
+    images may be a JSON array or "|"-separated.
+    
+    Valid rows are created even if others fail; failures are reported by row number.
+    """
+    upload_format = format or detect_format(request.headers.get("content-type"))
+    if upload_format not in SUPPORTED_FORMATS:
+        raise ValidationError("Unsupported upload format: send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+    try:
+        return await ProductService.bulk_import_products(db, request.stream(), upload_format, current_user)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error importing products: {str(e)}"
+        )
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_update_products(
+    items: List[ProductBulkUpdateItem],
+    current_user: User = Depends(require_seller_or_admin),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Update stock, price and/or discount of many products at once.
+    
+    Omitted fields are left unchanged. Sellers can only update their own
+    products; IDs that don't exist or aren't yours are returned in `failed_ids`.
+    """
+    try:
+        return await ProductService.bulk_update_products(db, items, current_user)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating products: {str(e)}"
+        )
+
 @router.put("/{product_id}", status_code=status.HTTP_200_OK)
 async def update_product(
     product_id: str,
@@ -32,6 +32,21 @@ class ProductUpdate(BaseModel):
     images: Optional[List[str]] = None
     category_id: Optional[uuid.UUID] = None
 
+class ProductBulkUpdateItem(BaseModel):
+    id: uuid.UUID
+    stock: Optional[int] = Field(None, ge=0)
+    price: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+    discount_percentage: Optional[float] = Field(None, ge=0, le=100)
+
+class ProductFilters(BaseModel):
+    """Catalog listing filters; unset fields don't filter"""
+    category_id: Optional[uuid.UUID] = None
+    brand: Optional[str] = None
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    min_rating: Optional[float] = None
+    in_stock: Optional[bool] = None
+
 class Product(ProductBase):
     id: uuid.UUID
     created_at: datetime
@@ -1,18 +1,88 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, desc, or_, func
-from src.product.models import Product
-from src.product.schema import ProductCreate, ProductUpdate
+from sqlmodel import select, desc, or_, and_, func
+from sqlalchemy import null, Float, Integer, insert, update, values, column, cast, tuple_
+import sqlalchemy.dialects.postgresql as pg
+from src.product.models import Product, product_search_vector, product_effective_price
+from src.product.schema import ProductCreate, ProductUpdate, ProductBulkUpdateItem, ProductFilters
+from src.product.bulk_import import (
+    INVALID_JSON, MalformedUploadError, iter_lines, iter_csv_records, iter_ndjson_records,
+    normalize_csv_fields, format_validation_errors
+)
+from src.category.models import Category
+from src.category.service import CategoryService
 from src.auth.user.models import User, UserRole
 from src.common.location_utils import LocationUtils
+from src.common.spatial_index import seller_spatial_index
+from src.common.pagination import CursorPagination
+from src.product.suggest import product_suggest_index
+from src.product.related import co_purchase_index
+from src.product.trending import trending_counters
+from src.common.cache import catalog_cache, PRODUCT_LIST_TAG, product_tag
+from src.product.cards import product_cards, listing_body, location_suffix
+from src.product.snapshot import catalog_snapshot, mark_catalog_changed
+from src.product.facets import PRICE_BANDS, DISTANCE_RINGS, MAX_BRAND_FACETS, band_index, band_buckets
+from src.common.etag import CachedBody, make_etag
+from fastapi.responses import Response
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Iterable, NamedTuple, Set, Tuple
+from pydantic import ValidationError as PydanticValidationError
+from src.config import Config
 from fastapi import HTTPException, status
-from src.common.response import ResponseHandler
+from src.common.response import ResponseHandler, encode_json
 from src.common.exceptions import NotFoundError, ValidationError
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 import uuid
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ListingRow(NamedTuple):
+    id: uuid.UUID
+    version: datetime
+    city: Optional[str]
+    state: Optional[str]
+    distance: Optional[float]
+
+# Explicit catalog orderings: sort name -> (sort column, descending)
+SORT_OPTIONS = {
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+    "effective_price_asc": (product_effective_price, False),
+    "effective_price_desc": (product_effective_price, True),
+    "rating": (Product.rating, True),
+    "newest": (Product.created_at, True),
+}
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
 
 class ProductService:
+    @staticmethod
+    def _search_query(search: str):
+        """
+        Build a prefix-matching tsquery from free text ("silver ri" matches
+        "Silver Ring"). Returns None when the text holds no searchable words.
+        """
+        words = re.findall(r"[^\W_]+", search.lower())
+        if not words:
+            return None
+        return func.to_tsquery("english", " & ".join(f"{word}:*" for word in words))
+
+    @staticmethod
+    def invalidate_cache(product_id: Any = None, category_ids: Iterable[uuid.UUID] = ()) -> None:
+        """
+        Drop cached listings, plus the detail response of one product, and
+        the category cache when the product stats of categories changed
+        """
+        tags = [PRODUCT_LIST_TAG]
+        if product_id is not None:
+            tags.append(product_tag(product_id))
+        catalog_cache.invalidate(*tags)
+        if category_ids:
+            CategoryService.invalidate_cache()
+        mark_catalog_changed()
+
     @staticmethod
     async def get_all_products(
         db: AsyncSession, 
@@ -22,111 +92,307 @@ class ProductService:
         user_lat: Optional[float] = None,
         user_lon: Optional[float] = None,
         max_distance_km: Optional[float] = None,
-        sort_by_distance: bool = False
+        sort_by_distance: bool = False,
+        cursor: Optional[str] = None,
+        facets: bool = False,
+        filters: Optional[ProductFilters] = None,
+        sort: Optional[str] = None
     ) -> Dict[str, Any]:
+        filters = filters or ProductFilters()
+        if filters.min_price is not None and filters.max_price is not None and filters.min_price > filters.max_price:
+            raise ValidationError("min_price cannot be greater than max_price")
+        if sort is not None and sort not in SORT_OPTIONS:
+            raise ValidationError(f"Invalid sort '{sort}'. Valid options: {', '.join(SORT_OPTIONS)}")
+        
+        filter_params = filters.model_dump(exclude_none=True)
+        cache_key = catalog_cache.make_key(
+            "products", case_insensitive=("search",), page=None if cursor is not None else page, limit=limit, search=search,
+            user_lat=user_lat, user_lon=user_lon, max_distance_km=max_distance_km,
+            sort_by_distance=sort_by_distance, cursor=cursor, sort=sort, **filter_params
+        )
+        body = catalog_cache.get(cache_key)
+        if body is None:
+            body = await ProductService._fetch_all_products(
+                db, page, limit, search, user_lat, user_lon, max_distance_km, sort_by_distance, cursor,
+                filters=filters, sort=sort
+            )
+            catalog_cache.set(cache_key, body, tags=[PRODUCT_LIST_TAG])
+        
+        if facets:
+            # Facets don't depend on the page, so they are cached on their own
+            facets_key = catalog_cache.make_key(
+                "product-facets", case_insensitive=("search",), search=search, user_lat=user_lat, user_lon=user_lon,
+                max_distance_km=max_distance_km, **filter_params
+            )
+            facets_body = catalog_cache.get(facets_key)
+            if facets_body is None:
+                facets_body = encode_json(await ProductService._fetch_facets(
+                    db, search, user_lat, user_lon, max_distance_km, filters
+                ))
+                catalog_cache.set(facets_key, facets_body, tags=[PRODUCT_LIST_TAG])
+            body = body[:-1] + b',"facets":' + facets_body + b"}"
+        return _json_response(body)
+
+    @staticmethod
+    async def _fetch_facets(
+        db: AsyncSession,
+        search: str,
+        user_lat: Optional[float],
+        user_lon: Optional[float],
+        max_distance_km: Optional[float],
+        filters: ProductFilters
+    ) -> Dict[str, Any]:
+        """
+        Brand, category, price band and (with a location) distance ring
+        counts for everything matching the listing filters, in one
+        GROUPING SETS query.
+        """
         try:
-            offset = (page - 1) * limit
-            
-            # Join with User table to get seller location
-            query = select(Product, User).join(User, Product.seller_id == User.id)
+            conditions, distance, _ = ProductService._listing_filters(
+                search, user_lat, user_lon, max_distance_km, filters
+            )
+            has_location = user_lat is not None and user_lon is not None
             
-            if search:
-                query = query.where(or_(
-                    Product.title.ilike(f"%{search}%"),
-                    Product.description.ilike(f"%{search}%"),
-                    Product.brand.ilike(f"%{search}%")
-                ))
+            # Bucket in a subquery so the outer query groups on plain columns
+            facet_columns = [
+                Product.brand.label("brand"),
+                Product.category_id.label("category_id"),
+                band_index(Product.price, PRICE_BANDS).label("price_band")
+            ]
+            if has_location:
+                facet_columns.append(band_index(distance, DISTANCE_RINGS).label("distance_ring"))
+            matches = select(*facet_columns).join(User, Product.seller_id == User.id).where(*conditions).subquery()
             
-            # Execute query to get all matching products with seller info
+            grouped = [matches.c[column.name] for column in facet_columns]
+            query = select(
+                *grouped,
+                func.grouping(*grouped).label("grouping"),
+                func.count().label("count")
+            ).group_by(func.grouping_sets(*[tuple_(column) for column in grouped]))
             result = await db.execute(query)
-            product_seller_pairs = result.all()
             
-            # Calculate distances and filter
-            products_with_distance = []
-            for product, seller in product_seller_pairs:
-                # Calculate distance if user location is provided
-                distance = None
-                if user_lat is not None and user_lon is not None:
-                    distance = LocationUtils.calculate_distance(
-                        user_lat, user_lon, 
-                        seller.latitude, seller.longitude
-                    )
-                
-                # Filter by max distance if specified
-                if max_distance_km is not None:
-                    if not LocationUtils.is_within_radius(distance, max_distance_km):
-                        continue
-                
-                products_with_distance.append({
-                    "product": product,
-                    "distance": distance,
-                    "seller_city": seller.city,
-                    "seller_state": seller.state
-                })
+            # GROUPING() sets a bit for every column a row is *not* grouped by,
+            # first column being the highest bit
+            width = len(grouped)
+            set_for_mask = {((1 << width) - 1) ^ (1 << (width - 1 - position)): position for position in range(width)}
+            counts: List[Dict[Any, int]] = [{} for _ in grouped]
+            for row in result.all():
+                position = set_for_mask.get(row.grouping)
+                if position is not None:
+                    counts[position][row[position]] = row.count
+            
+            brands = sorted(counts[0].items(), key=lambda item: (-item[1], item[0]))[:MAX_BRAND_FACETS]
+            categories = sorted(counts[1].items(), key=lambda item: -item[1])
+            return {
+                "brand": [{"value": brand, "count": count} for brand, count in brands],
+                "category": [{"value": category_id, "count": count} for category_id, count in categories],
+                "price": band_buckets(counts[2], PRICE_BANDS),
+                "distance": band_buckets(counts[3], DISTANCE_RINGS, unit=" km") if has_location else []
+            }
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error computing product facets: {str(e)}"
+            )
+
+    @staticmethod
+    def _listing_filters(
+        search: str,
+        user_lat: Optional[float],
+        user_lon: Optional[float],
+        max_distance_km: Optional[float],
+        filters: Optional[ProductFilters] = None
+    ) -> Tuple[List[Any], Any, Any]:
+        """
+        WHERE conditions shared by the catalog listing and its facets, plus
+        the seller distance expression and the search tsquery (or None).
+        Conditions expect products joined with their seller (users).
+        """
+        has_location = user_lat is not None and user_lon is not None
+        
+        # Distance is computed in SQL so filtering, ordering and paging
+        # all happen in the database instead of over the full catalog
+        distance = (
+            LocationUtils.haversine_sql(User.latitude, User.longitude, user_lat, user_lon)
+            if has_location else null()
+        )
+        
+        conditions = []
+        if filters is not None:
+            if filters.category_id is not None:
+                # A category includes all of its subcategories
+                conditions.append(Product.category_id.in_(CategoryService.subtree_ids_query(filters.category_id)))
+            if filters.brand:
+                conditions.append(Product.brand == filters.brand)
+            if filters.min_price is not None:
+                conditions.append(Product.price >= filters.min_price)
+            if filters.max_price is not None:
+                conditions.append(Product.price <= filters.max_price)
+            if filters.min_rating is not None:
+                conditions.append(Product.rating >= filters.min_rating)
+            if filters.in_stock is True:
+                conditions.append(Product.stock > 0)
+            elif filters.in_stock is False:
+                conditions.append(Product.stock == 0)
+        
+        search_query = ProductService._search_query(search) if search else None
+        if search_query is not None:
+            # Served by the GIN index on the generated search vector
+            conditions.append(product_search_vector.op("@@")(search_query))
+        
+        if has_location and max_distance_km is not None:
+            # Prefilter with an indexed bounding box before the exact
+            # haversine check. Sellers without a location are never
+            # filtered out (see LocationUtils.is_within_radius).
+            min_lat, max_lat, min_lon, max_lon = LocationUtils.bounding_box(
+                user_lat, user_lon, max_distance_km
+            )
+            within = [
+                User.latitude.between(min_lat, max_lat),
+                distance <= max_distance_km
+            ]
+            if min_lon is not None:
+                within.append(User.longitude.between(min_lon, max_lon))
+            if seller_spatial_index.loaded:
+                nearby_sellers = seller_spatial_index.within_radius(user_lat, user_lon, max_distance_km)
+                if len(nearby_sellers) <= Config.SELLER_INDEX_MAX_CANDIDATES:
+                    # Narrow further to the sellers the in-memory index places
+                    # nearby. The index lags other workers' writes, so sellers
+                    # created or changed since it was built are kept as well.
+                    since = seller_spatial_index.loaded_at
+                    within.append(or_(
+                        Product.seller_id.in_([seller_id for seller_id, _ in nearby_sellers]),
+                        User.created_at >= since,
+                        User.updated_at >= since
+                    ))
+            conditions.append(or_(
+                User.latitude.is_(None),
+                User.longitude.is_(None),
+                and_(*within)
+            ))
+        
+        return conditions, distance, search_query
+
+    @staticmethod
+    async def _fetch_all_products(
+        db: AsyncSession, 
+        page: int, 
+        limit: int, 
+        search: str = "",
+        user_lat: Optional[float] = None,
+        user_lon: Optional[float] = None,
+        max_distance_km: Optional[float] = None,
+        sort_by_distance: bool = False,
+        cursor: Optional[str] = None,
+        filters: Optional[ProductFilters] = None,
+        sort: Optional[str] = None
+    ) -> bytes:
+        try:
+            offset = (page - 1) * limit
+            has_location = user_lat is not None and user_lon is not None
+            
+            conditions, distance, search_query = ProductService._listing_filters(
+                search, user_lat, user_lon, max_distance_km, filters
+            )
+            distance_column = distance.label("distance")
             
-            # Sort by distance if requested and user location is provided
-            if sort_by_distance and user_lat is not None and user_lon is not None:
+            if sort_by_distance and has_location:
                 # Sort by distance, putting None distances at the end
-                products_with_distance.sort(
-                    key=lambda x: (x["distance"] is None, x["distance"] if x["distance"] is not None else float('inf'))
-                )
+                order = "distance"
+                sort_columns = [func.coalesce(distance, float("inf")), Product.id]
+                descending = False
+            elif sort is not None:
+                # Explicit sort key, served by the (category_id/brand,) key, id indexes
+                order = sort
+                sort_column, descending = SORT_OPTIONS[sort]
+                sort_columns = [sort_column, Product.id]
+            elif search_query is not None:
+                # Best matches first
+                order = "relevance"
+                sort_columns = [func.ts_rank_cd(product_search_vector, search_query, type_=Float), Product.id]
+                descending = True
             else:
                 # Sort by created_at (newest first)
-                products_with_distance.sort(
-                    key=lambda x: x["product"].created_at,
-                    reverse=True
-                )
+                order = "newest"
+                sort_columns = [Product.created_at, Product.id]
+                descending = True
             
-            # Apply pagination
-            total_count = len(products_with_distance)
-            paginated_products = products_with_distance[offset:offset + limit]
+            # Only ids and versions are read here; product bodies come from
+            # the card cache. Join with User table to get seller location
+            columns = [
+                Product.id, func.coalesce(Product.updated_at, Product.created_at).label("version"),
+                User.city, User.state, distance_column, sort_columns[0].label("sort_key")
+            ]
+            if cursor is None:
+                # The window count returns the total number of matches
+                # alongside the page
+                columns.append(func.count().over().label("total_count"))
+            query = select(*columns).join(User, Product.seller_id == User.id).where(*conditions)
+            query = query.order_by(*[column.desc() if descending else column.asc() for column in sort_columns])
             
-            # Format response
-            formatted_products = []
-            for item in paginated_products:
-                # Convert images JSON string back to list
-                import json
-                try:
-                    images = json.loads(item["product"].images) if isinstance(item["product"].images, str) else item["product"].images
-                except (json.JSONDecodeError, TypeError):
-                    images = []
-                
-                product_dict = {
-                    "id": item["product"].id,
-                    "title": item["product"].title,
-                    "description": item["product"].description,
-                    "price": item["product"].price,
-                    "discount_percentage": item["product"].discount_percentage,
-                    "rating": item["product"].rating,
-                    "stock": item["product"].stock,
-                    "brand": item["product"].brand,
-                    "thumbnail": item["product"].thumbnail,
-                    "images": images,
-                    "category_id": item["product"].category_id,
-                    "seller_id": item["product"].seller_id,
-                    "created_at": item["product"].created_at,
-                    "updated_at": item["product"].updated_at,
-                    "distance_km": item["distance"],
-                    "distance_formatted": LocationUtils.format_distance(item["distance"]),
-                    "seller_location": {
-                        "city": item["seller_city"],
-                        "state": item["seller_state"]
-                    }
-                }
-                formatted_products.append(product_dict)
+            if cursor is not None:
+                # Keyset mode: continue right after the last row of the
+                # previous page; an empty cursor starts from the top
+                if cursor:
+                    key = CursorPagination.decode(cursor, order)
+                    key = ProductService._parse_cursor_key(order, key)
+                    query = query.where(CursorPagination.after(sort_columns, key, descending))
+                result = await db.execute(query.limit(limit + 1))
+                rows = result.all()
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                next_cursor = None
+                if has_more:
+                    next_cursor = CursorPagination.encode(order, [rows[-1].sort_key, rows[-1].id])
+            elif search_query is None and Config.CATALOG_SNAPSHOT_ENABLED and catalog_snapshot.loaded:
+                # Filter, order and count in memory; only the page itself is read from SQL
+                rows, total_count = await ProductService._snapshot_page(
+                    db, offset, limit, filters or ProductFilters(), user_lat, user_lon,
+                    max_distance_km, sort, sort_by_distance
+                )
+            else:
+                result = await db.execute(query.offset(offset).limit(limit))
+                rows = result.all()
+
+                if rows:
+                    total_count = rows[0].total_count
+                else:
+                    # Past the last page the window count has no row to ride on
+                    count_query = select(func.count()).select_from(Product).join(
+                        User, Product.seller_id == User.id
+                    ).where(*conditions)
+                    total_count = await db.scalar(count_query)
             
-            return {
-                "message": f"Successfully retrieved products for page {page}",
-                "data": formatted_products,
-                "metadata": {
-                    "page": page,
+            cards = await ProductService._load_cards(db, [(row.id, row.version) for row in rows])
+            items = []
+            for row in rows:
+                card = cards.get(row.id)
+                if card is None:
+                    # Deleted since the page was read
+                    continue
+                items.append(card + location_suffix(
+                    row.distance, row.city, row.state, LocationUtils.format_distance(row.distance)
+                ))
+            
+            if cursor is not None:
+                return listing_body("Successfully retrieved products", items, {
                     "limit": limit,
-                    "total": total_count,
-                    "pages": (total_count + limit - 1) // limit if limit > 0 else 0,
+                    "next_cursor": next_cursor,
+                    "has_more": has_more,
                     "sorted_by_distance": sort_by_distance and user_lat is not None,
                     "max_distance_km": max_distance_km
-                }
-            }
+                })
+            
+            return listing_body(f"Successfully retrieved products for page {page}", items, {
+                "page": page,
+                "limit": limit,
+                "total": total_count,
+                "pages": (total_count + limit - 1) // limit if limit > 0 else 0,
+                "sorted_by_distance": sort_by_distance and user_lat is not None,
+                "max_distance_km": max_distance_km
+            })
+        except ValidationError:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -134,14 +400,184 @@ class ProductService:
             )
 
     @staticmethod
-    async def get_product(db: AsyncSession, product_id: str) -> Product:
+    async def _snapshot_page(
+        db: AsyncSession,
+        offset: int,
+        limit: int,
+        filters: ProductFilters,
+        user_lat: Optional[float],
+        user_lon: Optional[float],
+        max_distance_km: Optional[float],
+        sort: Optional[str],
+        sort_by_distance: bool
+    ) -> Tuple[List[ListingRow], int]:
+        """Page the catalog snapshot, then read seller location and versions for that page only"""
+        snapshot_page = catalog_snapshot.query(
+            filters, offset, limit, user_lat, user_lon, max_distance_km, sort, sort_by_distance
+        )
+        if not snapshot_page.ids:
+            return [], snapshot_page.total
+        
+        result = await db.execute(
+            select(
+                Product.id, func.coalesce(Product.updated_at, Product.created_at).label("version"),
+                User.city, User.state
+            ).join(User, Product.seller_id == User.id).where(Product.id.in_(snapshot_page.ids))
+        )
+        current = {row.id: row for row in result.all()}
+        rows = []
+        for product_id, product_distance in zip(snapshot_page.ids, snapshot_page.distances):
+            row = current.get(product_id)
+            if row is not None:
+                rows.append(ListingRow(product_id, row.version, row.city, row.state, product_distance))
+        return rows, snapshot_page.total
+
+    @staticmethod
+    async def _load_cards(db: AsyncSession, versions: List[Any]) -> Dict[uuid.UUID, bytes]:
+        """
+        Return the encoded card of every (product_id, version) pair. Only
+        products whose card is missing or outdated are read from the database.
+        """
+        cards = {}
+        missing = []
+        for product_id, version in versions:
+            card = product_cards.get(product_id, version)
+            if card is None:
+                missing.append(product_id)
+            else:
+                cards[product_id] = card
+        if missing:
+            result = await db.execute(select(Product).where(Product.id.in_(missing)))
+            for product in result.scalars().all():
+                cards[product.id] = product_cards.put(product)
+        return cards
+
+    @staticmethod
+    async def _ranked_cards(db: AsyncSession, ranked: List[Tuple[uuid.UUID, Any]], field: str) -> List[bytes]:
+        """
+        Cards for (product_id, value) pairs ranked in memory, in the same
+        order, each closed with `field`: value. Deleted products are skipped.
+        """
+        if not ranked:
+            return []
+        result = await db.execute(
+            select(Product.id, func.coalesce(Product.updated_at, Product.created_at)).where(
+                Product.id.in_([product_id for product_id, _ in ranked])
+            )
+        )
+        cards = await ProductService._load_cards(db, result.all())
+        return [
+            cards[product_id] + b"," + encode_json(field) + b":" + encode_json(value) + b"}"
+            for product_id, value in ranked
+            if product_id in cards
+        ]
+
+    @staticmethod
+    def _parse_cursor_key(order: str, key: List[Any]) -> List[Any]:
+        """Turn a decoded cursor key back into typed values for SQL"""
+        try:
+            value, product_id = key
+            if order == "newest":
+                return [datetime.fromisoformat(value), uuid.UUID(product_id)]
+            if order.startswith(("price_", "effective_price_")):
+                return [Decimal(str(value)), uuid.UUID(product_id)]
+            # distance / relevance / rating
+            return [float(value), uuid.UUID(product_id)]
+        except (TypeError, ValueError, InvalidOperation):
+            raise ValidationError("Invalid pagination cursor")
+
+    @staticmethod
+    def suggest_products(query: str, limit: int = 8) -> Dict[str, Any]:
+        """
+        Autocomplete product titles and brands from the in-memory suggest index.
+        """
+        return {
+            "message": "Successfully retrieved suggestions",
+            "data": product_suggest_index.suggest(query, limit)
+        }
+
+    @staticmethod
+    async def get_trending_products(db: AsyncSession, limit: int = 20) -> Response:
+        """
+        Products ranked by recent views and sales (time-decayed counters kept
+        in memory and shared through product_trending_scores).
+        """
+        try:
+            trending = [
+                (product_id, round(score, 3)) for product_id, score in trending_counters.top(limit)
+            ]
+            items = await ProductService._ranked_cards(db, trending, "trending_score")
+            return _json_response(listing_body("Successfully retrieved trending products", items, {
+                "limit": limit,
+                "total": len(items),
+                "half_life_hours": Config.TRENDING_HALF_LIFE_HOURS
+            }))
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving trending products: {str(e)}"
+            )
+
+    @staticmethod
+    async def get_related_products(db: AsyncSession, product_id: str, limit: int = 10) -> Response:
+        """
+        "Frequently bought together": the products most often ordered with
+        this one, ranked by the in-memory co-purchase index. Only the k
+        returned products are read from the database (for their cards).
+        """
+        try:
+            try:
+                product_uuid = uuid.UUID(str(product_id))
+            except ValueError:
+                raise NotFoundError("Product", product_id)
+            
+            related = co_purchase_index.related(product_uuid, limit)
+            if not related:
+                exists = await db.execute(select(Product.id).where(Product.id == product_uuid))
+                if exists.scalar_one_or_none() is None:
+                    raise NotFoundError("Product", product_id)
+            
+            items = await ProductService._ranked_cards(db, related, "bought_together")
+            return _json_response(listing_body("Successfully retrieved related products", items, {
+                "product_id": product_uuid,
+                "limit": limit,
+                "total": len(items)
+            }))
+        except NotFoundError:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving related products: {str(e)}"
+            )
+
+    @staticmethod
+    async def get_product(db: AsyncSession, product_id: str) -> CachedBody:
+        """
+        Return the encoded product response and its ETag. Cached entries
+        answer both without touching the database.
+        """
         try:
+            try:
+                cache_key = catalog_cache.make_key("product", id=uuid.UUID(str(product_id)))
+            except ValueError:
+                cache_key = None
+            cached = catalog_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+            
             query = select(Product).where(Product.id == product_id)
             result = await db.execute(query)
             product = result.scalar_one_or_none()
             if not product:
                 raise NotFoundError("Product", product_id)
-            return ResponseHandler.get_single_success(product.title, product_id, product)
+            response = CachedBody(
+                etag=make_etag("product", product.id, product.updated_at or product.created_at),
+                body=encode_json(ResponseHandler.get_single_success(product.title, product_id, product))
+            )
+            if cache_key:
+                catalog_cache.set(cache_key, response, tags=[product_tag(product.id)])
+            return response
         except NotFoundError:
             raise
         except Exception as e:
@@ -169,8 +605,12 @@ class ProductService:
                 product_dict["images"] = json.dumps(product_dict["images"])
             db_product = Product(**product_dict)
             db.add(db_product)
+            await db.flush()
+            await CategoryService.apply_product_changes(db, [(db_product.category_id, None, db_product.price)])
             await db.commit()
             await db.refresh(db_product)
+            product_suggest_index.add_product(db_product.id, db_product.title, db_product.brand)
+            ProductService.invalidate_cache(category_ids=[db_product.category_id])
             return ResponseHandler.create_success(db_product.title, db_product.id, db_product)
         except HTTPException:
             raise
@@ -196,14 +636,30 @@ class ProductService:
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You can only update products that you created. Only the product owner or admin can update this product."
                 )
+            previous_category_id = db_product.category_id
+            previous_price = db_product.price
 
-            for key, value in updated_product.model_dump(exclude_unset=True).items():
+            changes = updated_product.model_dump(exclude_unset=True)
+            for key, value in changes.items():
                 setattr(db_product, key, value)
             db_product.updated_at = datetime.utcnow()
 
             db.add(db_product)
+            # Moving the product or changing its price changes category stats
+            stale_categories = []
+            if "category_id" in changes or "price" in changes:
+                stale_categories = [previous_category_id, db_product.category_id]
+                await db.flush()
+                if previous_category_id == db_product.category_id:
+                    stats_changes = [(db_product.category_id, previous_price, db_product.price)]
+                else:
+                    stats_changes = [(previous_category_id, previous_price, None), (db_product.category_id, None, db_product.price)]
+                await CategoryService.apply_product_changes(db, stats_changes)
             await db.commit()
             await db.refresh(db_product)
+            product_suggest_index.add_product(db_product.id, db_product.title, db_product.brand)
+            ProductService.invalidate_cache(db_product.id, category_ids=stale_categories)
+            product_cards.discard(db_product.id)
             return ResponseHandler.update_success(db_product.title, db_product.id, db_product)
         except (NotFoundError, HTTPException):
             raise
@@ -250,7 +706,14 @@ class ProductService:
             
             # Then delete the product
             await db.delete(db_product)
+            await db.flush()
+            await CategoryService.apply_product_changes(db, [(db_product.category_id, db_product.price, None)])
             await db.commit()
+            product_suggest_index.remove_product(db_product.id)
+            ProductService.invalidate_cache(db_product.id, category_ids=[db_product.category_id])
+            product_cards.discard(db_product.id)
+            co_purchase_index.discard(db_product.id)
+            trending_counters.discard(db_product.id)
             return ResponseHandler.delete_success(db_product.title, db_product.id, db_product)
         except (NotFoundError, HTTPException):
             raise
@@ -267,7 +730,8 @@ class ProductService:
         seller_id: uuid.UUID,
         page: int = 1,
         limit: int = 100,
-        search: str = ""
+        search: str = "",
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get products by seller ID.
@@ -275,76 +739,308 @@ class ProductService:
         try:
             offset = (page - 1) * limit
             
-            # Query products by seller_id
-            query = select(Product).where(Product.seller_id == seller_id)
-            
-            if search:
-                query = query.where(or_(
-                    Product.title.ilike(f"%{search}%"),
-                    Product.description.ilike(f"%{search}%"),
-                    Product.brand.ilike(f"%{search}%")
-                ))
-            
-            # Order by created_at (newest first)
-            query = query.order_by(desc(Product.created_at))
-            
-            # Execute query
-            result = await db.execute(query)
-            products = result.scalars().all()
-            
-            # Get total count for pagination
-            count_query = select(func.count()).select_from(Product).where(Product.seller_id == seller_id)
-            if search:
-                count_query = count_query.where(or_(
-                    Product.title.ilike(f"%{search}%"),
-                    Product.description.ilike(f"%{search}%"),
-                    Product.brand.ilike(f"%{search}%")
-                ))
-            total = await db.scalar(count_query)
+            conditions = [Product.seller_id == seller_id]
+            search_query = ProductService._search_query(search) if search else None
+            if search_query is not None:
+                conditions.append(product_search_vector.op("@@")(search_query))
             
-            # Apply pagination
-            paginated_products = products[offset:offset + limit]
+            # Order by created_at (newest first), served by the
+            # (seller_id, created_at, id) index
+            sort_columns = [Product.created_at, Product.id]
+            query = select(
+                Product.id, Product.created_at,
+                func.coalesce(Product.updated_at, Product.created_at).label("version")
+            ).where(*conditions).order_by(
+                desc(Product.created_at), desc(Product.id)
+            )
             
-            # Format response
-            formatted_products = []
-            for product in paginated_products:
-                # Convert images JSON string back to list
-                import json
-                try:
-                    images = json.loads(product.images) if isinstance(product.images, str) else product.images
-                except (json.JSONDecodeError, TypeError):
-                    images = []
+            if cursor is not None:
+                if cursor:
+                    key = ProductService._parse_cursor_key("newest", CursorPagination.decode(cursor, "newest"))
+                    query = query.where(CursorPagination.after(sort_columns, key, descending=True))
+                result = await db.execute(query.limit(limit + 1))
+                rows = result.all()
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                next_cursor = None
+                if has_more:
+                    next_cursor = CursorPagination.encode("newest", [rows[-1].created_at, rows[-1].id])
+            else:
+                result = await db.execute(query.offset(offset).limit(limit))
+                rows = result.all()
                 
-                product_dict = {
-                    "id": product.id,
-                    "title": product.title,
-                    "description": product.description,
-                    "price": float(product.price),
-                    "discount_percentage": product.discount_percentage,
-                    "rating": product.rating,
-                    "stock": product.stock,
-                    "brand": product.brand,
-                    "thumbnail": product.thumbnail,
-                    "images": images,
-                    "category_id": product.category_id,
-                    "seller_id": product.seller_id,
-                    "created_at": product.created_at.isoformat() if product.created_at else None,
-                    "updated_at": product.updated_at.isoformat() if product.updated_at else None
-                }
-                formatted_products.append(product_dict)
+                # Get total count for pagination
+                count_query = select(func.count()).select_from(Product).where(*conditions)
+                total = await db.scalar(count_query)
             
-            return {
-                "message": f"Successfully retrieved seller's products for page {page}",
-                "data": formatted_products,
-                "metadata": {
+            cards = await ProductService._load_cards(db, [(row.id, row.version) for row in rows])
+            items = [cards[row.id] + b"}" for row in rows if row.id in cards]
+            
+            if cursor is not None:
+                body = listing_body("Successfully retrieved seller's products", items, {
+                    "limit": limit,
+                    "next_cursor": next_cursor,
+                    "has_more": has_more
+                })
+            else:
+                body = listing_body(f"Successfully retrieved seller's products for page {page}", items, {
                     "page": page,
                     "limit": limit,
                     "total": total,
                     "pages": (total + limit - 1) // limit if limit > 0 else 0
-                }
-            }
+                })
+            return _json_response(body)
+        except ValidationError:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error retrieving seller's products: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def bulk_import_products(
+        db: AsyncSession,
+        upload: AsyncIterator[bytes],
+        upload_format: str,
+        current_user: User
+    ) -> Dict[str, Any]:
+        """
+        Create products from a streamed CSV or NDJSON upload.
+        
+        Rows are validated against ProductCreate as they arrive and inserted
+        in chunks, one transaction per chunk. Invalid rows are reported by
+        row number and never stop the rest of the import. An upload that
+        can't be read any further (a runaway line or quoted field) is
+        reported as one failed row, and the rows before it are kept.
+        """
+        lines = iter_lines(upload)
+        records = iter_csv_records(lines) if upload_format == "csv" else iter_ndjson_records(lines)
+        
+        received = 0
+        created = 0
+        failed = 0
+        errors: List[Dict[str, Any]] = []
+        known_categories: Set[uuid.UUID] = set()
+        chunk: List[Tuple[int, ProductCreate]] = []
+        
+        def report(row_number: int, messages: List[str]) -> None:
+            nonlocal failed
+            failed += 1
+            if len(errors) < Config.PRODUCT_IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "errors": messages})
+        
+        async def flush() -> None:
+            nonlocal created
+            inserted, chunk_errors = await ProductService._insert_import_chunk(
+                db, chunk, current_user.id, known_categories
+            )
+            created += inserted
+            for row_number, messages in chunk_errors:
+                report(row_number, messages)
+            chunk.clear()
+        
+        try:
+            last_row = 0
+            try:
+                async for row_number, raw in records:
+                    last_row = row_number
+                    if received >= Config.PRODUCT_IMPORT_MAX_ROWS:
+                        report(row_number, [f"row: import is limited to {Config.PRODUCT_IMPORT_MAX_ROWS} rows"])
+                        break
+                    received += 1
+                    if upload_format == "csv":
+                        raw = normalize_csv_fields(raw)
+                    if raw is INVALID_JSON:
+                        report(row_number, ["row: invalid JSON"])
+                        continue
+                    if not isinstance(raw, dict):
+                        report(row_number, ["row: expected a JSON object"])
+                        continue
+                    try:
+                        chunk.append((row_number, ProductCreate.model_validate(raw)))
+                    except PydanticValidationError as e:
+                        report(row_number, format_validation_errors(e))
+                        continue
+                    if len(chunk) >= Config.PRODUCT_IMPORT_CHUNK_SIZE:
+                        await flush()
+            except MalformedUploadError as e:
+                # Nothing after this point can be read reliably; stop here
+                received += 1
+                report(last_row + 1, [f"row: {str(e)}"])
+            if chunk:
+                await flush()
+        finally:
+            # Earlier chunks are committed even if the upload breaks off
+            if created:
+                ProductService.invalidate_cache(category_ids=known_categories)
+        
+        return {
+            "message": f"Imported {created} of {received} products",
+            "data": {
+                "received": received,
+                "created": created,
+                "failed": failed,
+                "errors": errors,
+                "errors_truncated": failed > len(errors)
+            }
+        }
+
+    @staticmethod
+    async def _insert_import_chunk(
+        db: AsyncSession,
+        chunk: List[Tuple[int, ProductCreate]],
+        seller_id: uuid.UUID,
+        known_categories: Set[uuid.UUID]
+    ) -> Tuple[int, List[Tuple[int, List[str]]]]:
+        """Insert one validated chunk; returns (rows inserted, per-row errors)"""
+        errors: List[Tuple[int, List[str]]] = []
+        
+        # Check categories up front so one bad reference can't fail the whole chunk
+        unchecked = {product.category_id for _, product in chunk} - known_categories
+        if unchecked:
+            result = await db.execute(select(Category.id).where(Category.id.in_(unchecked)))
+            known_categories.update(result.scalars().all())
+        
+        now = datetime.utcnow()
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        for row_number, product in chunk:
+            if product.category_id not in known_categories:
+                errors.append((row_number, [f"category_id: Category with id {product.category_id} not found"]))
+                continue
+            rows.append((row_number, {
+                **product.model_dump(),
+                "id": uuid.uuid4(),
+                "seller_id": seller_id,
+                "created_at": now
+            }))
+        if not rows:
+            return 0, errors
+        
+        def stats_changes(inserted_rows):
+            return [(values["category_id"], None, values["price"]) for _, values in inserted_rows]
+        
+        try:
+            # executemany is sent as batched multi-row INSERTs
+            await db.execute(insert(Product), [values for _, values in rows])
+            await CategoryService.apply_product_changes(db, stats_changes(rows))
+            await db.commit()
+            inserted = rows
+        except Exception:
+            await db.rollback()
+            # Fall back to row-by-row inserts to isolate the rows the database rejects
+            inserted = []
+            for row_number, values in rows:
+                try:
+                    await db.execute(insert(Product), [values])
+                    await CategoryService.apply_product_changes(db, stats_changes([(row_number, values)]))
+                    await db.commit()
+                    inserted.append((row_number, values))
+                except Exception as e:
+                    await db.rollback()
+                    errors.append((row_number, [f"row: {str(e).splitlines()[0]}"]))
+        
+        product_suggest_index.add_products(
+            (values["id"], values["title"], values["brand"]) for _, values in inserted
+        )
+        return len(inserted), errors
+
+    @staticmethod
+    async def bulk_update_products(
+        db: AsyncSession,
+        items: List[ProductBulkUpdateItem],
+        current_user: User
+    ) -> Dict[str, Any]:
+        """
+        Apply stock/price/discount changes to many products. Each chunk is a
+        single UPDATE ... FROM (VALUES ...) that also enforces ownership, so
+        products that don't exist or belong to another seller simply don't
+        match and are reported as failed.
+        """
+        if len(items) > Config.PRODUCT_BULK_UPDATE_MAX_ITEMS:
+            raise ValidationError(f"At most {Config.PRODUCT_BULK_UPDATE_MAX_ITEMS} products can be updated at once")
+        
+        # One change per product; later entries win
+        changes: Dict[uuid.UUID, ProductBulkUpdateItem] = {}
+        for item in items:
+            changes[item.id] = item
+        
+        updated_ids: List[uuid.UUID] = []
+        repriced_categories: Set[uuid.UUID] = set()
+        pending = list(changes.values())
+        chunk_size = Config.PRODUCT_BULK_UPDATE_CHUNK_SIZE
+        try:
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                changed = values(
+                    column("id", pg.UUID(as_uuid=True)),
+                    column("stock", Integer),
+                    column("price", pg.NUMERIC(10, 2)),
+                    column("discount_percentage", Float),
+                    name="changes"
+                ).data([(item.id, item.stock, item.price, item.discount_percentage) for item in chunk])
+                
+                conditions = [Product.id == changed.c.id]
+                if current_user.role != UserRole.ADMIN:
+                    conditions.append(Product.seller_id == current_user.id)
+                repriced = [item.id for item in chunk if item.price is not None]
+                previous_prices: Dict[uuid.UUID, Decimal] = {}
+                if repriced:
+                    # Lock the repriced rows (in id order) to read the prices being replaced
+                    locked = await db.execute(
+                        select(Product.id, Product.price)
+                        .where(Product.id.in_(repriced))
+                        .order_by(Product.id)
+                        .with_for_update(key_share=True)
+                    )
+                    previous_prices = dict(locked.all())
+                statement = (
+                    update(Product)
+                    .where(*conditions)
+                    .values(
+                        # VALUES renders omitted fields as bare NULLs, so a column that is NULL in
+                        # every row would come out as text; the casts keep the types explicit
+                        stock=func.coalesce(cast(changed.c.stock, Integer), Product.stock),
+                        price=func.coalesce(cast(changed.c.price, pg.NUMERIC(10, 2)), Product.price),
+                        discount_percentage=func.coalesce(
+                            cast(changed.c.discount_percentage, Float), Product.discount_percentage
+                        ),
+                        updated_at=datetime.utcnow()
+                    )
+                    .returning(Product.id, Product.category_id, Product.price)
+                    .execution_options(synchronize_session=False)
+                )
+                result = await db.execute(statement)
+                updated_rows = result.all()
+                stats_changes = [
+                    (category_id, previous_prices[product_id], price)
+                    for product_id, category_id, price in updated_rows
+                    if product_id in previous_prices
+                ]
+                if stats_changes:
+                    await CategoryService.apply_product_changes(db, stats_changes)
+                await db.commit()
+                updated_ids.extend(product_id for product_id, _, _ in updated_rows)
+                repriced_categories.update(category_id for category_id, _, _ in stats_changes)
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error updating products: {str(e)}"
+            )
+        finally:
+            # Earlier chunks are committed even if a later one fails
+            if updated_ids:
+                catalog_cache.invalidate(PRODUCT_LIST_TAG, *[product_tag(product_id) for product_id in updated_ids])
+                if repriced_categories:
+                    CategoryService.invalidate_cache()
+                mark_catalog_changed()
+        
+        updated = set(updated_ids)
+        return {
+            "message": f"Updated {len(updated)} of {len(changes)} products",
+            "data": {
+                "updated": len(updated),
+                "failed_ids": [product_id for product_id in changes if product_id not in updated]
+            }
+        }
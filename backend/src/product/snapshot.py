@@ -0,0 +1,309 @@
+import json
+import logging
+import math
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.auth.user.models import User
+from src.common.location_utils import LocationUtils
+from src.config import Config
+from src.product.models import Product, product_effective_price
+from src.product.schema import ProductFilters
+from src.category.tree import category_tree
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "id_hi", "id_lo", "price", "effective_price", "rating", "stock",
+    "latitude", "longitude", "category", "brand", "created_at"
+)
+
+# Snapshot orderings: sort name -> (column, descending). "distance" is
+# computed per request.
+SNAPSHOT_SORTS = {
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+    "effective_price_asc": ("effective_price", False),
+    "effective_price_desc": ("effective_price", True),
+    "rating": ("rating", True),
+    "newest": ("created_at", True),
+}
+
+class SnapshotPage:
+    def __init__(self, ids: List[uuid.UUID], distances: List[Optional[float]], total: int):
+        self.ids = ids
+        self.distances = distances
+        self.total = total
+
+class CatalogSnapshot:
+    """
+    Read-optimized, columnar copy of the catalog shared by all workers.
+
+    One worker (whoever holds the leader lock) periodically writes the
+    columns as .npy files into a fresh directory and atomically repoints
+    the CURRENT file at it. Every worker memory-maps the current columns
+    read-only, so the data lives once in the OS page cache no matter how
+    many workers there are. Brands and categories are interned as indexes
+    into small string tables.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock_file = None
+        self._loaded_name: Optional[str] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._brands: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self.built_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_name is not None
+
+    def __len__(self) -> int:
+        return len(self._columns["id_hi"]) if self._columns else 0
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    # Publishing ---------------------------------------------------------
+
+    def mark_dirty(self) -> None:
+        """Ask the leader to rebuild on its next tick (called on catalog writes)"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path("DIRTY"), "a"):
+                pass
+            os.utime(self._path("DIRTY"))
+        except OSError as e:
+            logger.warning(f"Could not mark catalog snapshot dirty: {str(e)}")
+
+    def _is_leader(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(self._path("LOCK"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        # Held for the lifetime of the process; released by the OS if it dies
+        self._lock_file = lock_file
+        return True
+
+    def _needs_rebuild(self) -> bool:
+        try:
+            with open(self._path("CURRENT")) as current:
+                built_at = os.path.getmtime(self._path(current.read().strip(), "meta.json"))
+        except OSError:
+            return True
+        if time.time() - built_at >= Config.CATALOG_SNAPSHOT_MAX_AGE_SECONDS:
+            return True
+        try:
+            return os.path.getmtime(self._path("DIRTY")) >= built_at
+        except OSError:
+            return False
+
+    async def build(self, db: AsyncSession) -> None:
+        query = select(
+            Product.id, Product.price, product_effective_price, Product.rating, Product.stock,
+            User.latitude, User.longitude, Product.category_id, Product.brand, Product.created_at
+        ).join(User, Product.seller_id == User.id)
+
+        ids, prices, effective_prices, ratings, stocks = [], [], [], [], []
+        latitudes, longitudes, categories, brands, created_at = [], [], [], [], []
+        brand_index: Dict[str, int] = {}
+        category_index: Dict[str, int] = {}
+        result = await db.stream(query)
+        async for rows in result.partitions(10000):
+            for product_id, price, effective_price, rating, stock, lat, lon, category_id, brand, created in rows:
+                ids.append(product_id.bytes)
+                prices.append(float(price))
+                effective_prices.append(float(effective_price) if effective_price is not None else float(price))
+                ratings.append(rating)
+                stocks.append(stock)
+                latitudes.append(math.nan if lat is None else lat)
+                longitudes.append(math.nan if lon is None else lon)
+                categories.append(category_index.setdefault(str(category_id), len(category_index)))
+                brands.append(brand_index.setdefault(brand, len(brand_index)))
+                created_at.append(int(created.timestamp() * 1_000_000))
+
+        # uuids as two big-endian halves sort exactly like Postgres' uuid type
+        id_halves = np.frombuffer(b"".join(ids), dtype=">u8").reshape(-1, 2).astype(np.uint64)
+        columns = {
+            "id_hi": id_halves[:, 0],
+            "id_lo": id_halves[:, 1],
+            "price": np.array(prices, dtype=np.float64),
+            "effective_price": np.array(effective_prices, dtype=np.float64),
+            "rating": np.array(ratings, dtype=np.float64),
+            "stock": np.array(stocks, dtype=np.int64),
+            "latitude": np.array(latitudes, dtype=np.float64),
+            "longitude": np.array(longitudes, dtype=np.float64),
+            "category": np.array(categories, dtype=np.int32),
+            "brand": np.array(brands, dtype=np.int32),
+            "created_at": np.array(created_at, dtype=np.int64),
+        }
+
+        name = f"snapshot-{time.time_ns()}"
+        staging = self._path(f".{name}")
+        os.makedirs(staging)
+        for column, values in columns.items():
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+        with open(os.path.join(staging, "meta.json"), "w") as meta:
+            json.dump({"brands": list(brand_index), "categories": list(category_index), "rows": len(ids)}, meta)
+        os.rename(staging, self._path(name))
+        with open(self._path("CURRENT.tmp"), "w") as current:
+            current.write(name)
+        os.replace(self._path("CURRENT.tmp"), self._path("CURRENT"))
+        self._remove_old_snapshots(keep=name)
+        logger.info(f"Catalog snapshot {name} published with {len(ids)} products")
+
+    def _remove_old_snapshots(self, keep: str) -> None:
+        # Workers that still map an old snapshot keep reading it after the
+        # unlink; the space is freed once they reload
+        for entry in os.listdir(self.directory):
+            if entry.startswith("snapshot-") and entry != keep and entry != self._loaded_name:
+                shutil.rmtree(self._path(entry), ignore_errors=True)
+
+    def reload(self) -> None:
+        """Map the current snapshot if it changed since the last call"""
+        try:
+            with open(self._path("CURRENT")) as current:
+                name = current.read().strip()
+        except OSError:
+            return
+        if not name or name == self._loaded_name:
+            return
+        try:
+            columns = {
+                column: np.load(self._path(name, f"{column}.npy"), mmap_mode="r")
+                for column in COLUMNS
+            }
+            with open(self._path(name, "meta.json")) as meta_file:
+                meta = json.load(meta_file)
+            built_at = os.path.getmtime(self._path(name, "meta.json"))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load catalog snapshot {name}: {str(e)}")
+            return
+        # Swap in one step so concurrent readers never see a half-loaded snapshot
+        self._columns = columns
+        self._brands = {brand: index for index, brand in enumerate(meta["brands"])}
+        self._categories = {category: index for index, category in enumerate(meta["categories"])}
+        self._loaded_name = name
+        self.built_at = built_at
+
+    async def refresh(self, session_factory: Callable[[], Any]) -> None:
+        """Rebuild if this worker leads and the catalog changed, then pick up the latest snapshot"""
+        if self._is_leader() and self._needs_rebuild():
+            async with session_factory() as session:
+                await self.build(session)
+        self.reload()
+
+    # Querying -----------------------------------------------------------
+
+    def query(
+        self,
+        filters: ProductFilters,
+        offset: int,
+        limit: int,
+        user_lat: Optional[float] = None,
+        user_lon: Optional[float] = None,
+        max_distance_km: Optional[float] = None,
+        sort: Optional[str] = None,
+        sort_by_distance: bool = False
+    ) -> SnapshotPage:
+        """
+        Filter, order and page the snapshot. Mirrors the SQL listing,
+        including sellers without a location never being filtered out and
+        sorting last by distance.
+        """
+        columns = self._columns
+        mask = np.ones(len(self), dtype=bool)
+        if filters.category_id is not None:
+            # A category includes all of its subcategories
+            categories = [
+                self._categories[str(category_id)]
+                for category_id in category_tree.subtree_ids(filters.category_id)
+                if str(category_id) in self._categories
+            ]
+            if not categories:
+                return SnapshotPage([], [], 0)
+            mask &= np.isin(columns["category"], categories)
+        if filters.brand:
+            brand = self._brands.get(filters.brand)
+            if brand is None:
+                return SnapshotPage([], [], 0)
+            mask &= columns["brand"] == brand
+        if filters.min_price is not None:
+            mask &= columns["price"] >= float(filters.min_price)
+        if filters.max_price is not None:
+            mask &= columns["price"] <= float(filters.max_price)
+        if filters.min_rating is not None:
+            mask &= columns["rating"] >= filters.min_rating
+        if filters.in_stock is True:
+            mask &= columns["stock"] > 0
+        elif filters.in_stock is False:
+            mask &= columns["stock"] == 0
+
+        matches = np.flatnonzero(mask)
+        distances = None
+        has_location = user_lat is not None and user_lon is not None
+        if has_location:
+            distances = LocationUtils.haversine_distances(
+                user_lat, user_lon, columns["latitude"][matches], columns["longitude"][matches]
+            )
+            if max_distance_km is not None:
+                inside = LocationUtils.within_radius_mask(distances, max_distance_km)
+                matches, distances = matches[inside], distances[inside]
+
+        # Sort keys, all ascending: primary key first, then the id tie-breaker
+        if sort_by_distance and has_location:
+            primary, descending = np.where(np.isnan(distances), np.inf, distances), False
+        else:
+            column, descending = SNAPSHOT_SORTS[sort or "newest"]
+            primary = columns[column][matches]
+            primary = -primary if descending else primary
+        id_hi, id_lo = columns["id_hi"][matches], columns["id_lo"][matches]
+        if descending:
+            id_hi, id_lo = ~id_hi, ~id_lo
+
+        order = self._page_order(primary, id_hi, id_lo, offset, limit)
+        page = matches[order]
+        halves = np.stack([columns["id_hi"][page], columns["id_lo"][page]], axis=1).astype(">u8")
+        ids = [uuid.UUID(bytes=row.tobytes()) for row in halves]
+        page_distances = [None] * len(ids)
+        if distances is not None:
+            page_distances = [None if np.isnan(value) else float(value) for value in distances[order]]
+        return SnapshotPage(ids, page_distances, len(matches))
+
+    @staticmethod
+    def _page_order(primary: np.ndarray, id_hi: np.ndarray, id_lo: np.ndarray, offset: int, limit: int) -> np.ndarray:
+        """Indexes of rows [offset, offset + limit) in (primary, id) order, without sorting everything"""
+        end = offset + limit
+        candidates = np.arange(len(primary))
+        if end < len(primary):
+            # Everything up to the end of the page ranks at or below the
+            # end-th smallest primary key; ties there are kept and settled by id
+            boundary = np.partition(primary, end - 1)[end - 1]
+            candidates = np.flatnonzero(primary <= boundary)
+        ranked = candidates[np.lexsort((id_lo[candidates], id_hi[candidates], primary[candidates]))]
+        return ranked[offset:end]
+
+
+catalog_snapshot = CatalogSnapshot(Config.CATALOG_SNAPSHOT_DIR)
+
+def mark_catalog_changed() -> None:
+    if Config.CATALOG_SNAPSHOT_ENABLED:
+        catalog_snapshot.mark_dirty()
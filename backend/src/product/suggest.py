@@ -0,0 +1,202 @@
+import bisect
+import logging
+import re
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.product.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Trigrams shared by more terms than this carry little signal; they are not
+# used to find candidates (candidates are still scored on all trigrams)
+MAX_POSTINGS_PER_TRIGRAM = 2000
+
+# Minimum share of the query's trigrams a fuzzy match has to contain
+MIN_SIMILARITY = 0.45
+
+# Upper bound on prefix matches collected before ranking
+MAX_PREFIX_MATCHES = 200
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"[^\W_]+", text.lower()))
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm style trigrams: each word is padded with two leading spaces and one trailing space"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update([padded[i:i + 3] for i in range(len(padded) - 2)])
+    return frozenset(grams)
+
+@dataclass
+class SuggestTerm:
+    text: str
+    kind: str
+    grams: FrozenSet[str]
+    product_ids: Set[uuid.UUID] = field(default_factory=set)
+
+class ProductSuggestIndex:
+    """
+    In-process autocomplete index over product titles and brands.
+
+    Exact prefixes are found by binary search over the sorted terms; typos are
+    tolerated through a trigram inverted index. Both are updated incrementally
+    by ProductService, so no request ever touches the database.
+    """
+
+    def __init__(self):
+        self._terms: Dict[Tuple[str, str], SuggestTerm] = {}
+        self._sorted_keys: List[Tuple[str, str]] = []
+        self._postings: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._product_terms: Dict[uuid.UUID, List[Tuple[str, str]]] = {}
+        self.loaded = False
+
+    async def load(self, db: AsyncSession) -> None:
+        """(Re)build the index from the products table"""
+        result = await db.execute(select(Product.id, Product.title, Product.brand))
+        fresh = ProductSuggestIndex()
+        fresh.add_products(result.all())
+
+        # Swap in one step so concurrent readers never see a half-built index
+        self._terms = fresh._terms
+        self._sorted_keys = fresh._sorted_keys
+        self._postings = fresh._postings
+        self._product_terms = fresh._product_terms
+        self.loaded = True
+        logger.info(f"Product suggest index loaded with {len(self._terms)} terms")
+
+    def _add_term(self, product_id: uuid.UUID, text: Optional[str], kind: str, keep_sorted: bool = True) -> Optional[Tuple[str, str]]:
+        normalized = normalize(text or "")
+        if not normalized:
+            return None
+        key = (normalized, kind)
+        term = self._terms.get(key)
+        if term is None:
+            term = SuggestTerm(text=text.strip(), kind=kind, grams=trigrams(normalized))
+            self._terms[key] = term
+            if keep_sorted:
+                bisect.insort(self._sorted_keys, key)
+            else:
+                self._sorted_keys.append(key)
+            for gram in term.grams:
+                self._postings[gram].add(key)
+        term.product_ids.add(product_id)
+        return key
+
+    def _remove_term(self, product_id: uuid.UUID, key: Tuple[str, str]) -> None:
+        term = self._terms.get(key)
+        if term is None:
+            return
+        term.product_ids.discard(product_id)
+        if term.product_ids:
+            return
+        del self._terms[key]
+        position = bisect.bisect_left(self._sorted_keys, key)
+        if position < len(self._sorted_keys) and self._sorted_keys[position] == key:
+            del self._sorted_keys[position]
+        for gram in term.grams:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def add_product(self, product_id: uuid.UUID, title: Optional[str], brand: Optional[str]) -> None:
+        self.remove_product(product_id)
+        keys = [self._add_term(product_id, title, "title"), self._add_term(product_id, brand, "brand")]
+        self._product_terms[product_id] = [key for key in keys if key is not None]
+
+    def add_products(self, products: Iterable[Tuple[uuid.UUID, Optional[str], Optional[str]]]) -> None:
+        """Add many (id, title, brand) at once, sorting the term list a single time"""
+        # Last entry per product wins. Replaced terms are all removed before
+        # anything is appended, while the term list is still sorted for bisect.
+        latest = {product_id: (title, brand) for product_id, title, brand in products}
+        for product_id in latest:
+            self.remove_product(product_id)
+        for product_id, (title, brand) in latest.items():
+            keys = [
+                self._add_term(product_id, title, "title", keep_sorted=False),
+                self._add_term(product_id, brand, "brand", keep_sorted=False)
+            ]
+            self._product_terms[product_id] = [key for key in keys if key is not None]
+        self._sorted_keys.sort()
+
+    def remove_product(self, product_id: uuid.UUID) -> None:
+        for key in self._product_terms.pop(product_id, []):
+            self._remove_term(product_id, key)
+
+    def _prefix_matches(self, query: str) -> List[Tuple[str, str]]:
+        matches = []
+        position = bisect.bisect_left(self._sorted_keys, (query, ""))
+        while position < len(self._sorted_keys) and len(matches) < MAX_PREFIX_MATCHES:
+            key = self._sorted_keys[position]
+            if not key[0].startswith(query):
+                break
+            matches.append(key)
+            position += 1
+        return matches
+
+    def _fuzzy_matches(self, query: str) -> Dict[Tuple[str, str], float]:
+        query_grams = trigrams(query)
+        if not query_grams:
+            return {}
+        # Ignore the word-end trigram of the last word: the user is most
+        # likely still typing it
+        last_word = query.split()[-1]
+        wanted = query_grams - {f"  {last_word} "[-3:]} or query_grams
+
+        by_rarity = sorted((gram for gram in wanted if gram in self._postings), key=lambda gram: len(self._postings[gram]))
+        selective = [gram for gram in by_rarity if len(self._postings[gram]) <= MAX_POSTINGS_PER_TRIGRAM]
+        candidates = set()
+        for gram in selective:
+            candidates.update(self._postings[gram])
+        if not selective and by_rarity:
+            # Only very common trigrams matched; score a bounded slice of the
+            # rarest one rather than a large part of the catalog
+            candidates.update(islice(self._postings[by_rarity[0]], MAX_POSTINGS_PER_TRIGRAM))
+
+        scores = {}
+        for key in candidates:
+            shared = len(wanted & self._terms[key].grams)
+            similarity = shared / len(wanted)
+            if similarity >= MIN_SIMILARITY:
+                scores[key] = similarity
+        return scores
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict[str, object]]:
+        """Return up to limit completions for what the user has typed so far"""
+        normalized = normalize(query)
+        if not normalized:
+            return []
+
+        scores: Dict[Tuple[str, str], float] = {}
+        for key in self._prefix_matches(normalized):
+            scores[key] = 2.0
+        # Fall back to typo-tolerant matching when prefixes alone don't fill the list
+        if len(scores) < limit and len(normalized) >= 3:
+            for key, similarity in self._fuzzy_matches(normalized).items():
+                scores.setdefault(key, similarity)
+
+        # Best score first, then the most widely used term, then the shortest
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], -len(self._terms[item[0]].product_ids), len(item[0][0]), item[0])
+        )
+        suggestions = []
+        for key, score in ranked[:limit]:
+            term = self._terms[key]
+            suggestions.append({
+                "text": term.text,
+                "type": term.kind,
+                "product_count": len(term.product_ids),
+                "score": round(min(score, 1.0), 3)
+            })
+        return suggestions
+
+
+product_suggest_index = ProductSuggestIndex()
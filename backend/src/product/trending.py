@@ -0,0 +1,141 @@
+import heapq
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, func
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel import select, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.config import Config
+from src.product.models import Product, ProductTrendingScore
+
+logger = logging.getLogger(__name__)
+
+# Longest trending feed served, and the number of top rows each worker
+# pulls back from the shared table when it syncs
+MAX_TRENDING = 100
+SYNC_ROWS = 1000
+
+# Scores that have decayed below this are deleted from the shared table
+MIN_SCORE = 0.01
+
+class TrendingCounters:
+    """
+    Exponentially decayed view/sale counters, kept in process.
+
+    Every event adds its weight to a product's score, and all scores lose
+    half their value every half-life. Scores are stored "forward decayed"
+    relative to a landmark time (weight * e^(rate * (t - landmark))), so
+    recording an event is one dict update and ranking needs no per-item
+    decay; the landmark is moved forward on every sync to keep the exponents
+    small. Recording never touches the database: sync() periodically merges
+    the increments into product_trending_scores and reloads the shared top
+    scores, so workers and restarts converge.
+    """
+
+    def __init__(self, half_life_seconds: float):
+        self.decay_rate = math.log(2) / half_life_seconds
+        self._landmark = time.time()
+        self._scores: Dict[uuid.UUID, float] = {}
+        # Increments not yet merged into the shared table
+        self._pending: Dict[uuid.UUID, float] = {}
+        self._ranking: Optional[List[Tuple[uuid.UUID, float]]] = None
+        self._ranked_at = 0.0
+
+    def record(self, product_id: uuid.UUID, weight: float) -> None:
+        value = weight * math.exp(self.decay_rate * (time.time() - self._landmark))
+        self._scores[product_id] = self._scores.get(product_id, 0.0) + value
+        self._pending[product_id] = self._pending.get(product_id, 0.0) + value
+
+    def record_view(self, product_id: uuid.UUID) -> None:
+        self.record(product_id, Config.TRENDING_VIEW_WEIGHT)
+
+    def record_sale(self, items: Iterable[Tuple[uuid.UUID, int]]) -> None:
+        """Record an order, given as (product_id, quantity) pairs"""
+        for product_id, quantity in items:
+            self.record(product_id, Config.TRENDING_SALE_WEIGHT * quantity)
+
+    def discard(self, product_id: uuid.UUID) -> None:
+        self._scores.pop(product_id, None)
+        self._pending.pop(product_id, None)
+        self._ranking = None
+
+    def top(self, limit: int) -> List[Tuple[uuid.UUID, float]]:
+        """The highest scoring products as (id, current score), best first"""
+        now = time.time()
+        if self._ranking is None or now - self._ranked_at >= Config.TRENDING_RANKING_TTL_SECONDS:
+            decay = math.exp(-self.decay_rate * (now - self._landmark))
+            ranked = heapq.nlargest(MAX_TRENDING, self._scores.items(), key=itemgetter(1))
+            self._ranking = [(product_id, value * decay) for product_id, value in ranked]
+            self._ranked_at = now
+        return self._ranking[:limit]
+
+    def _rebase(self, now: float) -> None:
+        """Move the landmark to now, so stored values become plain current scores"""
+        decay = math.exp(-self.decay_rate * (now - self._landmark))
+        self._scores = {product_id: value * decay for product_id, value in self._scores.items()}
+        self._pending = {product_id: value * decay for product_id, value in self._pending.items()}
+        self._landmark = now
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Merge local increments into the shared table and reload the shared top scores"""
+        now = time.time()
+        self._rebase(now)
+        pending, self._pending = self._pending, {}
+        as_of = datetime.fromtimestamp(now, tz=timezone.utc)
+        table = ProductTrendingScore.__table__
+        now_param = bindparam("as_of", as_of, type_=pg.TIMESTAMP(timezone=True))
+        # Shared scores decayed from their updated_at to now
+        current_score = ProductTrendingScore.score * func.exp(
+            -self.decay_rate * func.extract("epoch", now_param - ProductTrendingScore.updated_at)
+        )
+        try:
+            if pending:
+                # Products deleted since their events were recorded (possibly
+                # by another worker) would fail the foreign key
+                existing = await db.execute(select(Product.id).where(Product.id.in_(list(pending))))
+                pending = {product_id: pending[product_id] for product_id in existing.scalars().all()}
+            if pending:
+                upsert = pg.insert(table)
+                upsert = upsert.on_conflict_do_update(
+                    index_elements=[table.c.product_id],
+                    set_={
+                        "score": table.c.score * func.exp(
+                            -self.decay_rate * func.extract("epoch", upsert.excluded.updated_at - table.c.updated_at)
+                        ) + upsert.excluded.score,
+                        "updated_at": upsert.excluded.updated_at
+                    }
+                )
+                await db.execute(upsert, [
+                    {"product_id": product_id, "score": pending[product_id], "updated_at": as_of}
+                    # A fixed order keeps concurrent syncs from other
+                    # workers from deadlocking on the same rows
+                    for product_id in sorted(pending)
+                ])
+            await db.execute(delete(ProductTrendingScore).where(current_score < MIN_SCORE))
+            result = await db.execute(
+                select(ProductTrendingScore.product_id, current_score).order_by(desc(current_score)).limit(SYNC_ROWS)
+            )
+            shared = dict(result.all())
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Keep the increments for the next attempt
+            for product_id, value in pending.items():
+                self._pending[product_id] = self._pending.get(product_id, 0.0) + value
+            raise
+
+        # The landmark is still `now`, so shared scores can be used as stored
+        # values; events recorded during the round trip are added back on top
+        for product_id, value in self._pending.items():
+            shared[product_id] = shared.get(product_id, 0.0) + value
+        self._scores = shared
+        self._ranking = None
+        logger.debug(f"Trending counters synced: {len(pending)} products merged, {len(shared)} tracked")
+
+
+trending_counters = TrendingCounters(half_life_seconds=Config.TRENDING_HALF_LIFE_HOURS * 3600)
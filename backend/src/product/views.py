@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel import select
+from src.config import Config
+from src.db.main import async_session
+from src.product.models import Product, ProductViewCount
+
+logger = logging.getLogger(__name__)
+
+class ProductViewBuffer:
+    """
+    Write-coalescing buffer for product detail views.
+
+    Views are counted in memory per product, along with the time of the
+    product's latest view, and written as one batched upsert into
+    product_view_counts, either every PRODUCT_VIEW_FLUSH_SECONDS (periodic
+    task) or as soon as flush_threshold views are pending. A crash
+    loses at most the views since the last flush; a failed flush keeps its
+    counts for the next attempt.
+    """
+
+    def __init__(self, flush_threshold: int):
+        self.flush_threshold = flush_threshold
+        # product id -> (views, latest view)
+        self._views: Dict[uuid.UUID, Tuple[int, datetime]] = {}
+        self._pending_views = 0
+        self._lock = asyncio.Lock()
+        self._scheduled: Optional[asyncio.Task] = None
+
+    def record(self, product_id: uuid.UUID) -> None:
+        views, _ = self._views.get(product_id, (0, None))
+        self._views[product_id] = (views + 1, datetime.now(timezone.utc))
+        self._pending_views += 1
+        if self._pending_views >= self.flush_threshold and (self._scheduled is None or self._scheduled.done()):
+            self._scheduled = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._views:
+                return
+            pending, self._views = self._views, {}
+            self._pending_views = 0
+            try:
+                async with async_session() as session:
+                    # Views of products deleted meanwhile would fail the foreign key
+                    existing = await session.execute(select(Product.id).where(Product.id.in_(list(pending))))
+                    rows = [
+                        {"product_id": product_id, "views": pending[product_id][0], "last_viewed_at": pending[product_id][1]}
+                        # A fixed order keeps concurrent flushes from other
+                        # workers from deadlocking on the same rows
+                        for product_id in sorted(existing.scalars().all())
+                    ]
+                    if rows:
+                        table = ProductViewCount.__table__
+                        upsert = pg.insert(table)
+                        upsert = upsert.on_conflict_do_update(
+                            index_elements=[table.c.product_id],
+                            set_={
+                                "views": table.c.views + upsert.excluded.views,
+                                "last_viewed_at": func.greatest(table.c.last_viewed_at, upsert.excluded.last_viewed_at)
+                            }
+                        )
+                        await session.execute(upsert, rows)
+                        await session.commit()
+            except Exception as e:
+                for product_id, (views, last_viewed_at) in pending.items():
+                    newer_views, newer_viewed_at = self._views.get(product_id, (0, last_viewed_at))
+                    self._views[product_id] = (views + newer_views, max(last_viewed_at, newer_viewed_at))
+                self._pending_views += sum(views for views, _ in pending.values())
+                logger.error(f"Failed to flush product views: {str(e)}")
+                return
+            logger.debug(f"Flushed views of {len(rows)} products")
+
+
+product_view_buffer = ProductViewBuffer(flush_threshold=Config.PRODUCT_VIEW_FLUSH_THRESHOLD)